@@ -0,0 +1,49 @@
+"""
+Бенчмарк записи в базу бота (DatabaseHandler, SQLite WAL).
+
+Запуск: python benchmarks/bench_db_writes.py [число записей] [число потоков]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.db_handler import DatabaseHandler
+
+
+def run(db, writes, threads, write):
+    per_thread = writes // threads
+
+    def worker(offset):
+        for i in range(offset, offset + per_thread):
+            write(db, i)
+
+    workers = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def main(writes=5000, threads=4):
+    cases = (
+        ('save_check_result', lambda db, i: db.save_check_result(i % 2 == 0, f"Доступна запись на даты: {i}")),
+        ('update_user_activity', lambda db, i: db.update_user_activity(i % 1000)),
+        ('update_user_preferred_dates', lambda db, i: db.update_user_preferred_dates(i % 1000, 'week')),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseHandler(os.path.join(directory, 'bench.db'))
+        for name, write in cases:
+            single = run(db, writes, 1, write)
+            parallel = run(db, writes, threads, write)
+            print(f"{name}: {single:,.0f} записей/с в 1 потоке, {parallel:,.0f} записей/с в {threads} потоках")
+        db.close()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,34 @@
+"""
+Бенчмарк разбора страницы выбора локации на сохраненных снимках.
+
+Запуск: python benchmarks/bench_location_page.py [число повторов]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.location_page import parse_location_page
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SNAPSHOTS = (
+    'Standortauswahl und frühestmöglicher T333ermin.html',
+    'Standortauswahl und frühestmöglicher Termin.html'
+)
+
+
+def main(number=200):
+    for name in SNAPSHOTS:
+        with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+            html = f.read()
+
+        locations = parse_location_page(html)
+        seconds = min(timeit.repeat(lambda: parse_location_page(html), number=number, repeat=3)) / number
+        open_count = sum(1 for location in locations if location.available)
+        print(f"{name}: {len(html) / 1024:.1f} КБ, локаций {len(locations)}, доступно {open_count}, "
+              f"{seconds * 1000:.3f} мс на разбор")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
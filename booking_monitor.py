@@ -7,8 +7,12 @@ import requests
 from datetime import datetime
 from loguru import logger
 from browser_manager.browser import BrowserHandler
-from config.config import TELEGRAM_TOKEN
+from browser_manager.pool import get_driver_pool
+from browser_manager.parked import ParkedSession
+from browser_manager.http_checker import HttpBookingChecker
+from config.config import TELEGRAM_TOKEN, PARKED_SESSION, CHECK_ENGINE, HISTORY_DIR, HISTORY_RETENTION_DAYS
 from utils.notification import send_telegram_notification, load_chat_ids
+from utils.history import HistoryStore
 
 # Настройка логирования
 logger.remove()
@@ -16,37 +20,24 @@ logger.add(sys.stdout, level="INFO")
 logger.add("booking_monitor.log", rotation="1 day", level="INFO")
 
 # Глобальные переменные
-HISTORY_FILE = "booking_history.json"
+HISTORY_FILE = "booking_history.json"  # старый формат, переносится в HISTORY_DIR при первой записи
 LAST_NOTIFICATION_FILE = "last_notification.json"
 RANDOM_INTERVAL_MIN = 120  # минимальный интервал в секундах (2 минуты)
 RANDOM_INTERVAL_MAX = 240  # максимальный интервал в секундах (4 минуты)
 
+# Припаркованная сессия браузера, переживающая отдельные проверки
+parked_session = None
+# HTTP-движок (CHECK_ENGINE=http), держит cookie-сессию сайта между проверками
+http_checker = None
+# История проверок: дозапись в дневные сегменты вместо перезаписи JSON
+history = HistoryStore(HISTORY_DIR, retention_days=HISTORY_RETENTION_DAYS, legacy_file=HISTORY_FILE)
+
 def save_booking_status(status, message):
     """Сохраняет информацию о слотах в историю"""
-    try:
-        history = []
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r") as f:
-                history = json.load(f)
-                
-        # Добавляем новую запись
-        history.append({
-            "timestamp": datetime.now().isoformat(),
-            "available": status,
-            "message": message
-        })
-        
-        # Ограничиваем историю 100 записями
-        if len(history) > 100:
-            history = history[-100:]
-            
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(history, f, indent=2)
-            
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении истории: {e}")
-        return False
+    return history.append({
+        "available": status,
+        "message": message
+    })
 
 def should_send_notification(status, message):
     """Определяет, нужно ли отправлять уведомление"""
@@ -87,12 +78,30 @@ def save_notification_time():
 
 def check_booking_availability():
     """Проверяет доступность слотов и отправляет уведомления"""
+    global parked_session, http_checker
     browser = BrowserHandler(headless=False)  # headless=True для фонового режима
-    driver = browser.init_driver()
+    driver = None
+    
+    if CHECK_ENGINE == 'http':
+        # Проверка прямыми запросами, без Chrome
+        if http_checker is None:
+            http_checker = HttpBookingChecker()
+    elif PARKED_SESSION:
+        # Сессия остается на странице выбора локации между проверками
+        if parked_session is None:
+            parked_session = ParkedSession(browser)
+    else:
+        pool = get_driver_pool(browser)
+        driver = pool.acquire()
     
     try:
         logger.info("Запуск проверки доступности слотов...")
-        available, message = browser.run_selenium_side_script(driver)
+        if driver:
+            available, message = browser.run_selenium_side_script(driver)
+        elif http_checker:
+            available, message = http_checker.check_booking_availability()
+        else:
+            available, message = parked_session.check()
         logger.info(f"Результат: Доступность={available}, Сообщение={message}")
         
         # Сохраняем результат в историю
@@ -114,12 +123,21 @@ def check_booking_availability():
         
         return available, message
     finally:
-        # Даем время посмотреть результат в режиме отладки
-        if not browser.headless:
-            time.sleep(5)
-        browser.close(driver)
+        if driver:
+            # Даем время посмотреть результат в режиме отладки
+            if not browser.headless:
+                time.sleep(5)
+            # Возвращаем браузер в пул вместо закрытия
+            pool.release(driver)
         logger.info("Проверка завершена")
 
+def close_parked_session():
+    """Возвращает драйвер припаркованной сессии в пул (при остановке)."""
+    global parked_session
+    if parked_session is not None:
+        parked_session.close()
+        parked_session = None
+
 def run_monitoring():
     """Запускает периодический мониторинг"""
     logger.info("Запуск мониторинга слотов бронирования")
@@ -137,6 +155,7 @@ def run_monitoring():
             time.sleep(interval)
     except KeyboardInterrupt:
         logger.info("Мониторинг остановлен пользователем")
+        close_parked_session()
     except Exception as e:
         logger.error(f"Ошибка при выполнении мониторинга: {e}")
         # При ошибке пытаемся перезапустить через минуту
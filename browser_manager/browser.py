@@ -1,17 +1,21 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.action_chains import ActionChains
-from config.config import FRONTEND_URL, BROWSER_WINDOW_SIZE, SELECTORS, USER_DATA
+from config.config import BASE_URL, LOCATION_PAGE_URL, BROWSER_WINDOW_SIZE, SIDE_FILE, SIDE_FORM_VALUES, HIGHLIGHT_SLOTS
+from config.config import SCREENSHOT_ELEMENT, SCREENSHOT_CLIP, DB_PATH
+from browser_manager.side_runner import load_side_script
+from exceptions.custom_exceptions import SideStepException
+from metrics.prometheus import PARKED_SESSION_CHECKS
 from loguru import logger
 import time
 import json
-from utils.date_utils import check_if_dates_in_range
-import re
-from database.db_handler import DatabaseHandler
+from utils.location_page import collect_location_slots, HIGHLIGHT_SLOTS_SCRIPT
+from utils.slot_series import record_probe
+from utils.screenshots import frame_buffer, is_trace_mode, persist_frame, encode_frame_async, parse_clip, ELEMENT_CLIP_SCRIPT
+from database.db_handler import get_database
+from utils.subscribers import get_subscribers
+from core.subscriptions import describe_range
 
 class BrowserHandler:
     def __init__(self, headless=False, timeout=30):
@@ -58,6 +62,11 @@ class BrowserHandler:
         logger.info("Браузер успешно инициализирован")
         return driver
     
+    def checkout_driver(self):
+        """Берет прогретый драйвер из общего пула (контекстный менеджер)"""
+        from browser_manager.pool import get_driver_pool
+        return get_driver_pool(self).checkout()
+
     def close(self, driver=None):
         """Закрывает браузер"""
         if driver:
@@ -135,8 +144,45 @@ class BrowserHandler:
             logger.error(f"Ошибка при выделении элемента: {e}")
             return False
 
-    def take_screenshot_and_update(self, driver, step_name, chat_ids=None):
-        """Делает скриншот и обновляет сообщение в Telegram"""
+    def highlight_locations(self, driver, locations, color="green"):
+        """Выделяет карточки локаций одним скриптом (отладочный режим)"""
+        try:
+            driver.execute_script(HIGHLIGHT_SLOTS_SCRIPT, [location.standortid for location in locations], color)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при выделении локаций: {e}")
+            return False
+
+    def screenshot_clip(self, driver):
+        """Область отправляемого кадра: SCREENSHOT_CLIP или видимая часть списка локаций"""
+        clip = parse_clip(SCREENSHOT_CLIP)
+        if clip or not SCREENSHOT_ELEMENT:
+            return clip
+        try:
+            rect = driver.execute_script(ELEMENT_CLIP_SCRIPT, SCREENSHOT_ELEMENT)
+        except Exception as e:
+            logger.warning(f"Не удалось определить область скриншота: {e}")
+            return None
+        if isinstance(rect, list) and len(rect) == 4 and rect[2] > 0 and rect[3] > 0:
+            return tuple(rect)
+        return None
+
+    def capture_screenshot(self, driver):
+        """Снимает кадр для отправки: обрезка и сжатие выполняются в рабочем потоке"""
+        png = driver.get_screenshot_as_png()
+        try:
+            return encode_frame_async(png, self.screenshot_clip(driver)).result()
+        except Exception as e:
+            logger.warning(f"Не удалось сжать скриншот, отправляем PNG: {e}")
+            return png
+
+    def take_screenshot_and_update(self, driver, step_name, chat_ids=None, final=False):
+        """
+        Делает скриншот и обновляет сообщение в Telegram.
+        
+        Кадр всегда попадает в буфер для /trace. В рабочем режиме в Telegram
+        уходят только итоговые кадры (final=True): результат проверки или ошибка.
+        """
         try:
             # Если строка шага слишком длинная (например, ошибка), обрезаем её
             if len(step_name) > 100 and step_name.startswith("ОШИБКА"):
@@ -145,33 +191,45 @@ class BrowserHandler:
             # Выводим в лог для отладки
             logger.info(f"Делаем скриншот шага: {step_name}, chat_ids: {chat_ids}")
             
-            # Получаем токен из конфига
-            from config.config import TELEGRAM_TOKEN
-            from utils.notification import update_message_with_photo, last_message_ids, send_photo_with_caption
+            if not final and not is_trace_mode():
+                # Промежуточный кадр сжимается в фоне, шаги сценария не ждут
+                frame_buffer.append(step_name, driver.get_screenshot_as_png(), encode=True)
+                return None
+            
+            png = self.capture_screenshot(driver)
+            frame_buffer.append(step_name, png)
             
-            screenshot_path = f"current_state.png"
-            driver.save_screenshot(screenshot_path)
-            logger.info(f"Шаг: {step_name} - сохранен скриншот: {screenshot_path}")
+            # Итоговый кадр уходит в Telegram байтами, на диск - только по SCREENSHOT_DIR
+            persist_frame(png)
             
             # Если заданы chat_ids, отправляем обновление
             if chat_ids:
-                for chat_id in chat_ids:
-                    # Проверяем, есть ли для этого чата последнее сообщение
-                    if chat_id in last_message_ids:
-                        message_id = last_message_ids[chat_id]
-                        logger.info(f"Обновляем сообщение для {chat_id}, message_id: {message_id}")
-                        update_message_with_photo(chat_id, message_id, step_name, screenshot_path, TELEGRAM_TOKEN)
-                    else:
-                        # Если нет - отправляем новое сообщение
-                        send_photo_with_caption(chat_id, step_name, screenshot_path, TELEGRAM_TOKEN)
+                from utils.notification import broadcast
+                broadcast([
+                    (chat_id, 'status', lambda chat_id=chat_id: self.send_status_frame(chat_id, step_name, png))
+                    for chat_id in chat_ids
+                ])
         
-            return screenshot_path
+            return png
         except Exception as e:
             logger.error(f"Ошибка при создании скриншота: {e}")
             return None
 
+    def send_status_frame(self, chat_id, caption, png):
+        """Обновляет статусное сообщение чата готовым кадром (без обращения к драйверу)"""
+        from config.config import TELEGRAM_TOKEN
+        from utils.notification import update_message_with_photo, last_message_ids, send_photo_with_caption
+        
+        # Проверяем, есть ли для этого чата последнее сообщение
+        if chat_id in last_message_ids:
+            message_id = last_message_ids[chat_id]
+            logger.info(f"Обновляем сообщение для {chat_id}, message_id: {message_id}")
+            return update_message_with_photo(chat_id, message_id, caption, png, TELEGRAM_TOKEN)
+        # Если нет - отправляем новое сообщение
+        return send_photo_with_caption(chat_id, caption, png, TELEGRAM_TOKEN)
+
     def run_selenium_side_script(self, driver, chat_ids=None):
-        """Выполняет скрипт Selenium IDE строго по шагам из lbv.side"""
+        """Выполняет сценарий Selenium IDE из lbv.side через декларативный движок шагов"""
         try:
             # Debug: вывод информации о chat_ids
             logger.info(f"Запуск скрипта с chat_ids: {chat_ids}")
@@ -187,209 +245,67 @@ class BrowserHandler:
                 logger.error("Драйвер не инициализирован!")
                 return False, "Ошибка: Браузер не запустился"
             
-            # Шаг 1: Открываем страницу
-            logger.info("Шаг 1: Открываем страницу")
-            driver.get(f"{FRONTEND_URL}/index.php")
-            time.sleep(2)
-            self.take_screenshot_and_update(driver, "1. Открываем страницу", chat_ids)
+            # Сценарий из .side файла загружается и компилируется один раз на процесс
+            script = load_side_script(SIDE_FILE)
             
-            # Шаг 2: Установка размера окна (уже выполняется при инициализации драйвера)
-            logger.info("Шаг 2: Установка размера окна")
-            driver.set_window_size(BROWSER_WINDOW_SIZE['width'], BROWSER_WINDOW_SIZE['height'])
-            self.take_screenshot_and_update(driver, "2. Установка размера окна", chat_ids)
+            def on_step(step, element):
+                if element is not None:
+                    self.highlight_element(driver, element)
+                self.take_screenshot_and_update(driver, step.caption, chat_ids)
             
-            # Шаг 3: Закрываем модальное окно
-            logger.info("Шаг 3: Закрываем модальное окно")
             try:
-                modal_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORS['modal_button']))
-                )
-                self.highlight_element(driver, modal_button)
-                self.take_screenshot_and_update(driver, "3. Закрываем модальное окно", chat_ids)
-                self.safe_click(driver, modal_button)
-                time.sleep(1)
-            except Exception as e:
-                logger.warning(f"Не удалось закрыть модальное окно: {e} (возможно, его нет)")
-                self.take_screenshot_and_update(driver, "3. Модальное окно не найдено", chat_ids)
+                script.run(driver, values=SIDE_FORM_VALUES, on_step=on_step, base_url=BASE_URL)
+            except SideStepException as e:
+                logger.error(f"Не удалось выполнить шаг {e}")
+                self.take_screenshot_and_update(driver, f"Ошибка: {e.step.caption}", chat_ids, final=True)
+                return False, f"Не удалось выполнить шаг '{e.step.comment or e.step.command}': {e.error}"
             
-            # Шаг 4: Выбираем категорию
-            logger.info("Шаг 4: Выбираем категорию")
-            try:
-                category_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORS['category_button']))
-                )
-                self.highlight_element(driver, category_button)
-                self.take_screenshot_and_update(driver, "4. Выбираем категорию", chat_ids)
-                
-                # Используем JavaScript для клика (избегаем проблем с перекрытием)
-                logger.info("Кликаем на категорию с помощью JavaScript")
-                driver.execute_script("arguments[0].click();", category_button)
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"Не удалось выбрать категорию: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось выбрать категорию", chat_ids)
-                return False, f"Не удалось выбрать категорию: {str(e)}"
-            
-            # Шаг 5: Выбираем услугу
-            logger.info("Шаг 5: Выбираем услугу")
-            try:
-                service_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORS['service_button']))
-                )
-                self.highlight_element(driver, service_button)
-                self.take_screenshot_and_update(driver, "5. Выбираем услугу", chat_ids)
-                self.safe_click(driver, service_button)
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Не удалось выбрать услугу: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось выбрать услугу", chat_ids)
-                return False, f"Не удалось выбрать услугу: {str(e)}"
+            # Проверяем, что мы на странице выбора локации
+            logger.info(f"Текущий URL после заполнения формы: {driver.current_url}")
+            self.take_screenshot_and_update(driver, f"{len(script.steps) + 1}. После перехода на страницу выбора локации", chat_ids)
             
-            # Шаг 6: Нажимаем 'продолжить'
-            logger.info("Шаг 6: Нажимаем 'продолжить'")
-            try:
-                continue_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORS['continue_button']))
-                )
-                self.highlight_element(driver, continue_button)
-                self.take_screenshot_and_update(driver, "6. Нажимаем 'продолжить'", chat_ids)
-                
-                # Скролл вниз, чтобы избежать перекрытия элементов
-                driver.execute_script("window.scrollBy(0, 250);")
-                time.sleep(1)
-                
-                # Используем JavaScript для клика
-                driver.execute_script("arguments[0].click();", continue_button)
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"Не удалось нажать кнопку продолжить: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось нажать кнопку продолжить", chat_ids)
-                return False, f"Не удалось нажать кнопку продолжить: {str(e)}"
-            
-            # Шаг 7: Устанавливаем галочку согласия
-            logger.info("Шаг 7: Устанавливаем галочку согласия")
-            try:
-                privacy_checkbox = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, SELECTORS['privacy_checkbox']))
-                )
-                self.highlight_element(driver, privacy_checkbox)
-                self.take_screenshot_and_update(driver, "7. Устанавливаем галочку согласия", chat_ids)
-                
-                # Используем JavaScript для установки галочки
-                driver.execute_script("arguments[0].click();", privacy_checkbox)
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Не удалось установить галочку согласия: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось установить галочку согласия", chat_ids)
-                return False, f"Не удалось установить галочку согласия: {str(e)}"
-            
-            # Шаг 8: Нажимаем кнопку "weiter"
-            logger.info("Шаг 8: Нажимаем кнопку 'weiter'")
-            try:
-                next_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "weiterbutton"))
-                )
-                self.highlight_element(driver, next_button)
-                self.take_screenshot_and_update(driver, "8. Нажимаем кнопку 'weiter'", chat_ids)
-                
-                # Используем JavaScript для клика
-                driver.execute_script("arguments[0].click();", next_button)
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"Не удалось нажать кнопку weiter: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось нажать кнопку weiter", chat_ids)
-                return False, f"Не удалось нажать кнопку weiter: {str(e)}"
-            
-            # Шаг 9: Заполняем поле имени
-            logger.info("Шаг 9: Заполняем поле имени")
-            try:
-                firstname_field = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "vorname"))
-                )
-                self.highlight_element(driver, firstname_field)
-                self.take_screenshot_and_update(driver, "9. Заполняем поле имени", chat_ids)
-                
-                firstname_field.click()
-                firstname_field.clear()
-                firstname_field.send_keys(USER_DATA['firstname'])
-                time.sleep(0.5)
-            except Exception as e:
-                logger.error(f"Не удалось заполнить поле имени: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось заполнить поле имени", chat_ids)
-                return False, f"Не удалось заполнить поле имени: {str(e)}"
-            
-            # Шаг 10: Заполняем поле фамилии
-            logger.info("Шаг 10: Заполняем поле фамилии")
-            try:
-                lastname_field = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "nachname"))
-                )
-                self.highlight_element(driver, lastname_field)
-                lastname_field.clear()
-                lastname_field.send_keys(USER_DATA['lastname'])
-                time.sleep(0.5)
-            except Exception as e:
-                logger.error(f"Не удалось заполнить поле фамилии: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось заполнить поле фамилии", chat_ids)
-                return False, f"Не удалось заполнить поле фамилии: {str(e)}"
-            
-            # Шаг 11: Заполняем поле email
-            logger.info("Шаг 11: Заполняем поле email")
-            try:
-                email_field = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "email"))
-                )
-                self.highlight_element(driver, email_field)
-                email_field.clear()
-                email_field.send_keys(USER_DATA['email'])
-                time.sleep(0.5)
-                
-                # Делаем скриншот заполненной формы
-                self.take_screenshot_and_update(driver, "11. Форма персональных данных заполнена", chat_ids)
-            except Exception as e:
-                logger.error(f"Не удалось заполнить поле email: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось заполнить поле email", chat_ids)
-                return False, f"Не удалось заполнить поле email: {str(e)}"
-            
-            # Шаг 12: Нажимаем кнопку "weiter" для перехода к выбору локации
-            logger.info("Шаг 12: Нажимаем кнопку 'weiter' для перехода к выбору локации")
-            try:
-                final_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "weiterbutton"))
-                )
-                self.highlight_element(driver, final_button)
-                self.take_screenshot_and_update(driver, "12. Нажимаем кнопку 'weiter' для перехода к выбору локации", chat_ids)
-                
-                # Используем JavaScript для клика
-                driver.execute_script("arguments[0].click();", final_button)
-                time.sleep(3)  # Даем время для загрузки страницы
-                
-                # Проверяем, что мы на странице выбора локации
-                current_url = driver.current_url
-                logger.info(f"Текущий URL после заполнения формы: {current_url}")
-                
-                self.take_screenshot_and_update(driver, "13. После перехода на страницу выбора локации", chat_ids)
-                
-                # Проверяем наличие доступных слотов на этой странице
-                return self.check_slots_on_location_page(driver, chat_ids)
-                
-            except Exception as e:
-                logger.error(f"Не удалось перейти к выбору локации: {e}")
-                self.take_screenshot_and_update(driver, "Ошибка: не удалось перейти к выбору локации", chat_ids)
-                return False, f"Не удалось перейти к выбору локации: {str(e)}"
+            # Проверяем наличие доступных слотов на этой странице
+            return self.check_slots_on_location_page(driver, chat_ids)
             
         except Exception as e:
             error_message = str(e)
             logger.error(f"Ошибка при выполнении скрипта: {error_message}")
             # Сделаем скриншот для анализа ошибки
             try:
-                driver.save_screenshot("error_state.png")
-                logger.info("Сохранен скриншот состояния при ошибке: error_state.png")
-                self.take_screenshot_and_update(driver, f"ОШИБКА: {error_message}", chat_ids)
+                self.take_screenshot_and_update(driver, f"ОШИБКА: {error_message}", chat_ids, final=True)
             except:
                 pass
             return False, error_message
     
+    def is_parked(self, driver):
+        """Проверяет, что драйвер стоит на странице выбора локации"""
+        return 'standortauswahl.php' in (driver.current_url or '')
+
+    def run_parked_check(self, driver, chat_ids=None):
+        """
+        Проверка в режиме "припаркованной" сессии.
+        
+        Если драйвер уже стоит на странице выбора локации, страница просто
+        запрашивается заново. Полный проход по шагам выполняется только при
+        первом запуске или когда сессия сайта истекла (редирект на index.php).
+        """
+        if self.is_parked(driver):
+            if not chat_ids:
+                from utils.notification import load_chat_ids
+                chat_ids = load_chat_ids()
+            
+            logger.info("Обновляем страницу выбора локации в припаркованной сессии")
+            driver.get(LOCATION_PAGE_URL)
+            
+            if self.is_parked(driver):
+                PARKED_SESSION_CHECKS.labels(mode='refresh').inc()
+                return self.check_slots_on_location_page(driver, chat_ids)
+            
+            logger.info(f"Сессия истекла (текущий URL: {driver.current_url}), выполняем полный проход")
+        
+        PARKED_SESSION_CHECKS.labels(mode='replay').inc()
+        return self.run_selenium_side_script(driver, chat_ids)
+
     def check_booking_availability(self, driver):
         """Проверяет доступность слотов, запуская скрипт из lbv.side"""
         return self.run_selenium_side_script(driver)
@@ -399,115 +315,121 @@ class BrowserHandler:
         try:
             logger.info("Проверка доступных слотов на странице выбора локации")
             
-            # Проверяем наличие кнопок выбора (auswählen)
-            select_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'auswählen')]")
-            clickable_buttons = []
-            available_dates = []
-
-            # Проверяем каждую кнопку на возможность нажатия
-            for button in select_buttons:
-                try:
-                    if button.is_displayed() and button.is_enabled():
-                        clickable_buttons.append(button)
-                        # Ищем связанную дату для этой кнопки
-                        parent = button.find_element(By.XPATH, "./ancestor::tr")
-                        date_element = parent.find_element(By.XPATH, ".//div[contains(text(), 'Termine verfügbar ab')]")
-                        date_text = date_element.text.strip()
-                        date_match = re.search(r'(\d{2}\.\d{2}\.\d{4})', date_text)
-                        if date_match:
-                            available_dates.append(date_match.group(1))
-                            self.highlight_element(driver, date_element, "green")
-                            self.highlight_element(driver, button, "green")
-                except Exception as e:
-                    logger.error(f"Ошибка при проверке кнопки: {e}")
-                    continue
+            # Состояние всех локаций собирается одним скриптом вместо обхода элементов через WebDriver
+            locations = collect_location_slots(driver)
+            record_probe(locations)
+            open_locations = [location for location in locations if location.available]
+            available_dates = [location.earliest_date for location in open_locations if location.earliest_date]
+            if HIGHLIGHT_SLOTS and open_locations:
+                self.highlight_locations(driver, open_locations)
 
-            if clickable_buttons:
-                logger.info(f"Найдено {len(clickable_buttons)} активных кнопок 'auswählen'")
+            if open_locations:
+                logger.info(f"Найдено {len(open_locations)} активных кнопок 'auswählen'")
                 
                 # Формируем базовое сообщение
                 if available_dates:
                     dates_text = ", ".join(available_dates)
                     message = f"Доступна запись на даты: {dates_text}"
                 else:
-                    message = f"Найдено {len(clickable_buttons)} доступных слотов (даты не определены)"
+                    message = f"Найдено {len(open_locations)} доступных слотов (даты не определены)"
 
                 # Обрабатываем уведомления для каждого пользователя
                 if chat_ids:
-                    for chat_id in chat_ids:
-                        try:
-                            # Получаем предпочтительный диапазон из базы данных
-                            db_path = "database/booking_bot.db"
-                            db = DatabaseHandler(db_path)
-                            preferred_range = db.get_user_preferred_dates(chat_id) or 'any'
-                            
-                            # Проверяем, соответствуют ли найденные даты предпочтениям
-                            is_preferred = True
-                            if available_dates and preferred_range != 'any':
-                                from utils.date_utils import check_if_dates_in_range
-                                is_preferred = check_if_dates_in_range(available_dates, preferred_range)
-                            
-                            # Получаем читаемое название диапазона
-                            range_text = {
-                                'week': 'неделя',
-                                'two_weeks': 'две недели',
-                                'month': 'месяц',
-                                'any': 'любой период'
-                            }.get(preferred_range, 'любой период')
-
-                            if is_preferred:
-                                # Даты в выбранном диапазоне - отправляем новое уведомление со звуком
-                                notification_text = (
-                                    f"🚨 *СРОЧНО! НАЙДЕНЫ СЛОТЫ!*\n\n"
-                                    f"✅ {message}\n"
-                                    f"📅 Даты соответствуют выбранному диапазону: *{range_text}*\n\n"
-                                    f"❗️ Перейдите на сайт и нажмите кнопку 'auswählen'!"
-                                )
-                                
-                                logger.info(f"Отправка нового уведомления для {chat_id} (даты в диапазоне)")
-                                token = self.get_telegram_token()
-                                from utils.notification import send_telegram_notification
-                                send_telegram_notification(
-                                    chat_id,
-                                    notification_text,
-                                    "current_state.png",
-                                    token,
-                                    disable_notification=False
-                                )
-                            else:
-                                # Даты не в диапазоне - обновляем существующее сообщение
-                                notification_text = (
-                                    f"ℹ️ *Статус мониторинга*\n\n"
-                                    f"👉 {message}\n"
-                                    f"⚠️ Найденные даты вне выбранного диапазона\n"
-                                    f"📅 Ваш диапазон: *{range_text}*\n\n"
-                                    f"_Используйте команду 'старт' для изменения диапазона_"
-                                )
-                                
-                                logger.info(f"Обновление статуса для {chat_id} (даты не в диапазоне)")
-                                self.take_screenshot_and_update(driver, notification_text, [chat_id])
-                                
-                        except Exception as e:
-                            logger.error(f"Ошибка при обработке уведомлений: {e}")
-                            continue
+                    self.broadcast_slots(driver, chat_ids, message, available_dates)
 
                 return True, message
             else:
                 # Если нет активных кнопок, обновляем статус
                 status_message = "ℹ️ *Статус мониторинга*\n\n❌ Нет доступных слотов"
                 if chat_ids:
-                    for chat_id in chat_ids:
-                        self.take_screenshot_and_update(driver, status_message, [chat_id])
+                    # Один кадр на всех получателей, рассылка параллельная
+                    self.take_screenshot_and_update(driver, status_message, chat_ids, final=True)
                 return False, "Нет доступных слотов"
 
         except Exception as e:
             logger.error(f"Ошибка при проверке слотов: {e}")
             error_message = f"ℹ️ *Статус мониторинга*\n\n⚠️ Ошибка при проверке: {str(e)}"
             if chat_ids:
-                for chat_id in chat_ids:
-                    self.take_screenshot_and_update(driver, error_message, [chat_id])
+                self.take_screenshot_and_update(driver, error_message, chat_ids, final=True)
             return False, f"Ошибка: {str(e)}"
 
+    def broadcast_slots(self, driver, chat_ids, message, available_dates):
+        """
+        Рассылает найденные слоты всем подписчикам параллельно.
+        
+        Кадр снимается один раз. Пользователи, чей диапазон совпал с найденными
+        датами, получают срочное уведомление первыми, остальным затем обновляется
+        статусное сообщение.
+        """
+        from utils.notification import send_telegram_notification, broadcast
+        
+        # Итоговый кадр снимается один раз и отправляется прямо из памяти
+        png = self.capture_screenshot(driver)
+        frame_buffer.append(message, png)
+        persist_frame(png)
+        token = self.get_telegram_token()
+        
+        # Диапазоны дат берутся из памяти реестра подписчиков (и кэша базы для остальных чатов)
+        subscribers = get_subscribers()
+        # Подписчики, в чей диапазон попали найденные даты, - одной выборкой по индексу
+        in_range = subscribers.matching(None, available_dates)
+        db = get_database(DB_PATH)
+        alerts, statuses = [], []
+        for chat_id in chat_ids:
+            try:
+                subscription = subscribers.get(chat_id)
+                if subscription is not None:
+                    preferred_range = subscription.preferred_range
+                    is_preferred = int(chat_id) in in_range
+                else:
+                    preferred_range = db.get_user_preferred_dates(chat_id) or 'any'
+                    
+                    # Чат не в реестре - проверяем даты по его диапазону отдельно
+                    is_preferred = True
+                    if available_dates and preferred_range != 'any':
+                        from utils.date_utils import check_if_dates_in_range
+                        is_preferred = check_if_dates_in_range(available_dates, preferred_range)
+                
+                # Получаем читаемое название диапазона
+                range_text = describe_range(preferred_range)
+                
+                if is_preferred:
+                    # Даты в выбранном диапазоне - отправляем новое уведомление со звуком
+                    notification_text = (
+                        f"🚨 *СРОЧНО! НАЙДЕНЫ СЛОТЫ!*\n\n"
+                        f"✅ {message}\n"
+                        f"📅 Даты соответствуют выбранному диапазону: *{range_text}*\n\n"
+                        f"❗️ Перейдите на сайт и нажмите кнопку 'auswählen'!"
+                    )
+                    logger.info(f"Отправка нового уведомления для {chat_id} (даты в диапазоне)")
+                    alerts.append((chat_id, 'alert', lambda chat_id=chat_id, text=notification_text: send_telegram_notification(
+                        chat_id,
+                        text,
+                        png,
+                        token,
+                        disable_notification=False
+                    )))
+                else:
+                    # Даты не в диапазоне - обновляем существующее сообщение
+                    notification_text = (
+                        f"ℹ️ *Статус мониторинга*\n\n"
+                        f"👉 {message}\n"
+                        f"⚠️ Найденные даты вне выбранного диапазона\n"
+                        f"📅 Ваш диапазон: *{range_text}*\n\n"
+                        f"_Используйте команду 'старт' для изменения диапазона_"
+                    )
+                    logger.info(f"Обновление статуса для {chat_id} (даты не в диапазоне)")
+                    statuses.append((chat_id, 'status', lambda chat_id=chat_id, text=notification_text: self.send_status_frame(
+                        chat_id,
+                        text,
+                        png
+                    )))
+            except Exception as e:
+                logger.error(f"Ошибка при обработке уведомлений: {e}")
+                continue
+        
+        return broadcast(alerts + statuses)
+
     def get_telegram_token(self):
         """Безопасно получает токен Telegram из конфигурации."""
         try:
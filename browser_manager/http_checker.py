@@ -0,0 +1,246 @@
+"""
+HTTP-движок проверки без браузера.
+
+Сайт записи - обычная цепочка PHP-страниц: index.php, выбор категории и
+услуги, затем несколько форм (согласие, контактные данные) и страница выбора
+локации. Движок проходит эту цепочку прямыми запросами через одну сессию
+requests с пулом соединений и cookies, а результат разбирает парсером
+utils.location_page. Пока сессия сайта жива, проверка - это один GET
+страницы выбора локации (несколько КБ вместо целого Chrome).
+"""
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+from config.config import FRONTEND_URL, USER_DATA, HTTP_TIMEOUT, HTTP_POOL_SIZE
+from core.probe import ProbeResult
+from exceptions.custom_exceptions import SlotCheckException
+from metrics.prometheus import HTTP_CHECKS, HTTP_CHECK_DURATION, HTTP_RESPONSE_BYTES
+from utils.location_page import parse_location_page
+from utils.slot_series import record_probe
+
+CALL_URL_RE = re.compile(r"callURL\('([^']+)'")
+
+LOCATION_PAGE = 'standortauswahl.php'
+
+# Заголовки обычного браузера: сайт отдает те же страницы, что и Chrome
+DEFAULT_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8'
+}
+
+
+class _Form:
+    """Форма страницы в виде, достаточном для отправки."""
+
+    def __init__(self, action, method):
+        self.action = action
+        self.method = method
+        self.fields = []
+        self.submit = None
+
+
+class _PageParser(HTMLParser):
+    """Собирает формы и адреса перехода кнопок 'LBV-choosebutton' за один проход."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.next_urls = []
+        self._form = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._form = _Form(attrs.get('action') or '', (attrs.get('method') or 'get').lower())
+            self.forms.append(self._form)
+        elif tag == 'button':
+            if 'LBV-choosebutton' in (attrs.get('class') or '') and 'disabled' not in attrs:
+                match = CALL_URL_RE.search(attrs.get('onclick') or '')
+                if match:
+                    self.next_urls.append(match.group(1))
+            if self._form is not None and attrs.get('name') and self._form.submit is None:
+                if (attrs.get('type') or 'submit').lower() == 'submit':
+                    self._form.submit = (attrs['name'], attrs.get('value') or '')
+        elif tag in ('input', 'textarea', 'select') and self._form is not None:
+            self._add_field(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+
+    def _add_field(self, tag, attrs):
+        name = attrs.get('name')
+        if not name:
+            return
+        field_type = (attrs.get('type') or 'text').lower() if tag == 'input' else tag
+        if field_type in ('submit', 'image'):
+            if self._form.submit is None:
+                self._form.submit = (name, attrs.get('value') or '')
+            return
+        if field_type in ('button', 'reset', 'file'):
+            return
+        # Чекбоксы на этих страницах - согласия, которые сценарий всегда отмечает
+        default = 'on' if field_type in ('checkbox', 'radio') else ''
+        self._form.fields.append((name, attrs.get('id'), attrs.get('value') or default))
+
+
+def parse_page(html):
+    """Возвращает (формы, адреса переходов) страницы."""
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.forms, parser.next_urls
+
+
+class HttpBookingChecker:
+    """
+    Проверка доступности слотов прямыми HTTP-запросами.
+
+    На каждую услугу держится своя сессия сайта: выбранная услуга хранится
+    на стороне сервера в cookie-сессии.
+    """
+
+    MAX_STEPS = 8
+
+    def __init__(self, base_url=FRONTEND_URL, service_id=147, category_id=1,
+                 form_values=None, timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.service_id = service_id
+        self.category_id = category_id
+        self.form_values = form_values or {
+            'vorname': USER_DATA['firstname'],
+            'nachname': USER_DATA['lastname'],
+            'email': USER_DATA['email']
+        }
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, service_id):
+        with self._lock:
+            session = self.sessions.get(service_id)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[service_id] = session
+            return session
+
+    def _reset_session(self, service_id):
+        with self._lock:
+            session = self.sessions.pop(service_id, None)
+        if session is not None:
+            session.close()
+
+    def _request(self, session, method, url, **kwargs):
+        response = session.request(method, urljoin(self.base_url, url), timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        HTTP_RESPONSE_BYTES.inc(len(response.content))
+        return response
+
+    @staticmethod
+    def _is_location_page(response):
+        return LOCATION_PAGE in response.url
+
+    def fetch_location_page(self, service_id=None):
+        """
+        Возвращает (html, mode) страницы выбора локации.
+
+        mode = 'refresh', если хватило одного запроса в живой сессии,
+        и 'replay', если цепочку страниц пришлось пройти заново.
+        """
+        service_id = service_id or self.service_id
+        session = self._session(service_id)
+
+        if session.cookies:
+            response = self._request(session, 'GET', LOCATION_PAGE)
+            if self._is_location_page(response):
+                return response.text, 'refresh'
+            logger.info(f"Сессия сайта истекла (URL: {response.url}), проходим цепочку заново")
+
+        return self._replay(session, service_id).text, 'replay'
+
+    def _replay(self, session, service_id):
+        """Проходит цепочку страниц от index.php до выбора локации."""
+        self._request(session, 'GET', 'index.php')
+        self._request(session, 'GET', f'dienstleistungsauswahl.php?kategorieid={self.category_id}')
+        response = self._request(session, 'GET', f'onlinedienstleistung.php?dienstleistungsid={service_id}')
+
+        for _ in range(self.MAX_STEPS):
+            if self._is_location_page(response):
+                return response
+
+            forms, next_urls = parse_page(response.text)
+            if forms:
+                response = self._submit(session, response.url, forms[0])
+            elif next_urls:
+                response = self._request(session, 'GET', urljoin(response.url, next_urls[0]))
+            else:
+                break
+
+        if self._is_location_page(response):
+            return response
+        raise SlotCheckException(f"Не удалось дойти до страницы выбора локации (остановились на {response.url})")
+
+    def _submit(self, session, page_url, form):
+        """Отправляет форму, подставляя контактные данные по name или id поля."""
+        data = []
+        for name, field_id, value in form.fields:
+            value = self.form_values.get(name, self.form_values.get(field_id, value))
+            data.append((name, value))
+        if form.submit:
+            data.append(form.submit)
+
+        action = urljoin(page_url, form.action or page_url)
+        logger.debug(f"Отправка формы {action} ({form.method})")
+        if form.method == 'post':
+            return self._request(session, 'POST', action, data=data)
+        return self._request(session, 'GET', action, params=data)
+
+    def probe(self, service_id=None):
+        """Одна проверка услуги, результат в виде ProbeResult."""
+        service_id = service_id or self.service_id
+        started = time.perf_counter()
+        mode = 'replay'
+        try:
+            html, mode = self.fetch_location_page(service_id)
+            locations = parse_location_page(html)
+            record_probe(locations)
+            result = ProbeResult.from_locations(service_id, locations)
+            HTTP_CHECKS.labels(mode=mode, result='available' if result.available else 'unavailable').inc()
+            return result
+        except Exception as e:
+            logger.error(f"Ошибка HTTP-проверки услуги {service_id}: {e}")
+            # Сессия в неизвестном состоянии - следующая проверка начнет цепочку заново
+            self._reset_session(service_id)
+            HTTP_CHECKS.labels(mode=mode, result='error').inc()
+            return ProbeResult(service_id=service_id, available=False, error=str(e))
+        finally:
+            HTTP_CHECK_DURATION.observe(time.perf_counter() - started)
+
+    def check_booking_availability(self, service_id=None):
+        """Проверяет доступность слотов, возвращает (available, message) как BrowserHandler."""
+        result = self.probe(service_id)
+        logger.info(f"HTTP-проверка: доступность={result.available}, сообщение={result.message}")
+        return result.available, result.error or result.message
+
+    def close(self):
+        """Закрывает все сессии и их соединения."""
+        with self._lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+        for session in sessions:
+            session.close()
@@ -0,0 +1,51 @@
+"""
+Припаркованная сессия: драйвер между проверками остается на странице
+выбора локации, поэтому каждая следующая проверка - это одна загрузка страницы,
+а не повтор всех шагов сценария.
+"""
+from loguru import logger
+
+from browser_manager.pool import get_driver_pool
+
+
+class ParkedSession:
+    """
+    Держит драйвер из пула занятым на все время мониторинга.
+
+    Каждая проверка считается использованием драйвера: после max_uses пула
+    драйвер возвращается на пересоздание, как при обычной выдаче из пула.
+    """
+
+    def __init__(self, handler, pool=None):
+        self.handler = handler
+        self.pool = pool or get_driver_pool(handler)
+        self.driver = None
+        self.uses = 0
+
+    def check(self, chat_ids=None):
+        """Выполняет проверку, переиспользуя припаркованный драйвер."""
+        if self.driver is None:
+            self.driver = self.pool.acquire()
+            self.uses = 0
+
+        try:
+            result = self.handler.run_parked_check(self.driver, chat_ids)
+        except Exception as e:
+            # Драйвер в неизвестном состоянии - отдаем его пулу на пересоздание
+            logger.error(f"Ошибка в припаркованной сессии, драйвер будет пересоздан: {e}")
+            self.pool.release(self.driver, discard=True, uses=self.uses + 1)
+            self.driver = None
+            raise
+
+        self.uses += 1
+        if self.uses >= self.pool.max_uses:
+            logger.info(f"Припаркованный драйвер выработал {self.uses} проверок, возвращаем в пул")
+            self.close()
+        return result
+
+    def close(self):
+        """Возвращает драйвер в пул."""
+        if self.driver is not None:
+            self.pool.release(self.driver, uses=max(self.uses, 1))
+            self.driver = None
+            self.uses = 0
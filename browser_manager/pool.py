@@ -0,0 +1,291 @@
+"""
+Пул прогретых драйверов Chrome.
+
+Холодный старт Chrome - самая дорогая часть каждой проверки, поэтому драйверы
+не закрываются после проверки, а возвращаются в пул и переиспользуются.
+Драйвер пересоздается после заданного числа использований, при превышении
+лимита памяти или если он перестал отвечать.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from loguru import logger
+
+from metrics.prometheus import (
+    DRIVER_POOL_CHECKOUTS,
+    DRIVER_POOL_CHECKOUT_DURATION,
+    DRIVER_POOL_DRIVERS,
+    DRIVER_POOL_RECYCLED
+)
+
+# Один вызов execute_script одновременно проверяет, что драйвер жив,
+# и возвращает размер JS-кучи страницы (Chrome-специфичное performance.memory)
+HEALTH_CHECK_SCRIPT = (
+    "return (window.performance && performance.memory) "
+    "? performance.memory.usedJSHeapSize : 0;"
+)
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить драйвер из пула за отведенное время."""
+    pass
+
+
+class PooledDriver:
+    """Драйвер пула вместе со счетчиком использований."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """
+    Потокобезопасный пул драйверов Chrome с семантикой checkout/return.
+
+    Args:
+        factory: функция без аргументов, создающая новый драйвер
+        destroy: функция, закрывающая драйвер
+        min_size: сколько драйверов держать прогретыми
+        max_size: максимальное количество одновременно живых драйверов
+        max_uses: после скольких проверок драйвер пересоздается
+        max_memory_mb: предел JS-кучи страницы, после которого драйвер пересоздается
+        checkout_timeout: сколько ждать свободный драйвер, если пул исчерпан
+    """
+
+    def __init__(self, factory, destroy, min_size=1, max_size=2, max_uses=20,
+                 max_memory_mb=512, checkout_timeout=120):
+        self._factory = factory
+        self._destroy = destroy
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()
+        self._busy = {}
+        self._creating = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        """Общее количество драйверов (свободных, занятых и создаваемых)."""
+        return len(self._idle) + len(self._busy) + self._creating
+
+    def warm_up(self):
+        """Создает драйверы до min_size, чтобы первая проверка попала в пул."""
+        while True:
+            with self._cond:
+                if self._closed or self.size >= self.min_size:
+                    return
+                self._creating += 1
+            entry = self._create()
+            with self._cond:
+                self._creating -= 1
+                if entry:
+                    self._idle.append(entry)
+                self._update_gauges()
+                self._cond.notify()
+            if not entry:
+                return
+
+    def start_warm_up(self):
+        """Запускает warm_up в фоновом потоке, чтобы не ждать запуска Chrome."""
+        thread = threading.Thread(target=self.warm_up, name="driver-pool-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def acquire(self, timeout=None):
+        """Выдает драйвер из пула, при необходимости создавая новый."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Пул драйверов закрыт")
+                    if self._idle:
+                        entry = self._idle.popleft()
+                        break
+                    if self.size < self.max_size:
+                        self._creating += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        DRIVER_POOL_CHECKOUTS.labels(result='timeout').inc()
+                        raise PoolTimeoutError(f"Нет свободного драйвера за {timeout} сек.")
+                    self._cond.wait(remaining)
+
+            created = entry is None
+            if created:
+                # Пул пуст - холодный старт
+                try:
+                    entry = self._create(raise_errors=True)
+                except Exception:
+                    with self._cond:
+                        self._creating -= 1
+                        self._cond.notify()
+                    raise
+            elif self._memory_mb(entry) is None:
+                # Драйвер из пула умер, пересоздаем и пробуем снова
+                self._discard(entry, 'unhealthy')
+                continue
+
+            with self._cond:
+                if created:
+                    self._creating -= 1
+                self._busy[id(entry.driver)] = entry
+                self._update_gauges()
+            result = 'miss' if created else 'hit'
+
+            DRIVER_POOL_CHECKOUTS.labels(result=result).inc()
+            DRIVER_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+            logger.debug(f"Драйвер выдан из пула ({result}), драйверов в пуле: {self.size}")
+            return entry.driver
+
+    def release(self, driver, discard=False, uses=1):
+        """
+        Возвращает драйвер в пул или пересоздает его, если он выработал ресурс.
+
+        uses - сколько проверок выполнено за время выдачи (больше одной у
+        припаркованной сессии).
+        """
+        with self._cond:
+            entry = self._busy.pop(id(driver), None)
+        if entry is None:
+            logger.warning("Попытка вернуть в пул драйвер, который из него не выдавался")
+            self._destroy(driver)
+            return
+
+        entry.uses += uses
+        reason = None
+        if discard:
+            reason = 'error'
+        elif self._closed:
+            reason = 'closed'
+        elif entry.uses >= self.max_uses:
+            reason = 'uses'
+        else:
+            memory_mb = self._memory_mb(entry)
+            if memory_mb is None:
+                reason = 'unhealthy'
+            elif memory_mb > self.max_memory_mb:
+                reason = 'memory'
+
+        if reason is None:
+            try:
+                # Новая проверка начинается с чистой сессии сайта
+                driver.delete_all_cookies()
+            except Exception as e:
+                logger.warning(f"Не удалось очистить cookies драйвера: {e}")
+                reason = 'unhealthy'
+
+        if reason:
+            self._discard(entry, reason)
+            return
+
+        with self._cond:
+            self._idle.append(entry)
+            self._update_gauges()
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Контекстный менеджер: берет драйвер и гарантированно возвращает его в пул."""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Закрывает все свободные драйверы; занятые закроются при возврате."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._update_gauges()
+            self._cond.notify_all()
+        for entry in idle:
+            self._destroy(entry.driver)
+        logger.info("Пул драйверов закрыт")
+
+    def _create(self, raise_errors=False):
+        try:
+            return PooledDriver(self._factory())
+        except Exception as e:
+            logger.error(f"Не удалось создать драйвер для пула: {e}")
+            if raise_errors:
+                raise
+            return None
+
+    def _discard(self, entry, reason):
+        logger.info(f"Пересоздаем драйвер пула (причина: {reason}, использований: {entry.uses})")
+        DRIVER_POOL_RECYCLED.labels(reason=reason).inc()
+        self._destroy(entry.driver)
+        with self._cond:
+            self._update_gauges()
+            self._cond.notify()
+        if not self._closed and self.size < self.min_size:
+            # Пополняем пул в фоне, чтобы следующая проверка не ждала запуска Chrome
+            self.start_warm_up()
+
+    def _memory_mb(self, entry):
+        """Размер JS-кучи в МБ или None, если драйвер не отвечает."""
+        try:
+            heap = entry.driver.execute_script(HEALTH_CHECK_SCRIPT) or 0
+            return heap / (1024 * 1024)
+        except Exception as e:
+            logger.warning(f"Драйвер пула не прошел проверку здоровья: {e}")
+            return None
+
+    def _update_gauges(self):
+        DRIVER_POOL_DRIVERS.labels(state='idle').set(len(self._idle))
+        DRIVER_POOL_DRIVERS.labels(state='busy').set(len(self._busy))
+
+
+# Общие пулы процесса, по одному на каждую конфигурацию браузера
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(handler):
+    """Возвращает общий пул драйверов для конфигурации BrowserHandler."""
+    key = (handler.headless, handler.timeout)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            from config.config import (
+                DRIVER_POOL_MIN_SIZE,
+                DRIVER_POOL_MAX_SIZE,
+                DRIVER_POOL_MAX_USES,
+                DRIVER_POOL_MAX_MEMORY_MB
+            )
+            pool = DriverPool(
+                handler.init_driver,
+                handler.close,
+                min_size=DRIVER_POOL_MIN_SIZE,
+                max_size=DRIVER_POOL_MAX_SIZE,
+                max_uses=DRIVER_POOL_MAX_USES,
+                max_memory_mb=DRIVER_POOL_MAX_MEMORY_MB
+            )
+            _pools[key] = pool
+            # Первая проверка после запуска тоже должна попасть в прогретый пул
+            pool.start_warm_up()
+    return pool
+
+
+def close_driver_pools():
+    """Закрывает все общие пулы (при завершении приложения)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,188 @@
+"""
+Декларативный движок шагов на основе файла Selenium IDE (lbv.side).
+
+Файл читается и компилируется один раз: каждая команда превращается в шаг
+с готовым локатором. Шаги выполняются без фиксированных пауз - только с
+ожиданием условий (кликабельность элемента, смена страницы). Время каждого
+шага пишется в отдельную гистограмму Prometheus.
+"""
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urljoin
+from loguru import logger
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from exceptions.custom_exceptions import ConfigurationException, SideStepException
+from metrics.prometheus import SIDE_STEP_DURATION
+
+# Префиксы локаторов Selenium IDE
+LOCATOR_STRATEGIES = {
+    'css': By.CSS_SELECTOR,
+    'id': By.ID,
+    'name': By.NAME,
+    'xpath': By.XPATH,
+    'linkText': By.LINK_TEXT
+}
+
+# Кликает по элементу и сообщает, приведет ли клик к переходу на другую страницу.
+# <button> без type тоже имеет type 'submit', но вне формы никуда не переходит.
+CLICK_SCRIPT = """
+var e = arguments[0];
+var onclick = e.getAttribute('onclick') || '';
+var navigates = !!e.closest('a[href]') || /callURL|location|submit/.test(onclick)
+    || (e.type === 'submit' && !!e.form) || (e.tagName === 'INPUT' && e.type === 'button' && !!e.form);
+e.click();
+return navigates;
+"""
+
+# Таймаут для шагов, помеченных в комментарии как [optional]
+OPTIONAL_STEP_TIMEOUT = 3
+
+
+class SideStep:
+    """Скомпилированная команда сценария."""
+
+    def __init__(self, index, command, target, value='', comment=''):
+        self.index = index
+        self.command = command
+        self.target = target
+        self.value = value
+        self.optional = comment.startswith('[optional]')
+        self.comment = comment.replace('[optional]', '', 1).strip()
+        self.locator = parse_locator(target) if command in ('click', 'type') else None
+
+    @property
+    def caption(self):
+        """Подпись шага для логов и скриншотов."""
+        if self.comment:
+            return f"{self.index}. {self.comment}"
+        return f"{self.index}. {self.command} {self.target}"
+
+    def __repr__(self):
+        return f"SideStep({self.index}, {self.command!r}, {self.target!r})"
+
+
+def parse_locator(target):
+    """Преобразует локатор Selenium IDE ('css=...', 'id=...') в пару (By, значение)."""
+    prefix, sep, value = target.partition('=')
+    if not sep or prefix not in LOCATOR_STRATEGIES:
+        raise ConfigurationException(f"Неподдерживаемый локатор в .side файле: {target}")
+    return LOCATOR_STRATEGIES[prefix], value
+
+
+class SideScript:
+    """Сценарий из .side файла, готовый к многократному выполнению."""
+
+    SUPPORTED_COMMANDS = ('open', 'setWindowSize', 'click', 'type')
+
+    def __init__(self, name, base_url, steps):
+        self.name = name
+        self.base_url = base_url
+        self.steps = steps
+
+    @classmethod
+    def load(cls, path, test_name=None):
+        """Читает .side файл и компилирует команды теста."""
+        with open(path, encoding='utf-8') as f:
+            project = json.load(f)
+
+        tests = project.get('tests', [])
+        if test_name:
+            tests = [t for t in tests if t.get('name') == test_name]
+        if not tests:
+            raise ConfigurationException(f"В файле {path} нет теста {test_name or ''}".strip())
+        test = tests[0]
+
+        steps = []
+        for command in test['commands']:
+            if command['command'] not in cls.SUPPORTED_COMMANDS:
+                raise ConfigurationException(f"Неподдерживаемая команда в .side файле: {command['command']}")
+            steps.append(SideStep(
+                len(steps) + 1,
+                command['command'],
+                command['target'],
+                command.get('value', ''),
+                command.get('comment', '')
+            ))
+
+        logger.info(f"Сценарий '{test['name']}' загружен из {path}: {len(steps)} шагов")
+        return cls(test['name'], project.get('url', ''), steps)
+
+    def run(self, driver, values=None, on_step=None, timeout=10, base_url=None):
+        """
+        Выполняет все шаги сценария.
+
+        Args:
+            driver: драйвер Selenium
+            values: значения для команд type по целевому локатору, например {'id=vorname': 'Max'}
+            on_step: callback(step, element), вызывается перед действием шага
+            timeout: максимальное ожидание условия для одного шага
+            base_url: базовый адрес для команды open (по умолчанию из .side файла)
+
+        Raises:
+            SideStepException: если обязательный шаг не удалось выполнить
+        """
+        values = values or {}
+        base_url = base_url or self.base_url
+
+        # Неявное ожидание мешает явным ожиданиям условий: отключаем его на время сценария
+        implicit_wait = driver.timeouts.implicit_wait
+        driver.implicitly_wait(0)
+        try:
+            for step in self.steps:
+                started = time.perf_counter()
+                try:
+                    self._run_step(driver, step, values, on_step, timeout, base_url)
+                except Exception as e:
+                    if step.optional:
+                        logger.warning(f"Необязательный шаг '{step.caption}' пропущен: {e}")
+                        continue
+                    raise SideStepException(step, e) from e
+                finally:
+                    SIDE_STEP_DURATION.labels(step=str(step.index), command=step.command).observe(
+                        time.perf_counter() - started
+                    )
+        finally:
+            driver.implicitly_wait(implicit_wait)
+
+    def _run_step(self, driver, step, values, on_step, timeout, base_url):
+        logger.info(f"Шаг {step.caption}")
+        wait = WebDriverWait(driver, OPTIONAL_STEP_TIMEOUT if step.optional else timeout)
+
+        if step.command == 'open':
+            if on_step:
+                on_step(step, None)
+            driver.get(urljoin(base_url, step.target))
+
+        elif step.command == 'setWindowSize':
+            width, height = (int(x) for x in step.target.split('x'))
+            driver.set_window_size(width, height)
+            if on_step:
+                on_step(step, None)
+
+        elif step.command == 'click':
+            element = wait.until(EC.element_to_be_clickable(step.locator))
+            if on_step:
+                on_step(step, element)
+            page = driver.find_element(By.TAG_NAME, 'html')
+            # JS-клик не страдает от перекрытия элементов
+            if driver.execute_script(CLICK_SCRIPT, element):
+                wait.until(EC.staleness_of(page))
+                wait.until(lambda d: d.execute_script("return document.readyState") == 'complete')
+
+        elif step.command == 'type':
+            element = wait.until(EC.element_to_be_clickable(step.locator))
+            if on_step:
+                on_step(step, element)
+            element.clear()
+            element.send_keys(values.get(step.target, step.value))
+
+
+@lru_cache(maxsize=None)
+def load_side_script(path, test_name=None):
+    """Загружает и кэширует сценарий: .side файл разбирается один раз на процесс."""
+    return SideScript.load(Path(path), test_name)
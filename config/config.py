@@ -54,6 +54,7 @@ if not token_parts[0].isdigit():
 # Настройки сайта
 BASE_URL = "https://lbv-termine.de"
 FRONTEND_URL = f"{BASE_URL}/frontend"
+LOCATION_PAGE_URL = f"{FRONTEND_URL}/standortauswahl.php"
 
 # Селекторы из lbv.side
 SELECTORS = {
@@ -79,8 +80,19 @@ USER_DATA = {
 if not USER_DATA['email'] or '@' not in USER_DATA['email']:
     raise ValueError("Некорректный формат email в USER_EMAIL")
 
+# Сценарий Selenium IDE, по которому бот проходит до страницы выбора локации
+SIDE_FILE = get_env('SIDE_FILE', str(Path(__file__).parent.parent / 'lbv.side'))
+
+# Значения для команд type из .side файла (вместо записанных в сценарии)
+SIDE_FORM_VALUES = {
+    'id=vorname': USER_DATA['firstname'],
+    'id=nachname': USER_DATA['lastname'],
+    'id=email': USER_DATA['email']
+}
+
 # Настройки базы данных
 DB_NAME = "booking_bot.db"
+DB_PATH = "database/" + DB_NAME
 
 # Настройки браузера
 BROWSER_WINDOW_SIZE = {
@@ -92,35 +104,76 @@ BROWSER_WINDOW_SIZE = {
 HEADLESS_MODE = get_env('HEADLESS_MODE', 'false').lower() == 'true'
 SELENIUM_TIMEOUT = int(get_env('SELENIUM_TIMEOUT', '30'))
 
+# Настройки пула драйверов Chrome
+DRIVER_POOL_MIN_SIZE = int(get_env('DRIVER_POOL_MIN_SIZE', '1'))
+DRIVER_POOL_MAX_SIZE = int(get_env('DRIVER_POOL_MAX_SIZE', '2'))
+DRIVER_POOL_MAX_USES = int(get_env('DRIVER_POOL_MAX_USES', '20'))
+DRIVER_POOL_MAX_MEMORY_MB = int(get_env('DRIVER_POOL_MAX_MEMORY_MB', '512'))
+
+# Держать сессию на странице выбора локации и только обновлять ее между проверками
+PARKED_SESSION = get_env('PARKED_SESSION', 'true').lower() == 'true'
+
+# Скриншоты шагов: 'trace' - отправлять в Telegram каждый шаг,
+# 'production' - держать шаги в памяти (команда /trace) и отправлять только итог или ошибку
+SCREENSHOT_MODE = get_env('SCREENSHOT_MODE', 'production').lower()
+SCREENSHOT_BUFFER_SIZE = int(get_env('SCREENSHOT_BUFFER_SIZE', '20'))
+# Чаты, которым доступна команда /trace (через запятую): кадры шагов содержат данные формы (USER_DATA)
+TRACE_CHAT_IDS = [int(chat_id) for chat_id in get_env('TRACE_CHAT_IDS', '').split(',') if chat_id.strip()]
+# Каталог для сохранения итоговых кадров (имя файла - хэш содержимого); пусто - не сохранять
+SCREENSHOT_DIR = get_env('SCREENSHOT_DIR', '')
+# Сравнивать кадры перцептивным хэшем (нужен Pillow), чтобы не замечать мелкий шум рендеринга
+SCREENSHOT_PERCEPTUAL_HASH = get_env('SCREENSHOT_PERCEPTUAL_HASH', 'false').lower() == 'true'
+# Отправляемый кадр: формат (jpeg, webp, png), качество сжатия и что снимать -
+# CSS-селектор списка локаций или явная область 'x,y,ширина,высота'
+SCREENSHOT_FORMAT = get_env('SCREENSHOT_FORMAT', 'jpeg').lower()
+SCREENSHOT_QUALITY = int(get_env('SCREENSHOT_QUALITY', '70'))
+SCREENSHOT_ELEMENT = get_env('SCREENSHOT_ELEMENT', 'div.col-sm.LBV-dlgruppentext')
+SCREENSHOT_CLIP = get_env('SCREENSHOT_CLIP', '')
+
+# Отладка: подсвечивать найденные локации на странице (один дополнительный скрипт)
+HIGHLIGHT_SLOTS = get_env('HIGHLIGHT_SLOTS', 'false').lower() == 'true'
+
+# Движок проверки: 'browser' (Selenium + Chrome) или 'http' (прямые запросы без браузера)
+CHECK_ENGINE = get_env('CHECK_ENGINE', 'browser').lower()
+HTTP_TIMEOUT = int(get_env('HTTP_TIMEOUT', '15'))
+HTTP_POOL_SIZE = int(get_env('HTTP_POOL_SIZE', '4'))
+
 # Настройки проверки бронирования
 CHECK_INTERVAL = int(get_env('CHECK_INTERVAL', '60'))
 
+# История проверок: каталог дневных сегментов JSONL и срок хранения, дни
+HISTORY_DIR = get_env('HISTORY_DIR', 'history')
+HISTORY_RETENTION_DAYS = int(get_env('HISTORY_RETENTION_DAYS', '180'))
+# Временные ряды по локациям: каталог (пусто - только в памяти) и сроки хранения
+# сырых отсчетов и минутных сверток, дни (часовые и дневные свертки хранятся бессрочно)
+SLOT_SERIES_DIR = get_env('SLOT_SERIES_DIR', 'timeseries')
+SLOT_SERIES_RAW_DAYS = int(get_env('SLOT_SERIES_RAW_DAYS', '14'))
+SLOT_SERIES_MINUTE_DAYS = int(get_env('SLOT_SERIES_MINUTE_DAYS', '30'))
+
 # Настройки логирования
 LOG_PATH = "logs/bot.log"
 LOG_LEVEL = get_env('LOG_LEVEL', 'INFO')
 
+# Telegram Bot API: адрес сервера (можно указать локальный Bot API) и размер пула соединений
+TELEGRAM_API_URL = get_env('TELEGRAM_API_URL', 'https://api.telegram.org')
+TELEGRAM_POOL_SIZE = int(get_env('TELEGRAM_POOL_SIZE', '8'))
+# Сколько получателей рассылки обслуживается одновременно (не больше пула соединений)
+BROADCAST_WORKERS = int(get_env('BROADCAST_WORKERS', str(TELEGRAM_POOL_SIZE)))
+# ID последних сообщений: база SQLite и период фонового сброса, секунды
+MESSAGE_STORE_PATH = get_env('MESSAGE_STORE_PATH', 'database/message_ids.db')
+MESSAGE_STORE_FLUSH_INTERVAL = float(get_env('MESSAGE_STORE_FLUSH_INTERVAL', '5'))
+# Реестр подписчиков (chat_id и атрибуты подписки), по умолчанию в основной базе бота
+SUBSCRIBERS_DB_PATH = get_env('SUBSCRIBERS_DB_PATH', DB_PATH)
+
 # Настройки Telegram-уведомлений
 DEFAULT_CHAT_IDS = []  # Здесь можно предустановить известные ID чатов
 
 def add_chat_id(chat_id):
     """Добавляет ID чата в список получателей уведомлений"""
-    import json
-    import os
+    from utils.subscribers import get_subscribers
     
     try:
-        chat_ids = []
-        if os.path.exists("telegram_users.json"):
-            with open("telegram_users.json", "r") as f:
-                data = json.load(f)
-                chat_ids = data.get("chat_ids", [])
-        
-        if chat_id not in chat_ids:
-            chat_ids.append(chat_id)
-            
-        with open("telegram_users.json", "w") as f:
-            json.dump({"chat_ids": chat_ids}, f, indent=2)
-            
-        return True
+        return get_subscribers().subscribe(chat_id) is not None
     except Exception as e:
         logger.error(f"Ошибка при добавлении chat_id: {e}")
         return False 
\ No newline at end of file
@@ -10,6 +10,10 @@ class BrowserConfig:
     window_size: Dict[str, int] = field(default_factory=lambda: {'width': 1920, 'height': 1080})
     user_agent: Optional[str] = None
     chrome_options: list = field(default_factory=list)
+    pool_min_size: int = 1
+    pool_max_size: int = 2
+    pool_max_uses: int = 20
+    pool_max_memory_mb: int = 512
 
 @dataclass
 class NotificationConfig:
@@ -17,20 +21,37 @@ class NotificationConfig:
     retry_attempts: int = 3
     retry_delay: int = 5
     message_lifetime: int = 3600
+    api_url: str = 'https://api.telegram.org'
+    pool_size: int = 8
+    global_rate: float = 30.0  # сообщений в секунду на бота
+    per_chat_rate: float = 1.0  # сообщений в секунду на чат
+    per_chat_burst: float = 3.0
+    edit_window: float = 3.0  # не чаще одного редактирования статуса за окно, секунды
 
 @dataclass
 class SlotCheckerConfig:
     check_interval: int = 300  # 5 minutes
     max_retries: int = 3
     preferred_locations: list = field(default_factory=list)
+    default_service_id: int = 147  # Führerschein
+    engine: str = 'browser'  # 'browser' или 'http'
+    highlight_slots: bool = False  # отладочная подсветка найденных локаций
 
 class Settings:
     def __init__(self):
         self.browser = BrowserConfig()
         self.notifications = NotificationConfig(
-            telegram_token=os.getenv('TELEGRAM_TOKEN', '')
+            telegram_token=os.getenv('TELEGRAM_TOKEN', ''),
+            api_url=os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org'),
+            pool_size=int(os.getenv('TELEGRAM_POOL_SIZE', '8')),
+            global_rate=float(os.getenv('TELEGRAM_GLOBAL_RATE', '30')),
+            per_chat_rate=float(os.getenv('TELEGRAM_CHAT_RATE', '1')),
+            edit_window=float(os.getenv('TELEGRAM_EDIT_WINDOW', '3'))
+        )
+        self.slot_checker = SlotCheckerConfig(
+            engine=os.getenv('CHECK_ENGINE', 'browser').lower(),
+            highlight_slots=os.getenv('HIGHLIGHT_SLOTS', 'false').lower() == 'true'
         )
-        self.slot_checker = SlotCheckerConfig()
         
     @classmethod
     def from_file(cls, config_path: Path):
@@ -8,23 +8,24 @@ from contextlib import contextmanager
 from loguru import logger
 import time
 
+from browser_manager.pool import DriverPool
 from config.settings import settings
 from exceptions.custom_exceptions import BrowserException
 from metrics.prometheus import BROWSER_OPERATIONS, BROWSER_OPERATION_DURATION
 
 class BrowserSession:
-    """Context manager for browser sessions."""
+    """Context manager for browser sessions backed by the driver pool."""
     def __init__(self, handler: 'BrowserHandler'):
         self.handler = handler
         self.driver = None
 
     def __enter__(self) -> webdriver.Chrome:
-        self.driver = self.handler.init_driver()
+        self.driver = self.handler.pool.acquire()
         return self.driver
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.driver:
-            self.handler.close(self.driver)
+            self.handler.pool.release(self.driver)
 
 class BrowserHandler:
     """
@@ -33,11 +34,22 @@ class BrowserHandler:
     Attributes:
         config (BrowserConfig): Browser configuration
         options (Options): Chrome options
+        pool (DriverPool): Warm drivers reused across sessions
     """
     
     def __init__(self):
         self.config = settings.browser
         self.options = self._configure_browser_options()
+        self.pool = DriverPool(
+            self.init_driver,
+            self.close,
+            min_size=self.config.pool_min_size,
+            max_size=self.config.pool_max_size,
+            max_uses=self.config.pool_max_uses,
+            max_memory_mb=self.config.pool_max_memory_mb
+        )
+        # Прогреваем пул до min_size сразу, а не после первого пересоздания
+        self.pool.start_warm_up()
         
     def _configure_browser_options(self) -> Options:
         """Configure Chrome options based on settings."""
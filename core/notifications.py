@@ -1,88 +1,227 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from loguru import logger
 import asyncio
+import time
 from datetime import datetime
+from pathlib import Path
 
-from config.settings import settings
+from config.settings import settings, NotificationConfig
+from core.outbox import Lane, NotificationOutbox
 from exceptions.custom_exceptions import NotificationException
-from metrics.prometheus import NOTIFICATION_COUNTER, NOTIFICATION_ERRORS
+from metrics.prometheus import NOTIFICATION_COUNTER, OUTBOX_EDITS_COALESCED
+from utils.telegram_client import get_async_telegram_client
 
 class NotificationManager:
     """
     Handles all notification-related operations with retry logic and metrics.
+
+    Every Telegram call goes through NotificationOutbox, which enforces the
+    global and per-chat limits and honours retry_after. Status edits are
+    coalesced per chat: only the newest pending edit is sent, at most one
+    per edit_window.
+
+    Photos can be given as a file path or as in-memory bytes (photo).
     """
     
-    def __init__(self):
-        self.config = settings.notifications
+    def __init__(self, config: Optional[NotificationConfig] = None):
+        self.config = config or settings.notifications
         self.last_message_ids: Dict[int, int] = {}
+        self.outbox = NotificationOutbox(
+            global_rate=self.config.global_rate,
+            per_chat_rate=self.config.per_chat_rate,
+            per_chat_burst=self.config.per_chat_burst,
+            max_attempts=self.config.retry_attempts,
+            retry_delay=self.config.retry_delay,
+            # Одновременных запросов не больше, чем соединений в пуле клиента
+            concurrency=self.config.pool_size
+        )
+        # Отложенные редактирования статуса: последнее содержимое и общий результат
+        self._pending_edits: Dict[int, Tuple[str, Optional[str], Optional[bytes]]] = {}
+        self._edit_futures: Dict[int, asyncio.Future] = {}
+        self._last_edit_at: Dict[int, float] = {}
+        self._flush_tasks = set()
         
     async def send_notification(self,
                               chat_id: int,
                               message: str,
                               image_path: Optional[str] = None,
-                              disable_notification: bool = False) -> bool:
+                              disable_notification: bool = False,
+                              lane: Optional[Lane] = None,
+                              photo: Optional[bytes] = None) -> bool:
         """
-        Send notification with retry logic and metrics.
+        Send notification through the rate-limited outbox.
+
+        Loud messages go to the alert lane and pre-empt silent status updates
+        unless an explicit lane is given.
         """
-        for attempt in range(self.config.retry_attempts):
-            try:
-                # Здесь будет ваш код отправки уведомлений через Telegram
-                result = await self._send_telegram_message(
-                    chat_id, 
-                    message, 
-                    image_path, 
-                    disable_notification
-                )
-                
-                if result:
-                    NOTIFICATION_COUNTER.labels(
-                        type='telegram',
-                        status='success'
-                    ).inc()
-                    return True
-                    
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {e}")
-                NOTIFICATION_ERRORS.labels(error_type=type(e).__name__).inc()
-                
-                if attempt < self.config.retry_attempts - 1:
-                    await asyncio.sleep(self.config.retry_delay)
-                    
-        NOTIFICATION_COUNTER.labels(type='telegram', status='error').inc()
-        return False
+        if lane is None:
+            lane = Lane.STATUS if disable_notification else Lane.ALERT
+
+        async def send():
+            return await self._send_telegram_message(
+                chat_id,
+                message,
+                image_path,
+                disable_notification,
+                photo
+            )
+
+        result = await self.outbox.submit(chat_id, send, lane)
+        NOTIFICATION_COUNTER.labels(
+            type='telegram',
+            status='success' if result else 'error'
+        ).inc()
+        return result
 
     async def update_message(self,
                            chat_id: int,
                            message: str,
-                           image_path: Optional[str] = None) -> bool:
+                           image_path: Optional[str] = None,
+                           photo: Optional[bytes] = None) -> bool:
         """
         Update existing message instead of sending new one.
+
+        Edits queued for the same chat are coalesced: callers whose edit was
+        superseded get the result of the newest one.
         """
         if chat_id not in self.last_message_ids:
-            return await self.send_notification(chat_id, message, image_path)
-            
+            return await self.send_notification(chat_id, message, image_path, lane=Lane.STATUS, photo=photo)
+
+        if chat_id in self._edit_futures:
+            # Более раннее редактирование еще не отправлено - заменяем его содержимое
+            OUTBOX_EDITS_COALESCED.inc()
+            self._pending_edits[chat_id] = (message, image_path, photo)
+            return await asyncio.shield(self._edit_futures[chat_id])
+
+        self._pending_edits[chat_id] = (message, image_path, photo)
+        future = asyncio.get_running_loop().create_future()
+        self._edit_futures[chat_id] = future
+        task = asyncio.create_task(self._flush_edit(chat_id, future))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+        return await asyncio.shield(future)
+
+    async def _flush_edit(self, chat_id: int, future: asyncio.Future) -> None:
+        """Send the newest pending edit of a chat once its edit window has passed."""
+        payload = None
+        result = False
         try:
-            # Здесь будет ваш код обновления сообщения в Telegram
-            message_id = self.last_message_ids[chat_id]
-            result = await self._update_telegram_message(
-                chat_id,
-                message_id,
-                message,
-                image_path
-            )
-            
+            wait = self.config.edit_window - (time.monotonic() - self._last_edit_at.get(chat_id, float('-inf')))
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            async def edit():
+                nonlocal payload
+                # Содержимое берется в момент отправки, поэтому правки, пришедшие
+                # пока задание ждало в очереди, тоже попадают в этот же запрос
+                if self._edit_futures.get(chat_id) is future:
+                    del self._edit_futures[chat_id]
+                    payload = self._pending_edits.pop(chat_id)
+                self._last_edit_at[chat_id] = time.monotonic()
+                return await self._update_telegram_message(
+                    chat_id,
+                    self.last_message_ids[chat_id],
+                    *payload
+                )
+
+            result = await self.outbox.submit(chat_id, edit, Lane.STATUS)
             NOTIFICATION_COUNTER.labels(
                 type='update',
                 status='success' if result else 'error'
             ).inc()
-            
-            return result
-            
         except Exception as e:
             logger.error(f"Failed to update message: {e}")
-            NOTIFICATION_ERRORS.labels(error_type=type(e).__name__).inc()
+        finally:
+            if self._edit_futures.get(chat_id) is future:
+                del self._edit_futures[chat_id]
+                self._pending_edits.pop(chat_id, None)
+            # При остановке ожидающие тоже получают результат (False), а не зависают
+            if not future.done():
+                future.set_result(result)
+
+    async def delete_message(self, chat_id: int, message_id: Optional[int] = None) -> bool:
+        """Delete a message (the last status message by default)."""
+        message_id = message_id or self.last_message_ids.get(chat_id)
+        if message_id is None:
             return False
 
+        async def delete():
+            return bool(await self._client().call('deleteMessage', {'chat_id': chat_id, 'message_id': message_id}))
+
+        result = await self.outbox.submit(chat_id, delete, Lane.STATUS)
+        if result and self.last_message_ids.get(chat_id) == message_id:
+            del self.last_message_ids[chat_id]
+        NOTIFICATION_COUNTER.labels(
+            type='delete',
+            status='success' if result else 'error'
+        ).inc()
+        return result
+
+    async def close(self) -> None:
+        """Stop the outbox; pending messages and edits are dropped."""
+        for task in list(self._flush_tasks):
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.outbox.close()
+
+    def _client(self):
+        """Shared keep-alive Bot API client for the current event loop."""
+        return get_async_telegram_client(
+            self.config.telegram_token,
+            self.config.api_url,
+            self.config.pool_size
+        )
+
+    @staticmethod
+    async def _photo_file(image_path: Optional[str], photo: Optional[bytes]):
+        """Multipart file tuple for a photo given as bytes or as a path, or None."""
+        if photo is None and image_path:
+            # Чтение файла не должно блокировать цикл событий
+            photo = await asyncio.to_thread(Path(image_path).read_bytes)
+        if photo is None:
+            return None
+        # utils.screenshots читает config.config, поэтому импорт по требованию
+        from utils.screenshots import photo_upload
+        return photo_upload(photo)
+
+    async def _send_telegram_message(self,
+                                   chat_id: int,
+                                   message: str,
+                                   image_path: Optional[str] = None,
+                                   disable_notification: bool = False,
+                                   photo: Optional[bytes] = None) -> bool:
+        """Send a text message, or a photo with caption, and remember its id."""
+        data = {
+            'chat_id': chat_id,
+            'parse_mode': 'Markdown',
+            'disable_notification': disable_notification
+        }
+        upload = await self._photo_file(image_path, photo)
+        if upload:
+            result = await self._client().call('sendPhoto', {**data, 'caption': message}, {'photo': upload})
+        else:
+            result = await self._client().call('sendMessage', {**data, 'text': message})
+
+        if result:
+            self._save_message_id(chat_id, result['message_id'])
+        return bool(result)
+
+    async def _update_telegram_message(self,
+                                     chat_id: int,
+                                     message_id: int,
+                                     message: str,
+                                     image_path: Optional[str] = None,
+                                     photo: Optional[bytes] = None) -> bool:
+        """Edit a previously sent message in place."""
+        data = {'chat_id': chat_id, 'message_id': message_id}
+        upload = await self._photo_file(image_path, photo)
+        if upload:
+            media = {'type': 'photo', 'media': 'attach://photo', 'caption': message, 'parse_mode': 'Markdown'}
+            result = await self._client().call('editMessageMedia', {**data, 'media': media}, {'photo': upload})
+        else:
+            result = await self._client().call('editMessageText', {**data, 'text': message, 'parse_mode': 'Markdown'})
+        return bool(result)
+
     def _save_message_id(self, chat_id: int, message_id: int) -> None:
         """Save message ID for future updates."""
-        self.last_message_ids[chat_id] = message_id 
\ No newline at end of file
+        self.last_message_ids[chat_id] = message_id
@@ -0,0 +1,180 @@
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, Optional
+from loguru import logger
+import asyncio
+import itertools
+import time
+
+from exceptions.custom_exceptions import RateLimitException
+from metrics.prometheus import NOTIFICATION_ERRORS, OUTBOX_WAIT, OUTBOX_RATE_LIMITED
+
+class Lane(IntEnum):
+    """Outbox priority lanes: lower value is sent first."""
+    ALERT = 0
+    STATUS = 1
+
+class TokenBucket:
+    """Token bucket with an optional hard pause (Telegram retry_after)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self) -> float:
+        """Seconds until one token can be taken, 0 if right now."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+@dataclass(order=True)
+class _Job:
+    lane: int
+    seq: int
+    chat_id: int = field(compare=False)
+    send: Callable[[], Awaitable[bool]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    submitted: float = field(default_factory=time.monotonic, compare=False)
+    attempt: int = field(default=0, compare=False)
+
+class NotificationOutbox:
+    """
+    Async outbox for Telegram calls with per-chat and global rate limits.
+
+    Jobs are taken in lane order (alerts before status edits, FIFO inside a
+    lane). A chat that is over its limit is deferred without holding up other
+    chats; a 429 pauses that chat for retry_after seconds and the job is retried.
+    """
+
+    def __init__(self,
+                 global_rate: float = 30.0,
+                 per_chat_rate: float = 1.0,
+                 per_chat_burst: float = 3.0,
+                 max_attempts: int = 3,
+                 retry_delay: float = 5.0,
+                 concurrency: int = 8):
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.concurrency = concurrency
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    def submit(self, chat_id: int, send: Callable[[], Awaitable[bool]], lane: Lane = Lane.STATUS) -> asyncio.Future:
+        """Queue a send coroutine factory; the future resolves to its boolean result."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait(_Job(int(lane), next(self._seq), chat_id, send, future))
+        return future
+
+    async def close(self) -> None:
+        """Stop dispatching; queued jobs resolve to False."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+            while not self._queue.empty():
+                self._resolve(self._queue.get_nowait(), False)
+        self._dispatcher = None
+        self._loop = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._dispatcher is not None and not self._dispatcher.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._dispatcher = loop.create_task(self._dispatch())
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    async def _dispatch(self) -> None:
+        while True:
+            job = await self._queue.get()
+
+            chat_wait = self._chat_bucket(job.chat_id).delay()
+            if chat_wait > 0:
+                # Не задерживаем остальные чаты: задание вернется в очередь позже
+                self._requeue_later(job, chat_wait)
+                continue
+
+            global_wait = self._global.delay()
+            if global_wait > 0:
+                # После паузы очередь читается заново, чтобы новое оповещение могло обогнать статус
+                self._queue.put_nowait(job)
+                await asyncio.sleep(global_wait)
+                continue
+
+            await self._semaphore.acquire()
+            self._chat_bucket(job.chat_id).consume()
+            self._global.consume()
+            task = asyncio.create_task(self._deliver(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, job: _Job) -> None:
+        try:
+            OUTBOX_WAIT.labels(lane=Lane(job.lane).name.lower()).observe(time.monotonic() - job.submitted)
+            result = await job.send()
+            if result:
+                self._resolve(job, True)
+                return
+            self._retry(job, self.retry_delay, "empty result")
+        except RateLimitException as e:
+            OUTBOX_RATE_LIMITED.inc()
+            logger.warning(f"Telegram rate limit for chat {job.chat_id}, retry after {e.retry_after}s")
+            self._chat_bucket(job.chat_id).block(e.retry_after)
+            # Ожидание по retry_after не считается неудачной попыткой
+            self._requeue_later(job, e.retry_after)
+        except Exception as e:
+            NOTIFICATION_ERRORS.labels(error_type=type(e).__name__).inc()
+            self._retry(job, self.retry_delay, e)
+        finally:
+            self._semaphore.release()
+
+    def _retry(self, job: _Job, delay: float, reason) -> None:
+        job.attempt += 1
+        logger.error(f"Attempt {job.attempt} for chat {job.chat_id} failed: {reason}")
+        if job.attempt >= self.max_attempts:
+            self._resolve(job, False)
+        else:
+            self._requeue_later(job, delay)
+
+    def _requeue_later(self, job: _Job, delay: float) -> None:
+        self._loop.call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: _Job) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._resolve(job, False)
+        else:
+            self._queue.put_nowait(job)
+
+    @staticmethod
+    def _resolve(job: _Job, result: bool) -> None:
+        if not job.future.done():
+            job.future.set_result(result)
@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from utils.location_page import LocationSlot
+
+@dataclass
+class ProbeResult:
+    """Outcome of one availability probe, shared by all subscribers of a service."""
+    service_id: int
+    available: bool
+    dates: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    checked_at: datetime = field(default_factory=datetime.now)
+    locations: List[LocationSlot] = field(default_factory=list)
+
+    @classmethod
+    def from_locations(cls, service_id: int, locations: List[LocationSlot]) -> 'ProbeResult':
+        """Build a result from the parsed location list."""
+        open_locations = [location for location in locations if location.available]
+        return cls(
+            service_id=service_id,
+            available=bool(open_locations),
+            dates=[location.earliest_date for location in open_locations if location.earliest_date],
+            locations=locations
+        )
+
+    @property
+    def message(self) -> str:
+        """Human-readable summary, same wording as the browser check."""
+        if self.error:
+            return f"Ошибка: {self.error}"
+        if not self.available:
+            return "Нет доступных слотов"
+        if self.dates:
+            return f"Доступна запись на даты: {', '.join(self.dates)}"
+        open_count = sum(1 for location in self.locations if location.available)
+        return f"Найдено {open_count} доступных слотов (даты не определены)"
@@ -1,12 +1,14 @@
-from typing import Optional, List, Tuple, Dict
+from typing import Optional, List, Dict
 from loguru import logger
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
 import asyncio
 import time
 
 from core.browser import BrowserHandler
 from core.notifications import NotificationManager
+from core.probe import ProbeResult
+from core.subscriptions import SubscriptionRegistry, describe_range
+from utils.location_page import LocationSlot, collect_location_slots, HIGHLIGHT_SLOTS_SCRIPT
+from utils.slot_series import record_probe
 from config.settings import settings
 from exceptions.custom_exceptions import SlotCheckException
 from metrics.prometheus import SLOT_CHECK_DURATION, SLOTS_FOUND, ACTIVE_CHECKS
@@ -14,113 +16,139 @@ from metrics.prometheus import SLOT_CHECK_DURATION, SLOTS_FOUND, ACTIVE_CHECKS
 class SlotChecker:
     """
     Enhanced slot checking with metrics, error handling, and notifications.
+
+    One probe per service and cycle is fanned out to every subscribed chat,
+    so browser cost does not grow with the number of users.
     """
     
-    def __init__(self):
+    def __init__(self, subscriptions: Optional[SubscriptionRegistry] = None):
         self.browser = BrowserHandler()
         self.notifier = NotificationManager()
         self.config = settings.slot_checker
+        self.subscriptions = subscriptions if subscriptions is not None else SubscriptionRegistry()
         self.stop_event = asyncio.Event()
         
-    async def start_monitoring(self, chat_id: int, preferred_range: str = 'any'):
-        """Start monitoring slots for a specific user."""
+    async def start_monitoring(self):
+        """Run the shared monitoring loop until stopped or nobody is subscribed."""
         ACTIVE_CHECKS.inc()
         
         try:
-            with self.browser.create_session() as driver:
-                while not self.stop_event.is_set():
-                    with SLOT_CHECK_DURATION.time():
-                        try:
-                            available, dates = await self._check_availability(driver)
-                            
-                            if available:
-                                # Проверяем, соответствуют ли даты предпочтительному диапазону
-                                is_preferred = self._check_dates_in_range(dates, preferred_range)
-                                
-                                if is_preferred:
-                                    # Отправляем уведомление со звуком только если даты в диапазоне
-                                    await self._notify_slots_found(
-                                        chat_id,
-                                        dates,
-                                        preferred_range,
-                                        disable_notification=False
-                                    )
-                                    SLOTS_FOUND.labels(location='preferred').inc()
-                                else:
-                                    # Тихо обновляем сообщение если даты не в диапазоне
-                                    await self._update_status(
-                                        chat_id,
-                                        dates,
-                                        preferred_range
-                                    )
-                                    SLOTS_FOUND.labels(location='other').inc()
-                            else:
-                                # Обновляем статус без звука
-                                await self._update_status(
-                                    chat_id,
-                                    [],
-                                    preferred_range
-                                )
-                            
-                        except Exception as e:
-                            logger.error(f"Error during slot check: {e}")
-                            await self._notify_error(chat_id, str(e))
-                            
-                    # Случайная задержка между проверками
-                    delay = self._get_random_delay()
-                    await asyncio.sleep(delay)
+            if self.config.engine == 'http':
+                # Прямые HTTP-запросы без Chrome
+                from browser_manager.http_checker import HttpBookingChecker
+                checker = HttpBookingChecker()
+                try:
+                    await self._monitor_loop(lambda service_id: self.probe_http(checker, service_id))
+                finally:
+                    checker.close()
+            else:
+                with self.browser.create_session() as driver:
+                    await self._monitor_loop(lambda service_id: self.probe(driver, service_id))
                     
         finally:
             ACTIVE_CHECKS.dec()
+
+    async def _monitor_loop(self, probe):
+        """Probe every subscribed service once per cycle and fan the results out."""
+        while not self.stop_event.is_set() and len(self.subscriptions):
+            for service_id in sorted(self.subscriptions.services()):
+                result = await probe(service_id)
+                await self._fan_out(result)
+                    
+            # Случайная задержка между проверками
+            delay = self._get_random_delay()
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
             
     def stop_monitoring(self):
         """Stop the monitoring process."""
         self.stop_event.set()
+
+    async def probe(self, driver, service_id: int) -> ProbeResult:
+        """
+        Check availability of one service once.
+
+        The browser engine reads the location page the session is already on,
+        which belongs to the default service; other services are reported as
+        errors instead of receiving that service's slots. Use the HTTP engine
+        to monitor several services.
+        """
+        if service_id != self.config.default_service_id:
+            return ProbeResult(
+                service_id=service_id,
+                available=False,
+                error=f"услуга {service_id} не поддерживается браузерным движком"
+            )
+        with SLOT_CHECK_DURATION.time():
+            try:
+                locations = await self._check_availability(driver)
+                # Запись рядов - файловый ввод-вывод, не держим на нем цикл событий
+                await asyncio.to_thread(record_probe, locations)
+                return ProbeResult.from_locations(service_id, locations)
+            except Exception as e:
+                logger.error(f"Error during slot check: {e}")
+                return ProbeResult(service_id=service_id, available=False, error=str(e))
+
+    async def probe_http(self, checker, service_id: int) -> ProbeResult:
+        """Check availability of one service through the HTTP engine."""
+        with SLOT_CHECK_DURATION.time():
+            return await asyncio.to_thread(checker.probe, service_id)
+
+    async def _fan_out(self, result: ProbeResult):
+        """
+        Deliver one probe result to every subscriber of its service.
+
+        All deliveries are queued at once so the outbox can send alerts to
+        every chat before any status edit.
+        """
+        subscribers = self.subscriptions.subscribers(result.service_id)
+        # Одна выборка по индексу диапазонов вместо проверки дат для каждого чата
+        in_range = self.subscriptions.matching(result.service_id, result.dates) if result.available else set()
+        await asyncio.gather(*(
+            self._deliver(result, subscription, subscription.chat_id in in_range)
+            for subscription in subscribers
+        ))
+
+    async def _deliver(self, result: ProbeResult, subscription, in_range: bool):
+        """Deliver a probe result to one subscriber."""
+        chat_id = subscription.chat_id
+        preferred_range = subscription.preferred_range
+        try:
+            if result.error:
+                await self._notify_error(chat_id, result.error)
+            elif result.available and in_range:
+                # Отправляем уведомление со звуком только если даты в диапазоне
+                await self._notify_slots_found(
+                    chat_id,
+                    result.dates,
+                    preferred_range,
+                    disable_notification=False
+                )
+                SLOTS_FOUND.labels(location='preferred').inc()
+            else:
+                # Тихо обновляем сообщение если слотов нет или даты не в диапазоне
+                await self._update_status(chat_id, result.dates, preferred_range)
+                if result.available:
+                    SLOTS_FOUND.labels(location='other').inc()
+        except Exception as e:
+            logger.error(f"Failed to notify chat {chat_id}: {e}")
         
-    async def _check_availability(self, driver) -> Tuple[bool, List[str]]:
-        """Check slot availability with enhanced error handling."""
+    async def _check_availability(self, driver) -> List[LocationSlot]:
+        """Collect the state of every location with a single in-page script."""
         try:
-            # Проверка календаря
-            calendar = self.browser.wait_for_element(
-                driver,
-                (By.CLASS_NAME, "calendar")
-            )
-            
-            if not calendar:
-                return False, []
-                
-            # Поиск активных дат
-            available_days = calendar.find_elements(
-                By.CSS_SELECTOR,
-                ".calendar-day:not(.disabled)"
-            )
-            
-            if not available_days:
-                return False, []
-                
-            # Извлечение дат
-            dates = []
-            for day in available_days:
-                date = day.get_attribute("data-date")
-                if date:
-                    dates.append(date)
-                    self.browser.highlight_element(driver, day, "green")
-                    
-            return bool(dates), dates
+            locations = collect_location_slots(driver)
+            if self.config.highlight_slots:
+                open_ids = [location.standortid for location in locations if location.available]
+                if open_ids:
+                    driver.execute_script(HIGHLIGHT_SLOTS_SCRIPT, open_ids, "green")
+            return locations
             
         except Exception as e:
             logger.error(f"Error checking availability: {e}")
             raise SlotCheckException(f"Failed to check slots: {e}")
             
-    def _check_dates_in_range(self, dates: List[str], preferred_range: str) -> bool:
-        """Check if dates are within preferred range."""
-        if not dates or preferred_range == 'any':
-            return True
-            
-        # Здесь ваша логика проверки дат
-        from utils.date_utils import check_if_dates_in_range
-        return check_if_dates_in_range(dates, preferred_range)
-        
     async def _notify_slots_found(self,
                                 chat_id: int,
                                 dates: List[str],
@@ -164,16 +192,18 @@ class SlotChecker:
             )
             
         await self.notifier.update_message(chat_id, message)
+
+    async def _notify_error(self, chat_id: int, error: str):
+        """Silently report a failed check in the status message."""
+        message = (
+            f"ℹ️ *Статус мониторинга*\n\n"
+            f"⚠️ Ошибка при проверке: {error}"
+        )
+        await self.notifier.update_message(chat_id, message)
         
     def _get_range_text(self, preferred_range: str) -> str:
         """Get human-readable range text."""
-        ranges = {
-            'week': 'неделя',
-            'two_weeks': 'две недели',
-            'month': 'месяц',
-            'any': 'любой период'
-        }
-        return ranges.get(preferred_range, 'любой период')
+        return describe_range(preferred_range)
         
     def _get_random_delay(self) -> int:
         """Get random delay between checks."""
@@ -0,0 +1,442 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import ClassVar, Dict, FrozenSet, List, Optional, Set, Tuple
+import re
+import threading
+
+from config.settings import settings
+from utils.date_utils import parse_date
+
+# Горизонты именованных диапазонов: сколько дней вперед от сегодняшней даты
+RANGE_HORIZONS = {'week': 7, 'two_weeks': 14, 'month': 31}
+
+def range_horizon(preferred_range: str) -> Optional[int]:
+    """
+    Horizon of a date range in days from today; None means any date matches.
+
+    Besides the named ranges a custom horizon can be given as 'days:N'.
+    Unknown ranges match any date, as check_if_dates_in_range does.
+    """
+    if preferred_range in RANGE_HORIZONS:
+        return RANGE_HORIZONS[preferred_range]
+    if preferred_range and preferred_range.startswith('days:'):
+        try:
+            return max(int(preferred_range[5:]), 0)
+        except ValueError:
+            return None
+    return None
+
+WEEKDAY_NAMES = ('пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс')
+ALL_WEEKDAYS = frozenset(range(7))
+
+_DATE_RE = re.compile(r'\d{2}\.\d{2}\.\d{4}')
+_WEEKDAYS_RE = re.compile(r'\b(пн|вт|ср|чт|пт|сб|вс)\b(?:\s*-\s*\b(пн|вт|ср|чт|пт|сб|вс)\b)?')
+
+@dataclass(frozen=True)
+class DateWindow:
+    """
+    Custom date range: an optional from/to window, a weekday mask and excluded dates.
+
+    Stored as a preferred_range string ('window:2025-05-01..2025-05-20;wd=01234;ex=2025-05-09'),
+    so the existing range columns keep working without a schema change.
+    """
+    start: Optional[date] = None
+    end: Optional[date] = None
+    weekdays: FrozenSet[int] = ALL_WEEKDAYS
+    excluded: FrozenSet[date] = frozenset()
+
+    PREFIX: ClassVar[str] = 'window:'
+
+    def allows(self, day: date) -> bool:
+        """Weekday and exclusion filters (the window bounds are checked by the index)."""
+        return day.weekday() in self.weekdays and day not in self.excluded
+
+    def contains(self, day: date) -> bool:
+        return ((self.start is None or self.start <= day)
+                and (self.end is None or day <= self.end)
+                and self.allows(day))
+
+    def to_range(self) -> str:
+        bounds = f"{self.start.isoformat() if self.start else ''}..{self.end.isoformat() if self.end else ''}"
+        parts = [self.PREFIX + bounds]
+        if self.weekdays != ALL_WEEKDAYS:
+            parts.append('wd=' + ''.join(str(day) for day in sorted(self.weekdays)))
+        if self.excluded:
+            parts.append('ex=' + ','.join(day.isoformat() for day in sorted(self.excluded)))
+        return ';'.join(parts)
+
+    @classmethod
+    def from_range(cls, preferred_range: Optional[str]) -> Optional['DateWindow']:
+        """Parse a stored range; None if it is not a valid custom window."""
+        if not preferred_range or not preferred_range.startswith(cls.PREFIX):
+            return None
+        try:
+            bounds, *options = preferred_range[len(cls.PREFIX):].split(';')
+            start, end = bounds.split('..')
+            fields = dict(option.split('=', 1) for option in options)
+            return cls(
+                start=date.fromisoformat(start) if start else None,
+                end=date.fromisoformat(end) if end else None,
+                weekdays=frozenset(int(day) for day in fields['wd']) if 'wd' in fields else ALL_WEEKDAYS,
+                excluded=frozenset(date.fromisoformat(day) for day in fields['ex'].split(',')) if 'ex' in fields else frozenset()
+            )
+        except ValueError:
+            return None
+
+    @classmethod
+    def parse_text(cls, text: str) -> Optional['DateWindow']:
+        """
+        Parse a window typed by a user, None if nothing usable was found.
+
+        Examples: '01.05.2025-20.05.2025', 'с 01.05.2025 пн-пт',
+        'до 31.05.2025 сб, вс кроме 10.05.2025'.
+        """
+        text = text.lower()
+        head, _, tail = text.partition('кроме')
+        try:
+            dates = [datetime.strptime(value, '%d.%m.%Y').date() for value in _DATE_RE.findall(head)]
+            excluded = frozenset(datetime.strptime(value, '%d.%m.%Y').date() for value in _DATE_RE.findall(tail))
+        except ValueError:
+            return None
+        weekdays = set()
+        for first, last in _WEEKDAYS_RE.findall(head):
+            first_index = WEEKDAY_NAMES.index(first)
+            last_index = WEEKDAY_NAMES.index(last) if last else first_index
+            # 'пт-пн' переходит через выходные
+            count = (last_index - first_index) % 7 + 1
+            weekdays.update((first_index + offset) % 7 for offset in range(count))
+        if len(dates) > 2 or not (dates or weekdays):
+            return None
+        start = end = None
+        if len(dates) == 2:
+            start, end = dates
+        elif dates and re.search(r'(^|\s)до\s', head):
+            end = dates[0]
+        elif dates and re.search(r'(^|\s)(с|от)\s', head):
+            start = dates[0]
+        elif dates:
+            start = end = dates[0]
+        if start and end and start > end:
+            return None
+        return cls(start=start, end=end, weekdays=frozenset(weekdays) or ALL_WEEKDAYS, excluded=excluded)
+
+    def describe(self) -> str:
+        """Human-readable description for messages."""
+        if self.start and self.end:
+            text = self.start.strftime('%d.%m.%Y') if self.start == self.end else \
+                f"{self.start.strftime('%d.%m.%Y')}–{self.end.strftime('%d.%m.%Y')}"
+        elif self.start:
+            text = f"с {self.start.strftime('%d.%m.%Y')}"
+        elif self.end:
+            text = f"до {self.end.strftime('%d.%m.%Y')}"
+        else:
+            text = "любые даты"
+        if self.weekdays != ALL_WEEKDAYS:
+            text += ", " + ", ".join(WEEKDAY_NAMES[day] for day in sorted(self.weekdays))
+        if self.excluded:
+            text += ", кроме " + ", ".join(day.strftime('%d.%m') for day in sorted(self.excluded))
+        return text
+
+CUSTOM_RANGE_HELP = (
+    "Введите свои даты одним сообщением:\n"
+    "• период: 01.05.2025-20.05.2025, с 01.05.2025 или до 31.05.2025\n"
+    "• дни недели (необязательно): пн-пт или сб, вс\n"
+    "• исключения (необязательно): кроме 09.05.2025, 10.05.2025\n\n"
+    "Например: 01.05.2025-31.05.2025 пн-пт кроме 09.05.2025"
+)
+
+RANGE_NAMES = {
+    'week': 'неделя',
+    'two_weeks': 'две недели',
+    'month': 'месяц',
+    'any': 'любой период'
+}
+
+def describe_range(preferred_range: str) -> str:
+    """Human-readable text of a named range or a custom window."""
+    window = DateWindow.from_range(preferred_range)
+    if window is not None:
+        return window.describe()
+    return RANGE_NAMES.get(preferred_range, 'любой период')
+
+class _IntervalNode:
+    __slots__ = ('center', 'starts', 'by_start', 'ends', 'by_end', 'left', 'right')
+
+def _build_interval_tree(intervals: List[Tuple[int, int, int]]) -> Optional[_IntervalNode]:
+    """Centered interval tree over (start, end, chat_id) day-ordinal intervals."""
+    if not intervals:
+        return None
+    points = sorted(point for start, end, _ in intervals for point in (start, end))
+    node = _IntervalNode()
+    node.center = points[len(points) // 2]
+    here = [interval for interval in intervals if interval[0] <= node.center <= interval[1]]
+    here.sort(key=lambda interval: interval[0])
+    node.starts = [interval[0] for interval in here]
+    node.by_start = [interval[2] for interval in here]
+    here.sort(key=lambda interval: interval[1])
+    node.ends = [interval[1] for interval in here]
+    node.by_end = [interval[2] for interval in here]
+    node.left = _build_interval_tree([interval for interval in intervals if interval[1] < node.center])
+    node.right = _build_interval_tree([interval for interval in intervals if interval[0] > node.center])
+    return node
+
+class IntervalIndex:
+    """
+    Custom date windows of chats, indexed by a centered interval tree.
+
+    The tree is rebuilt lazily on the first query after a change, so a
+    burst of subscriptions costs one O(n log n) build. Finding every
+    window that contains a day is O(log n + k); the weekday and exclusion
+    filters then only look at the k candidates.
+    """
+
+    FIRST_DAY = 1
+    LAST_DAY = date.max.toordinal()
+
+    def __init__(self):
+        self._windows: Dict[int, DateWindow] = {}
+        self._tree: Optional[_IntervalNode] = None
+        self._dirty = False
+
+    def add(self, chat_id: int, window: DateWindow) -> None:
+        self._windows[chat_id] = window
+        self._dirty = True
+
+    def discard(self, chat_id: int) -> None:
+        if self._windows.pop(chat_id, None) is not None:
+            self._dirty = True
+
+    def clear(self) -> None:
+        self._windows.clear()
+        self._tree = None
+        self._dirty = False
+
+    def _root(self) -> Optional[_IntervalNode]:
+        if self._dirty:
+            self._tree = _build_interval_tree([
+                (window.start.toordinal() if window.start else self.FIRST_DAY,
+                 window.end.toordinal() if window.end else self.LAST_DAY,
+                 chat_id)
+                for chat_id, window in self._windows.items()
+            ])
+            self._dirty = False
+        return self._tree
+
+    def stab(self, day: date) -> List[int]:
+        """Chats whose window contains the day and whose filters allow it."""
+        point = day.toordinal()
+        found = []
+        node = self._root()
+        while node is not None:
+            if point < node.center:
+                found.extend(node.by_start[:bisect_right(node.starts, point)])
+                node = node.left
+            elif point > node.center:
+                found.extend(node.by_end[bisect_left(node.ends, point):])
+                node = node.right
+            else:
+                found.extend(node.by_start)
+                break
+        return [chat_id for chat_id in found if self._windows[chat_id].allows(day)]
+
+    def chat_ids(self) -> Set[int]:
+        return set(self._windows)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._windows
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+class RangeIndex:
+    """
+    Chats grouped by the horizon of their date range.
+
+    A found date matches every horizon that reaches it, so one lookup by
+    the earliest found date is a bisect over the sorted horizons plus a
+    union of the matching buckets: the cost depends on the number of
+    distinct horizons, not on the number of chats. Custom windows live in
+    an IntervalIndex and are matched per found date. Not thread-safe on
+    its own; the owning registry holds the lock.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Optional[int], Set[int]] = {}
+        self._horizons: List[int] = []  # отсортированные горизонты непустых корзин (без None)
+        self._members: Dict[int, Optional[int]] = {}
+        self._windows = IntervalIndex()
+
+    def add(self, chat_id: int, preferred_range: str) -> None:
+        self.discard(chat_id)
+        window = DateWindow.from_range(preferred_range)
+        if window is not None:
+            self._windows.add(chat_id, window)
+            return
+        horizon = range_horizon(preferred_range)
+        bucket = self._buckets.get(horizon)
+        if bucket is None:
+            bucket = self._buckets[horizon] = set()
+            if horizon is not None:
+                self._horizons.insert(bisect_left(self._horizons, horizon), horizon)
+        bucket.add(chat_id)
+        self._members[chat_id] = horizon
+
+    def discard(self, chat_id: int) -> None:
+        self._windows.discard(chat_id)
+        if chat_id not in self._members:
+            return
+        horizon = self._members.pop(chat_id)
+        bucket = self._buckets[horizon]
+        bucket.discard(chat_id)
+        if not bucket:
+            del self._buckets[horizon]
+            if horizon is not None:
+                self._horizons.pop(bisect_left(self._horizons, horizon))
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._horizons.clear()
+        self._members.clear()
+        self._windows.clear()
+
+    def match(self, dates: List[str], today: Optional[date] = None) -> Set[int]:
+        """
+        Chats whose range contains at least one of the found dates.
+
+        Without parsable dates every chat matches (the slot is open but its
+        date is unknown); if all dates are in the past only 'any' matches.
+        """
+        parsed = [value.date() for value in map(parse_date, dates or []) if value]
+        if not parsed:
+            return set(self._members) | self._windows.chat_ids()
+        today = today or date.today()
+        matched = set(self._buckets.get(None, ()))
+        upcoming = [value for value in parsed if value >= today]
+        if not upcoming:
+            return matched
+        # Все горизонты не короче расстояния до самой ранней даты
+        for horizon in self._horizons[bisect_left(self._horizons, (min(upcoming) - today).days):]:
+            matched |= self._buckets[horizon]
+        if len(self._windows):
+            for day in set(upcoming):
+                matched.update(self._windows.stab(day))
+        return matched
+
+    def __len__(self) -> int:
+        return len(self._members) + len(self._windows)
+
+def range_matches(preferred_range: str, dates: List[str], today: Optional[date] = None) -> bool:
+    """Check one range against the found dates with the same rule as RangeIndex.match."""
+    index = RangeIndex()
+    index.add(0, preferred_range)
+    return 0 in index.match(dates, today)
+
+@dataclass
+class Subscription:
+    """A chat subscribed to availability updates for one service."""
+    chat_id: int
+    preferred_range: str = 'any'
+    service_id: int = 147
+    locations: Optional[Tuple[int, ...]] = None  # standortid; None - все локации
+
+class SubscriptionRegistry:
+    """
+    Thread-safe registry of subscribed chats grouped by service.
+
+    The monitoring loop probes every service once per cycle and fans the
+    result out to the subscribers returned by `subscribers(service_id)`.
+    utils.subscribers.SubscriberRegistry adds persistence on top of it.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Subscription] = {}
+        self._ranges: Dict[int, RangeIndex] = {}  # service_id -> индекс диапазонов
+        self._lock = threading.RLock()
+
+    def subscribe(self,
+                  chat_id: int,
+                  preferred_range: str = 'any',
+                  service_id: Optional[int] = None,
+                  locations: Optional[Tuple[int, ...]] = None) -> Subscription:
+        """Add or replace the subscription of a chat."""
+        subscription = Subscription(
+            chat_id=chat_id,
+            preferred_range=preferred_range,
+            service_id=service_id or settings.slot_checker.default_service_id,
+            locations=tuple(locations) if locations is not None else None
+        )
+        with self._lock:
+            self._index(subscription)
+        return subscription
+
+    def _index(self, subscription: Subscription) -> None:
+        # Вызывается под self._lock; замена подписки не меняет порядок чатов
+        previous = self._subscriptions.get(subscription.chat_id)
+        if previous is not None:
+            self._unindex_range(previous)
+        self._subscriptions[subscription.chat_id] = subscription
+        self._ranges.setdefault(subscription.service_id, RangeIndex()).add(
+            subscription.chat_id, subscription.preferred_range
+        )
+
+    def _unindex(self, chat_id: int) -> Optional[Subscription]:
+        # Вызывается под self._lock
+        subscription = self._subscriptions.pop(chat_id, None)
+        if subscription is not None:
+            self._unindex_range(subscription)
+        return subscription
+
+    def _unindex_range(self, subscription: Subscription) -> None:
+        # Вызывается под self._lock
+        ranges = self._ranges[subscription.service_id]
+        ranges.discard(subscription.chat_id)
+        if not len(ranges):
+            del self._ranges[subscription.service_id]
+
+    def unsubscribe(self, chat_id: int) -> bool:
+        """Remove a chat; returns False if it was not subscribed."""
+        with self._lock:
+            return self._unindex(chat_id) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._subscriptions.clear()
+            self._ranges.clear()
+
+    def get(self, chat_id: int) -> Optional[Subscription]:
+        with self._lock:
+            return self._subscriptions.get(chat_id)
+
+    def services(self) -> Set[int]:
+        """Services that have at least one subscriber."""
+        with self._lock:
+            return {s.service_id for s in self._subscriptions.values()}
+
+    def subscribers(self, service_id: int) -> List[Subscription]:
+        """Snapshot of the subscribers of a service."""
+        with self._lock:
+            return [s for s in self._subscriptions.values() if s.service_id == service_id]
+
+    def matching(self, service_id: Optional[int], dates: List[str], today: Optional[date] = None) -> Set[int]:
+        """
+        Chats of a service whose date range contains one of the found dates.
+
+        service_id=None matches the chats of every service.
+        """
+        with self._lock:
+            if service_id is None:
+                matched = set()
+                for ranges in self._ranges.values():
+                    matched |= ranges.match(dates, today)
+                return matched
+            ranges = self._ranges.get(service_id)
+            return ranges.match(dates, today) if ranges else set()
+
+    def __contains__(self, chat_id: int) -> bool:
+        with self._lock:
+            return chat_id in self._subscriptions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
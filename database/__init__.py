@@ -0,0 +1 @@
+# Пустой файл инициализации для создания пакета
@@ -0,0 +1,231 @@
+"""
+Хранилище бота на SQLite: пользователи, их настройки и результаты проверок.
+
+База работает в режиме WAL: чтения не ждут записи, а запись из потока
+мониторинга не блокирует обработчики команд. У каждого потока одно
+долгоживущее соединение, поэтому sqlite3 переиспользует подготовленные
+выражения (кэш по тексту запроса), а файл не открывается заново на каждый
+вызов.
+
+Схема версионируется через PRAGMA user_version: при открытии базы
+применяются недостающие миграции из MIGRATIONS.
+
+Диапазоны дат пользователей читаются в цикле рассылки на каждой проверке,
+поэтому они целиком загружаются в память при первом обращении, а
+update_user_preferred_dates обновляет и базу, и кэш. Чтобы кэш был общим,
+используйте один обработчик на файл базы - get_database().
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+# Миграции схемы: (версия, список выражений). Новые версии только добавляются в конец.
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            preferred_range TEXT,
+            is_checking INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_activity REAL NOT NULL
+        )
+        """,
+        # Частичный индекс: подписчиков с включенной проверкой мало по сравнению со всеми пользователями
+        "CREATE INDEX IF NOT EXISTS idx_users_checking ON users (user_id) WHERE is_checking = 1",
+        """
+        CREATE TABLE IF NOT EXISTS check_results (
+            id INTEGER PRIMARY KEY,
+            checked_at REAL NOT NULL,
+            available INTEGER NOT NULL,
+            message TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_check_results_checked_at ON check_results (checked_at)",
+        "CREATE INDEX IF NOT EXISTS idx_check_results_available ON check_results (available, checked_at)",
+    ]),
+]
+
+SQL_ADD_USER = """
+INSERT INTO users (user_id, username, first_name, last_name, created_at, last_activity)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    username = excluded.username,
+    first_name = excluded.first_name,
+    last_name = excluded.last_name,
+    last_activity = excluded.last_activity
+"""
+
+SQL_TOUCH_USER = """
+INSERT INTO users (user_id, created_at, last_activity) VALUES (?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET last_activity = excluded.last_activity
+"""
+
+SQL_SET_PREFERRED_RANGE = """
+INSERT INTO users (user_id, preferred_range, created_at, last_activity) VALUES (?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    preferred_range = excluded.preferred_range,
+    last_activity = excluded.last_activity
+"""
+
+SQL_ALL_PREFERRED_RANGES = "SELECT user_id, preferred_range FROM users WHERE preferred_range IS NOT NULL"
+
+SQL_SET_CHECKING = """
+INSERT INTO users (user_id, is_checking, created_at, last_activity) VALUES (?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET is_checking = excluded.is_checking
+"""
+
+SQL_CHECKING_USERS = "SELECT user_id FROM users WHERE is_checking = 1"
+
+SQL_SAVE_CHECK_RESULT = "INSERT INTO check_results (checked_at, available, message) VALUES (?, ?, ?)"
+
+SQL_RECENT_CHECK_RESULTS = """
+SELECT checked_at, available, message FROM check_results ORDER BY checked_at DESC LIMIT ?
+"""
+
+
+class DatabaseHandler:
+    """
+    Доступ к базе бота.
+
+    Объект можно разделять между потоками: соединение открывается лениво,
+    по одному на поток, и живет до close().
+    """
+
+    def __init__(self, db_path="database/booking_bot.db", timeout=5.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Кэш диапазонов дат {user_id: диапазон}, загружается при первом чтении
+        self._preferred_dates = None
+        self._preferred_lock = threading.Lock()
+        self.migrate()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # В WAL достаточно NORMAL: после сбоя питания теряется максимум последняя транзакция
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _execute(self, sql, params=()):
+        """Выполняет одно изменяющее выражение в отдельной транзакции; True при успехе."""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(sql, params)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка записи в базу {self.db_path}: {e}")
+            return False
+
+    def migrate(self):
+        """Применяет недостающие миграции схемы."""
+        connection = self._connection()
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in MIGRATIONS:
+            if target <= version:
+                continue
+            with connection:
+                for statement in statements:
+                    connection.execute(statement)
+                # PRAGMA не принимает параметры; версия - целое из MIGRATIONS
+                connection.execute(f"PRAGMA user_version = {int(target)}")
+            logger.info(f"База {self.db_path}: применена миграция {target}")
+            version = target
+        return version
+
+    def add_user(self, user_id, username=None, first_name=None, last_name=None):
+        """Добавляет пользователя или обновляет его имя."""
+        now = time.time()
+        return self._execute(SQL_ADD_USER, (user_id, username, first_name, last_name, now, now))
+
+    def update_user_activity(self, user_id):
+        """Отмечает время последней активности пользователя."""
+        now = time.time()
+        return self._execute(SQL_TOUCH_USER, (user_id, now, now))
+
+    def update_user_preferred_dates(self, user_id, preferred_range):
+        """Сохраняет выбранный пользователем диапазон дат (в базе и в кэше)."""
+        now = time.time()
+        saved = self._execute(SQL_SET_PREFERRED_RANGE, (user_id, preferred_range, now, now))
+        with self._preferred_lock:
+            if not saved:
+                # Состояние базы неизвестно - перечитаем при следующем обращении
+                self._preferred_dates = None
+            elif self._preferred_dates is not None:
+                self._preferred_dates[int(user_id)] = preferred_range
+        return saved
+
+    def _preference_cache(self):
+        with self._preferred_lock:
+            if self._preferred_dates is None:
+                self._preferred_dates = dict(self._connection().execute(SQL_ALL_PREFERRED_RANGES).fetchall())
+            return self._preferred_dates
+
+    def get_user_preferred_dates(self, user_id):
+        """Возвращает диапазон дат пользователя или None, если он не выбран (из кэша)."""
+        return self._preference_cache().get(int(user_id))
+
+    def get_all_preferred_dates(self):
+        """Возвращает {user_id: диапазон} для всех пользователей с выбранным диапазоном."""
+        cache = self._preference_cache()
+        with self._preferred_lock:
+            return dict(cache)
+
+    def update_checking_status(self, user_id, is_checking):
+        """Включает или выключает проверку для пользователя."""
+        now = time.time()
+        return self._execute(SQL_SET_CHECKING, (user_id, int(bool(is_checking)), now, now))
+
+    def get_checking_users(self):
+        """ID пользователей с включенной проверкой."""
+        return [row[0] for row in self._connection().execute(SQL_CHECKING_USERS)]
+
+    def save_check_result(self, available, message, checked_at=None):
+        """Сохраняет результат одной проверки."""
+        return self._execute(SQL_SAVE_CHECK_RESULT, (checked_at or time.time(), int(bool(available)), message))
+
+    def get_recent_check_results(self, limit=10):
+        """Последние результаты проверок: список (время, доступность, сообщение), новые первыми."""
+        rows = self._connection().execute(SQL_RECENT_CHECK_RESULTS, (limit,)).fetchall()
+        return [(checked_at, bool(available), message) for checked_at, available, message in rows]
+
+    def close(self):
+        """Закрывает соединения всех потоков."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+        with self._preferred_lock:
+            self._preferred_dates = None
+
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def get_database(db_path="database/booking_bot.db"):
+    """Общий DatabaseHandler для файла базы: одни соединения и один кэш на процесс."""
+    with _handlers_lock:
+        handler = _handlers.get(db_path)
+        if handler is None:
+            handler = _handlers[db_path] = DatabaseHandler(db_path)
+        return handler
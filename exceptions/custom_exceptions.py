@@ -2,10 +2,23 @@ class BrowserException(Exception):
     """Base exception for browser-related errors."""
     pass
 
+class SideStepException(BrowserException):
+    """A step of a Selenium IDE scenario could not be executed."""
+    def __init__(self, step, error):
+        super().__init__(f"{step.caption}: {error}")
+        self.step = step
+        self.error = error
+
 class NotificationException(Exception):
     """Base exception for notification-related errors."""
     pass
 
+class RateLimitException(NotificationException):
+    """Telegram answered 429 Too Many Requests."""
+    def __init__(self, retry_after):
+        super().__init__(f"Telegram rate limit, retry after {retry_after}s")
+        self.retry_after = retry_after
+
 class SlotCheckException(Exception):
     """Base exception for slot checking errors."""
     pass
@@ -20,12 +20,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import config
 from utils.logger import setup_logger
 from utils.helpers import create_project_dirs
-from database.db_handler import DatabaseHandler
+from database.db_handler import get_database
 from browser_manager.browser import BrowserHandler
+from utils.telegram_client import close_async_telegram_clients
+from utils.slot_series import get_slot_series
+from utils.subscribers import get_subscribers
 from browser_manager.actions import BookingChecker
 from telegram_bot.bot import TelegramBot
 from core.slot_checker import SlotChecker
-from core.notifications import NotificationManager
+from core.subscriptions import DateWindow, CUSTOM_RANGE_HELP
 from config.settings import settings
 from metrics.prometheus import ACTIVE_CHECKS
 
@@ -38,10 +41,13 @@ class BookingBot:
     """
     
     def __init__(self):
-        self.slot_checker = SlotChecker()
-        self.notifier = NotificationManager()
-        self.db = DatabaseHandler()
-        self.active_monitors = {}  # chat_id -> monitoring task
+        # Подписки общие с telegram_bot и рассылкой: реестр хранится в базе
+        self.slot_checker = SlotChecker(subscriptions=get_subscribers())
+        # Один NotificationManager на процесс: лимиты Telegram общие для бота
+        self.notifier = self.slot_checker.notifier
+        self.db = get_database()
+        self.subscriptions = self.slot_checker.subscriptions
+        self.monitor_task = None  # общий цикл проверки для всех подписчиков
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
@@ -53,7 +59,8 @@ class BookingBot:
         # Запрашиваем предпочтительный диапазон дат
         keyboard = [
             ["неделя", "две недели"],
-            ["месяц", "любой период"]
+            ["месяц", "любой период"],
+            ["свои даты"]
         ]
         
         await context.bot.send_message(
@@ -74,13 +81,22 @@ class BookingBot:
             "любой период": "any"
         }
         
+        if selected_range == "свои даты":
+            await context.bot.send_message(chat_id=chat_id, text=CUSTOM_RANGE_HELP)
+            return
+        
         preferred_range = range_mapping.get(selected_range)
         if not preferred_range:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Неверный выбор диапазона. Используйте кнопки."
-            )
-            return
+            # Не кнопка - пробуем разобрать свое окно дат
+            window = DateWindow.parse_text(selected_range)
+            if window is None:
+                await context.bot.send_message(
+                    chat_id=chat_id,
+                    text="❌ Неверный выбор диапазона. Используйте кнопки или введите даты.\n\n" + CUSTOM_RANGE_HELP
+                )
+                return
+            preferred_range = window.to_range()
+            selected_range = window.describe()
             
         # Сохраняем предпочтения пользователя
         self.db.update_user_preferred_dates(chat_id, preferred_range)
@@ -109,14 +125,14 @@ class BookingBot:
         """Handle /status command."""
         chat_id = update.effective_chat.id
         
-        is_active = chat_id in self.active_monitors
+        is_active = chat_id in self.subscriptions
         preferred_range = self.db.get_user_preferred_dates(chat_id) or "any"
         
         status_text = (
             f"📊 *Статус мониторинга*\n\n"
             f"🔄 Активен: {'✅' if is_active else '❌'}\n"
             f"📅 Диапазон дат: {self.slot_checker._get_range_text(preferred_range)}\n"
-            f"👥 Всего активных проверок: {len(self.active_monitors)}"
+            f"👥 Всего подписчиков: {len(self.subscriptions)}"
         )
         
         await context.bot.send_message(
@@ -126,31 +142,46 @@ class BookingBot:
         )
         
     async def start_monitoring(self, chat_id: int, preferred_range: str):
-        """Start monitoring for a specific user."""
-        if chat_id in self.active_monitors:
-            await self.stop_monitoring(chat_id)
+        """Subscribe a user to the shared monitoring loop."""
+        self.subscriptions.subscribe(chat_id, preferred_range)
+        self._start_monitor_task()
+        
+    async def resume_monitoring(self, application=None):
+        """Restart the shared loop for subscribers saved before a restart."""
+        if len(self.subscriptions):
+            logger.info(f"Возобновляем мониторинг для {len(self.subscriptions)} подписчиков")
+            self._start_monitor_task()
             
-        # Создаем новую задачу мониторинга
-        task = asyncio.create_task(
-            self.slot_checker.start_monitoring(chat_id, preferred_range)
-        )
-        self.active_monitors[chat_id] = task
+    def _start_monitor_task(self):
+        # Один цикл проверки обслуживает всех подписчиков
+        if self.monitor_task is None or self.monitor_task.done():
+            self.slot_checker.stop_event.clear()
+            self.monitor_task = asyncio.create_task(
+                self.slot_checker.start_monitoring()
+            )
         
     async def stop_monitoring(self, chat_id: int):
-        """Stop monitoring for a specific user."""
-        if chat_id in self.active_monitors:
-            task = self.active_monitors.pop(chat_id)
-            self.slot_checker.stop_event.set()
-            await task
-            self.slot_checker.stop_event.clear()
+        """Unsubscribe a user; stop the loop when nobody is left."""
+        self.subscriptions.unsubscribe(chat_id)
+        if not len(self.subscriptions):
+            await self._stop_monitor_task()
             
     async def stop_all_monitoring(self):
         """Stop all monitoring tasks."""
-        tasks = []
-        for chat_id in list(self.active_monitors.keys()):
-            tasks.append(self.stop_monitoring(chat_id))
-        if tasks:
-            await asyncio.gather(*tasks)
+        # Подписки не очищаем: они хранятся в базе и переживают перезапуск
+        await self._stop_monitor_task()
+        await self.notifier.close()
+        await close_async_telegram_clients()
+        # Дописываем незавершенные интервалы временных рядов
+        get_slot_series().flush()
+
+    async def _stop_monitor_task(self):
+        """Stop the shared monitoring loop and wait for it to finish."""
+        if self.monitor_task is not None:
+            self.slot_checker.stop_event.set()
+            await self.monitor_task
+            self.monitor_task = None
+            self.slot_checker.stop_event.clear()
 
 def signal_handler(sig, frame):
     """Обработчик сигналов завершения (Ctrl+C)."""
@@ -171,7 +202,12 @@ def main():
         
         # Инициализация бота
         bot = BookingBot()
-        application = Application.builder().token(settings.notifications.telegram_token).build()
+        application = (
+            Application.builder()
+            .token(settings.notifications.telegram_token)
+            .post_init(bot.resume_monitoring)
+            .build()
+        )
         
         # Регистрация обработчиков команд
         application.add_handler(CommandHandler("start", bot.start_command))
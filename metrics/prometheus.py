@@ -41,4 +41,94 @@ NOTIFICATION_ERRORS = Counter(
     'notification_errors_total',
     'Total notification errors',
     ['error_type']
-) 
\ No newline at end of file
+)
+
+# Метрики пула драйверов
+DRIVER_POOL_CHECKOUTS = Counter(
+    'driver_pool_checkouts_total',
+    'Driver pool checkouts by result (hit, miss, timeout)',
+    ['result']
+)
+
+DRIVER_POOL_CHECKOUT_DURATION = Histogram(
+    'driver_pool_checkout_duration_seconds',
+    'Time spent waiting for a driver from the pool'
+)
+
+DRIVER_POOL_DRIVERS = Gauge(
+    'driver_pool_drivers',
+    'Number of pooled drivers by state',
+    ['state']
+)
+
+DRIVER_POOL_RECYCLED = Counter(
+    'driver_pool_recycled_total',
+    'Number of pooled drivers recycled',
+    ['reason']
+)
+
+PARKED_SESSION_CHECKS = Counter(
+    'parked_session_checks_total',
+    'Checks served by refreshing the parked location page or by a full replay',
+    ['mode']
+)
+
+SIDE_STEP_DURATION = Histogram(
+    'side_step_duration_seconds',
+    'Time spent on each step of the Selenium IDE scenario',
+    ['step', 'command']
+)
+
+HTTP_CHECKS = Counter(
+    'http_checks_total',
+    'HTTP engine checks by mode (refresh, replay) and result',
+    ['mode', 'result']
+)
+
+HTTP_CHECK_DURATION = Histogram(
+    'http_check_duration_seconds',
+    'Time spent on one HTTP engine check'
+)
+
+HTTP_RESPONSE_BYTES = Counter(
+    'http_response_bytes_total',
+    'Bytes downloaded by the HTTP engine'
+)
+
+# Метрики скриншотов
+SCREENSHOT_UPDATES = Counter(
+    'screenshot_updates_total',
+    'Status screenshot updates by result (uploaded, caption, skipped)',
+    ['result']
+)
+
+# Метрики очереди уведомлений
+OUTBOX_WAIT = Histogram(
+    'outbox_wait_seconds',
+    'Time a notification spent in the outbox before being sent',
+    ['lane']
+)
+
+OUTBOX_RATE_LIMITED = Counter(
+    'outbox_rate_limited_total',
+    'Telegram 429 responses handled by the outbox'
+)
+
+OUTBOX_EDITS_COALESCED = Counter(
+    'outbox_edits_coalesced_total',
+    'Status edits replaced by a newer edit before being sent'
+)
+
+# Метрики рассылки
+BROADCAST_LATENCY = Histogram(
+    'broadcast_delivery_seconds',
+    'Time from the start of a broadcast until delivery to one recipient',
+    ['kind'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+
+PHOTO_UPLOADS = Counter(
+    'telegram_photo_sends_total',
+    'Photos sent to Telegram by source (upload or cached file_id)',
+    ['source']
+)
\ No newline at end of file
@@ -18,7 +18,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import config
 from utils.logger import setup_logger
 from utils.helpers import create_project_dirs
-from database.db_handler import DatabaseHandler
+from database.db_handler import get_database
 from browser_manager.browser import BrowserHandler
 from browser_manager.actions import BookingChecker
 from telegram_bot.bot import TelegramBot
@@ -51,8 +51,7 @@ def main():
     
     try:
         # Инициализируем обработчик базы данных
-        db_path = "database/" + config.DB_NAME
-        db_handler = DatabaseHandler(db_path)
+        db_handler = get_database(config.DB_PATH)
         logger.info("База данных инициализирована")
         
         # Инициализируем обработчик браузера
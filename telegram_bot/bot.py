@@ -1,4 +1,4 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters, CallbackContext, CallbackQueryHandler
 from loguru import logger
 import threading
@@ -6,8 +6,16 @@ import time
 import random
 import schedule
 from browser_manager.browser import BrowserHandler
+from browser_manager.pool import close_driver_pools
+from browser_manager.parked import ParkedSession
+from config.config import PARKED_SESSION
 from utils.notification import send_telegram_notification, load_last_message_ids, save_last_message_ids, send_photo_with_caption, load_chat_ids
-from booking_monitor import check_booking_availability, save_booking_status, should_send_notification, save_notification_time
+from utils.slot_series import get_slot_series
+from utils.subscribers import get_subscribers
+from core.subscriptions import DateWindow, CUSTOM_RANGE_HELP
+from utils.screenshots import trace_frames
+from utils.telegram_client import close_telegram_clients
+from booking_monitor import check_booking_availability, save_booking_status, should_send_notification, save_notification_time, close_parked_session
 import os
 
 class TelegramBot:
@@ -30,6 +38,7 @@ class TelegramBot:
         # Регистрируем обработчики команд
         dp.add_handler(CommandHandler("start", self.cmd_start))
         dp.add_handler(CommandHandler("help", self.cmd_help))
+        dp.add_handler(CommandHandler("trace", self.cmd_trace))
         dp.add_handler(MessageHandler(Filters.text & ~Filters.command, self.handle_message))
         
         # Добавляем обработчик для CallbackQuery (нажатия на inline-кнопки)
@@ -50,8 +59,18 @@ class TelegramBot:
         
         self.stop_checking()
         
+        # Возвращаем припаркованный драйвер и закрываем прогретые браузеры
+        close_parked_session()
+        close_driver_pools()
+        
+        # Закрываем соединения с Telegram API
+        close_telegram_clients()
+        
         # Сохраняем ID последних сообщений
         save_last_message_ids()
+        
+        # Дописываем незавершенные интервалы временных рядов
+        get_slot_series().flush()
     
     def cmd_start(self, update: Update, context: CallbackContext):
         """Обрабатывает команду /start."""
@@ -92,16 +111,39 @@ class TelegramBot:
             "   - В течение недели\n"
             "   - В течение 2 недель\n"
             "   - В течение месяца\n"
+            "   - Свои даты: период, дни недели и исключения\n"
             "3. Бот будет проверять наличие слотов каждые 4-7 минут\n"
             "4. При обнаружении доступных слотов вы получите уведомление\n"
             "5. Для остановки проверки отправьте *стоп*\n\n"
             "Дополнительные команды:\n"
             "*проверить* - проверить доступность слотов сейчас\n"
             "*статус* - узнать, активны ли проверки\n"
+            "/trace - скриншоты шагов последних проверок\n"
         )
         
         update.message.reply_text(message, parse_mode='Markdown')
     
+    def cmd_trace(self, update: Update, context: CallbackContext):
+        """Обрабатывает команду /trace: отправляет кадры из буфера скриншотов."""
+        frames = trace_frames(update.effective_chat.id)
+        if frames is None:
+            update.message.reply_text("Команда /trace доступна только администратору бота.")
+            return
+        if not frames:
+            update.message.reply_text("Буфер скриншотов пуст - проверок еще не было.")
+            return
+        
+        # Telegram принимает до 10 фото в одной группе
+        for start in range(0, len(frames), 10):
+            media = [
+                InputMediaPhoto(
+                    frame.image,
+                    caption=f"{frame.captured_at:%H:%M:%S} {frame.caption}"[:1024]
+                )
+                for frame in frames[start:start + 10]
+            ]
+            update.message.reply_media_group(media)
+    
     def handle_message(self, update: Update, context: CallbackContext):
         """Обрабатывает текстовые сообщения."""
         try:
@@ -127,10 +169,17 @@ class TelegramBot:
             elif message in ['статус', 'status']:
                 self.check_status(update, context)
                 
+            elif message in ['трасса', 'trace']:
+                self.cmd_trace(update, context)
+                
             elif message in ['проверить', 'check', 'тест', 'test']:
                 update.message.reply_text("Запускаю проверку в видимом режиме...", parse_mode='Markdown')
                 self.run_single_check(update, context)
                 
+            elif context.user_data.get('awaiting_date_window'):
+                # После кнопки "Свои даты" ждем окно дат
+                self.handle_date_window(update, context)
+                
             else:
                 update.message.reply_text(
                     "Не понимаю команду. Доступные команды:\n"
@@ -149,6 +198,10 @@ class TelegramBot:
     
     def stop_checking(self, update=None, context=None):
         """Останавливает периодическую проверку доступности слотов."""
+        if update:
+            # Пользователь отписался - рассылка (load_chat_ids) больше его не включает
+            get_subscribers().unsubscribe(update.effective_chat.id)
+
         if not self.is_checking:
             if update:
                 update.message.reply_text("Проверка уже остановлена!")
@@ -190,12 +243,13 @@ class TelegramBot:
         message = update.message.reply_text("🔍 Проверяю наличие доступных слотов...", parse_mode='Markdown')
         
         try:
-            # Инициализируем браузер с большим таймаутом
+            # Берем браузер с большим таймаутом из пула
             browser = BrowserHandler(headless=False, timeout=60)
-            driver = browser.init_driver()
-            
-            # Запускаем проверку
-            available, msg = browser.run_selenium_side_script(driver, [chat_id])  # Передаем chat_id списком
+            with browser.checkout_driver() as driver:
+                # Запускаем проверку
+                available, msg = browser.run_selenium_side_script(driver, [chat_id])  # Передаем chat_id списком
+                # Снимок итогового состояния этой проверки, без общего файла на диске
+                screenshot = browser.capture_screenshot(driver)
             logger.info(f"Результат: Доступность={available}, Сообщение={msg}")
             
             if available:
@@ -207,15 +261,13 @@ class TelegramBot:
                 send_telegram_notification(
                     chat_id,
                     f"🚨 *{msg}*",
-                    "current_state.png",
+                    screenshot,
                     self.config['TELEGRAM_TOKEN']
                 )
             else:
                 # Слоты не найдены
                 update.message.reply_text(f"❌ {msg}", parse_mode='Markdown')
             
-            # Закрываем браузер
-            browser.close(driver)
             return available, msg
         except Exception as e:
             update.message.reply_text(f"❌ Ошибка при проверке: {str(e)}")
@@ -241,7 +293,8 @@ class TelegramBot:
             [InlineKeyboardButton("Любые даты", callback_data='date_range_any')],
             [InlineKeyboardButton("В течение недели", callback_data='date_range_week')],
             [InlineKeyboardButton("В течение 2 недель", callback_data='date_range_two_weeks')],
-            [InlineKeyboardButton("В течение месяца", callback_data='date_range_month')]
+            [InlineKeyboardButton("В течение месяца", callback_data='date_range_month')],
+            [InlineKeyboardButton("Свои даты и дни недели", callback_data='date_range_custom')]
         ]
         
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -278,6 +331,12 @@ class TelegramBot:
             # Обрабатываем выбор диапазона дат
             date_range = callback_data.replace('date_range_', '')
             
+            if date_range == 'custom':
+                # Окно дат пользователь присылает следующим сообщением
+                context.user_data['awaiting_date_window'] = True
+                query.edit_message_text(text=CUSTOM_RANGE_HELP)
+                return
+            
             if date_range == 'any':
                 message = "Вы выбрали мониторинг для <b>любых дат</b>.\n\nЗапускаю проверку..."
                 readable_range = "любые даты"
@@ -300,11 +359,30 @@ class TelegramBot:
                 parse_mode='HTML'
             )
             
-            # Обновляем предпочтительный диапазон дат пользователя
-            self.db_handler.update_user_preferred_dates(chat_id, date_range)
-            
-            # Запускаем мониторинг с выбранным диапазоном
-            self.start_monitoring_with_range(chat_id, date_range)
+            self.apply_date_range(chat_id, date_range)
+    
+    def apply_date_range(self, chat_id, date_range):
+        """Сохраняет диапазон дат пользователя и запускает мониторинг с ним."""
+        # Обновляем предпочтительный диапазон дат пользователя
+        self.db_handler.update_user_preferred_dates(chat_id, date_range)
+        get_subscribers().subscribe(chat_id, preferred_range=date_range)
+        
+        # Запускаем мониторинг с выбранным диапазоном
+        self.start_monitoring_with_range(chat_id, date_range)
+    
+    def handle_date_window(self, update: Update, context: CallbackContext):
+        """Разбирает окно дат, присланное после кнопки "Свои даты"."""
+        window = DateWindow.parse_text(update.message.text)
+        if window is None:
+            update.message.reply_text("Не удалось разобрать даты.\n\n" + CUSTOM_RANGE_HELP)
+            return
+        
+        context.user_data.pop('awaiting_date_window', None)
+        update.message.reply_text(
+            f"Вы выбрали мониторинг для дат: <b>{window.describe()}</b>.\n\nЗапускаю проверку...",
+            parse_mode='HTML'
+        )
+        self.apply_date_range(update.effective_chat.id, window.to_range())
     
     def start_monitoring_with_range(self, chat_id, date_range):
         """Запускает мониторинг с выбранным диапазоном дат."""
@@ -336,6 +414,9 @@ class TelegramBot:
             from config.config import TELEGRAM_TOKEN
             token = TELEGRAM_TOKEN
             
+            browser = BrowserHandler(headless=False, timeout=60)
+            parked_session = ParkedSession(browser) if PARKED_SESSION else None
+            
             while not self.stop_event.is_set():
                 try:
                     if consecutive_errors >= max_errors:
@@ -348,41 +429,38 @@ class TelegramBot:
                         )
                         break
                     
-                    # Инициализируем браузер
-                    browser = BrowserHandler(headless=False, timeout=60)
-                    driver = browser.init_driver()
+                    if parked_session:
+                        # Обновляем страницу выбора локации, полный проход - только при истекшей сессии
+                        result = parked_session.check([current_chat_id])
+                    else:
+                        # Берем прогретый браузер из пула
+                        with browser.checkout_driver() as driver:
+                            # Передаем chat_ids для обновления скриншотов в процессе
+                            result = browser.run_selenium_side_script(driver, [current_chat_id])  # Передаем ID чата в списке
+                    
+                    # Правильно обрабатываем возвращаемое значение
+                    if isinstance(result, tuple) and len(result) == 2:
+                        available, message = result
+                    else:
+                        available, message = False, "Неизвестный результат проверки"
                     
-                    try:
-                        # Передаем chat_ids для обновления скриншотов в процессе
-                        result = browser.run_selenium_side_script(driver, [current_chat_id])  # Передаем ID чата в списке
-                        
-                        # Правильно обрабатываем возвращаемое значение
-                        if isinstance(result, tuple) and len(result) == 2:
-                            available, message = result
-                        else:
-                            available, message = False, "Неизвестный результат проверки"
-                        
-                        # Сбрасываем счетчик ошибок при успешном выполнении
-                        consecutive_errors = 0
-                        
-                        # Сохраняем результат в базу данных
-                        self.db_handler.save_check_result(available, message)
-                        
-                        logger.info(f"Проверка завершена: доступность={available}, сообщение={message}")
-                        
-                        # После первого запуска сообщаем, что мониторинг работает
-                        if first_run:
-                            send_telegram_notification(
-                                current_chat_id,
-                                "✅ *Мониторинг запущен и работает*\n\nВы получите уведомление при появлении слотов в выбранном диапазоне.",
-                                None,
-                                token
-                            )
-                            first_run = False
-                        
-                    finally:
-                        # Закрываем браузер
-                        browser.close(driver)
+                    # Сбрасываем счетчик ошибок при успешном выполнении
+                    consecutive_errors = 0
+                    
+                    # Сохраняем результат в базу данных
+                    self.db_handler.save_check_result(available, message)
+                    
+                    logger.info(f"Проверка завершена: доступность={available}, сообщение={message}")
+                    
+                    # После первого запуска сообщаем, что мониторинг работает
+                    if first_run:
+                        send_telegram_notification(
+                            current_chat_id,
+                            "✅ *Мониторинг запущен и работает*\n\nВы получите уведомление при появлении слотов в выбранном диапазоне.",
+                            None,
+                            token
+                        )
+                        first_run = False
                     
                     # ВСЕГДА делаем паузу между проверками, независимо от результата
                     wait_time = random.randint(240, 420)  # 4-7 минут между проверками
@@ -399,6 +477,8 @@ class TelegramBot:
                     time.sleep(30)  # Короткий интервал при ошибке
             
             # После завершения цикла
+            if parked_session:
+                parked_session.close()
             self.is_checking = False
             self.db_handler.update_checking_status(current_chat_id, False)
             logger.info("Мониторинг завершен")
@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import config.config
+from config.settings import settings
+import utils.slot_series
+import utils.subscribers
+
+class FakeBotApi(BaseHTTPRequestHandler):
+    """
+    Минимальный Bot API: отвечает ok и запоминает запросы и соединения.
+
+    В server.errors можно положить ответы (status, payload) для метода - они
+    отдаются по одному перед обычным ответом.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        method = self.path.rsplit('/', 1)[-1]
+        self.server.calls.append((method, self.client_address[1], self.headers.get('Content-Type', ''), body))
+
+        errors = self.server.errors.get(method)
+        if errors:
+            status, payload = errors.pop(0)
+        else:
+            result = {'message_id': len(self.server.calls)}
+            if method in ('sendPhoto', 'editMessageMedia'):
+                result['photo'] = [{'file_id': f'small{len(self.server.calls)}'}, {'file_id': f'file{len(self.server.calls)}'}]
+            status, payload = 200, {'ok': True, 'result': result}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+@pytest.fixture(autouse=True)
+def no_pool_warm_up(monkeypatch):
+    """core.browser.BrowserHandler не запускает Chrome в фоне при создании SlotChecker в тестах."""
+    monkeypatch.setattr(settings.browser, 'pool_min_size', 0)
+
+@pytest.fixture(autouse=True)
+def slot_series(monkeypatch):
+    """Временные ряды проверок в тестах держим в памяти, а не в ./timeseries."""
+    series = utils.slot_series.SlotSeries()
+    monkeypatch.setattr(utils.slot_series, '_series', series)
+    return series
+
+@pytest.fixture(autouse=True)
+def subscribers(monkeypatch, tmp_path_factory):
+    """Общий реестр подписчиков в тестах - во временной базе (отдельно от tmp_path теста)."""
+    db_path = str(tmp_path_factory.mktemp('subscribers') / 'subscribers.db')
+    monkeypatch.setattr(config.config, 'SUBSCRIBERS_DB_PATH', db_path)
+    monkeypatch.setattr(utils.subscribers, '_registries', {})
+    registry = utils.subscribers.get_subscribers()
+    yield registry
+    registry.close()
+
+@pytest.fixture
+def bot_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBotApi)
+    server.calls = []
+    server.errors = {}
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
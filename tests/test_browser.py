@@ -1,11 +1,10 @@
 import pytest
 from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, PropertyMock, patch
 from browser_manager.browser import BrowserHandler
 from exceptions.custom_exceptions import BrowserException
-from database.db_handler import DatabaseHandler
 from metrics.prometheus import BROWSER_OPERATION_DURATION
+from utils.screenshots import frame_buffer
 
 # Инициализируем метрики с метками
 BROWSER_OPERATION_DURATION.labels(operation='init')
@@ -14,58 +13,52 @@ BROWSER_OPERATION_DURATION.labels(operation='init')
 def browser():
     return BrowserHandler()
 
+LOCATION_HTML = """
+<div class="float-left"><b>LBV Mitte Führerschein</b></div>
+<div class="clear-both">{text}</div>
+<div class="clear-both ">Sie können Termine bis zu 56 Tage im Voraus buchen.</div>
+<button class="btn LBV-choosebutton right-1" {disabled} onclick="callURL('terminauswahl.php?standortid=109');">auswählen </button>
+"""
+
 @pytest.fixture
 def mock_driver():
     driver = Mock()
-    driver.find_elements = Mock()
+    driver.page_source = ""
     driver.execute_script = Mock()
     return driver
 
 @pytest.fixture
-def mock_button():
-    button = Mock(spec=WebElement)
-    button.is_displayed = Mock(return_value=True)
-    button.is_enabled = Mock(return_value=True)
-    button.get_attribute = Mock(return_value=None)
-    return button
+def available_page():
+    return LOCATION_HTML.format(text="Termine verfügbar ab 01.05.2024", disabled="")
 
 @pytest.fixture
-def mock_date_element():
-    element = Mock(spec=WebElement)
-    element.text = "Termine verfügbar ab 01.05.2024"
-    return element
+def disabled_page():
+    return LOCATION_HTML.format(text="Derzeit sind keine freien Termine buchbar!", disabled='disabled=""')
 
 class TestCheckSlotsOnLocationPage:
     def test_no_buttons_found(self, browser, mock_driver):
         """Тест случая, когда кнопки auswählen не найдены"""
-        mock_driver.find_elements.return_value = []
+        mock_driver.page_source = "<html><body></body></html>"
         
         result, message = browser.check_slots_on_location_page(mock_driver)
         
         assert result is False
         assert "Нет доступных слотов" in message
-        mock_driver.find_elements.assert_called_once_with(
-            By.XPATH, "//button[contains(text(), 'auswählen')]"
-        )
+        mock_driver.find_elements.assert_not_called()
 
-    def test_buttons_found_but_not_clickable(self, browser, mock_driver, mock_button):
+    def test_buttons_found_but_not_clickable(self, browser, mock_driver, disabled_page):
         """Тест случая, когда кнопки найдены, но не кликабельны"""
-        mock_button.is_enabled.return_value = False
-        mock_driver.find_elements.return_value = [mock_button]
+        mock_driver.page_source = disabled_page
         
         result, message = browser.check_slots_on_location_page(mock_driver)
         
         assert result is False
         assert "Нет доступных слотов" in message
 
-    @patch('database.db_handler.DatabaseHandler')
-    def test_clickable_button_with_date_in_range(self, mock_db, browser, mock_driver, mock_button, mock_date_element):
+    @patch('browser_manager.browser.get_database')
+    def test_clickable_button_with_date_in_range(self, mock_db, browser, mock_driver, available_page):
         """Тест случая, когда найдена кликабельная кнопка с датой в выбранном диапазоне"""
-        # Настраиваем мок для кнопки и связанных элементов
-        mock_button.find_element.side_effect = [
-            Mock(find_element=Mock(return_value=mock_date_element))  # parent
-        ]
-        mock_driver.find_elements.return_value = [mock_button]
+        mock_driver.page_source = available_page
         
         # Настраиваем мок для базы данных
         mock_db_instance = Mock()
@@ -78,14 +71,10 @@ class TestCheckSlotsOnLocationPage:
         assert result is True
         assert "Доступна запись на даты: 01.05.2024" in message
 
-    @patch('database.db_handler.DatabaseHandler')
-    def test_clickable_button_with_date_not_in_range(self, mock_db, browser, mock_driver, mock_button, mock_date_element):
+    @patch('browser_manager.browser.get_database')
+    def test_clickable_button_with_date_not_in_range(self, mock_db, browser, mock_driver, available_page):
         """Тест случая, когда найдена кликабельная кнопка с датой вне выбранного диапазона"""
-        # Настраиваем мок для кнопки и связанных элементов
-        mock_button.find_element.side_effect = [
-            Mock(find_element=Mock(return_value=mock_date_element))  # parent
-        ]
-        mock_driver.find_elements.return_value = [mock_button]
+        mock_driver.page_source = available_page
         
         # Настраиваем мок для базы данных
         mock_db_instance = Mock()
@@ -101,7 +90,7 @@ class TestCheckSlotsOnLocationPage:
 
     def test_error_handling(self, browser, mock_driver):
         """Тест обработки ошибок"""
-        mock_driver.find_elements.side_effect = Exception("Test error")
+        type(mock_driver).page_source = PropertyMock(side_effect=Exception("Test error"))
         
         result, message = browser.check_slots_on_location_page(mock_driver)
         
@@ -109,14 +98,10 @@ class TestCheckSlotsOnLocationPage:
         assert "Ошибка" in message
 
     @patch('utils.notification.send_telegram_notification')
-    @patch('database.db_handler.DatabaseHandler')
-    def test_notification_handling(self, mock_db, mock_send_notification, browser, mock_driver, mock_button, mock_date_element):
+    @patch('browser_manager.browser.get_database')
+    def test_notification_handling(self, mock_db, mock_send_notification, browser, mock_driver, available_page):
         """Тест отправки уведомлений"""
-        # Настраиваем моки
-        mock_button.find_element.side_effect = [
-            Mock(find_element=Mock(return_value=mock_date_element))
-        ]
-        mock_driver.find_elements.return_value = [mock_button]
+        mock_driver.page_source = available_page
         
         mock_db_instance = Mock()
         mock_db_instance.get_user_preferred_dates.return_value = 'week'
@@ -134,6 +119,20 @@ class TestCheckSlotsOnLocationPage:
         assert "СРОЧНО" in notification_args[1]
         assert "01.05.2024" in notification_args[1]
 
+class TestScreenshotModes:
+    def test_production_mode_buffers_intermediate_steps(self, browser, mock_driver, tmp_path, monkeypatch):
+        """В рабочем режиме промежуточный шаг только попадает в буфер /trace"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('browser_manager.browser.is_trace_mode', lambda: False)
+        mock_driver.get_screenshot_as_png = Mock(return_value=b"png")
+        frame_buffer.clear()
+        
+        result = browser.take_screenshot_and_update(mock_driver, "5. Выбираем услугу", [123])
+        
+        assert result is None
+        assert frame_buffer.last().caption == "5. Выбираем услугу"
+        assert not (tmp_path / "current_state.png").exists()
+
 @pytest.mark.skip("Требует реального браузера")
 def test_browser_session(browser):
     with browser.create_session() as driver:
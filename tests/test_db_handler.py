@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+import pytest
+from database.db_handler import DatabaseHandler, MIGRATIONS, get_database
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseHandler(str(tmp_path / 'booking_bot.db'))
+    yield db
+    db.close()
+
+def test_schema_is_migrated_once(db, tmp_path):
+    with sqlite3.connect(db.db_path) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1][0]
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_users_checking', 'idx_check_results_checked_at'} <= indexes
+
+    # Повторное открытие не применяет миграции заново
+    assert DatabaseHandler(db.db_path).migrate() == MIGRATIONS[-1][0]
+
+def test_user_preferences(db):
+    assert db.get_user_preferred_dates(1) is None
+
+    db.add_user(1, username='max', first_name='Max', last_name='Mustermann')
+    assert db.get_user_preferred_dates(1) is None
+    db.update_user_preferred_dates(1, 'week')
+    db.update_user_preferred_dates(2, 'month')  # пользователь без /start
+    db.add_user(1, username='max2')
+
+    assert db.get_user_preferred_dates(1) == 'week'
+    assert db.get_all_preferred_dates() == {1: 'week', 2: 'month'}
+
+def test_checking_status_and_results(db):
+    db.update_checking_status(1, True)
+    db.update_checking_status(2, True)
+    db.update_checking_status(2, False)
+    assert db.get_checking_users() == [1]
+
+    db.save_check_result(False, "Нет доступных слотов", checked_at=1.0)
+    db.save_check_result(True, "Доступна запись на даты: 01.05.2024", checked_at=2.0)
+    assert db.get_recent_check_results(1) == [(2.0, True, "Доступна запись на даты: 01.05.2024")]
+
+def test_one_connection_per_thread(db):
+    def write(offset):
+        for i in range(offset, offset + 50):
+            assert db.save_check_result(True, str(i))
+
+    threads = [threading.Thread(target=write, args=(n * 50,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(db.get_recent_check_results(1000)) == 200
+    # Основной поток + четыре рабочих
+    assert len(db._connections) == 5
+
+def test_preferences_are_served_from_memory(db):
+    db.update_user_preferred_dates(1, 'week')
+    assert db.get_user_preferred_dates(1) == 'week'
+
+    # После загрузки кэша чтение не обращается к базе
+    def no_io():
+        raise AssertionError("database I/O in the alert loop")
+    connection = db._connection
+    db._connection = no_io
+    assert [db.get_user_preferred_dates(chat_id) for chat_id in (1, '1', 2)] == ['week', 'week', None]
+
+    # Изменение пишется в базу и сразу видно в кэше
+    db._connection = connection
+    db.update_user_preferred_dates(2, 'month')
+    db._connection = no_io
+    assert db.get_user_preferred_dates(2) == 'month'
+    db._connection = connection
+
+    reopened = DatabaseHandler(db.db_path)
+    assert reopened.get_all_preferred_dates() == {1: 'week', 2: 'month'}
+    reopened.close()
+
+def test_get_database_is_shared(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    assert get_database(path) is get_database(path)
+    get_database(path).close()
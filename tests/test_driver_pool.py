@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import Mock
+from browser_manager.pool import DriverPool, PoolTimeoutError
+
+@pytest.fixture
+def created():
+    return []
+
+@pytest.fixture
+def pool(created):
+    def factory():
+        driver = Mock()
+        driver.execute_script = Mock(return_value=10 * 1024 * 1024)
+        created.append(driver)
+        return driver
+
+    return DriverPool(factory, lambda driver: driver.quit(), min_size=1, max_size=2, max_uses=3, max_memory_mb=100)
+
+def test_driver_reused_between_checkouts(pool, created):
+    """Драйвер возвращается в пул и выдается повторно без холодного старта"""
+    pool.warm_up()
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        pass
+
+    assert first is second
+    assert len(created) == 1
+    first.delete_all_cookies.assert_called()
+
+def test_driver_recycled_after_max_uses(pool, created):
+    """После max_uses драйвер закрывается и создается новый"""
+    for _ in range(3):
+        with pool.checkout() as driver:
+            pass
+
+    driver.quit.assert_called_once()
+    with pool.checkout() as fresh:
+        assert fresh is not driver
+
+def test_driver_recycled_over_memory_limit(pool, created):
+    """Драйвер с раздутой памятью не возвращается в пул"""
+    with pool.checkout() as driver:
+        driver.execute_script.return_value = 500 * 1024 * 1024
+
+    driver.quit.assert_called_once()
+
+def test_unhealthy_driver_replaced_on_checkout(pool, created):
+    """Мертвый драйвер из пула заменяется новым при выдаче"""
+    pool.warm_up()
+    dead = created[0]
+    dead.execute_script.side_effect = Exception("session deleted")
+
+    with pool.checkout() as driver:
+        assert driver is not dead
+    dead.quit.assert_called_once()
+
+def test_checkout_timeout_when_exhausted(pool):
+    """Исчерпанный пул отдает ошибку по таймауту"""
+    first = pool.acquire()
+    second = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.1)
+
+    pool.release(first)
+    pool.release(second)
+
+def test_new_shared_pool_warms_up_before_first_checkout(monkeypatch, created):
+    """Общий пул прогревается до min_size сразу при создании, первая проверка - без холодного старта"""
+    import time
+    import config.config
+    import browser_manager.pool
+    from browser_manager.pool import get_driver_pool
+    monkeypatch.setattr(browser_manager.pool, '_pools', {})
+    monkeypatch.setattr(config.config, 'DRIVER_POOL_MIN_SIZE', 2)
+    monkeypatch.setattr(config.config, 'DRIVER_POOL_MAX_SIZE', 2)
+
+    def init_driver():
+        driver = Mock()
+        driver.execute_script = Mock(return_value=0)
+        created.append(driver)
+        return driver
+
+    handler = Mock(headless=True, timeout=30, init_driver=init_driver)
+    pool = get_driver_pool(handler)
+    deadline = time.monotonic() + 5
+    while len(pool._idle) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(pool._idle) == 2
+    with pool.checkout() as driver:
+        assert driver in created
+    assert len(created) == 2
+    pool.close()
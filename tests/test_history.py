@@ -0,0 +1,49 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from utils.history import HistoryStore
+
+def test_appends_go_to_daily_segments(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    day = datetime(2025, 4, 28, 10, 0)
+
+    for minute in range(3):
+        assert store.append({"available": minute == 2, "message": f"проверка {minute}"}, day + timedelta(minutes=minute))
+    store.append({"available": False, "message": "следующий день"}, day + timedelta(days=1))
+    store.close()
+
+    assert [path.name for path in sorted((tmp_path / 'history').iterdir())] == [
+        'history-2025-04-28.jsonl.gz', 'history-2025-04-29.jsonl'
+    ]
+    records = list(store.read())
+    assert [record["message"] for record in records] == ["проверка 0", "проверка 1", "проверка 2", "следующий день"]
+    assert store.last(2)[0]["message"] == "проверка 2"
+    assert [record["message"] for record in store.read(since=day + timedelta(minutes=1), until=day + timedelta(hours=1))] == [
+        "проверка 1", "проверка 2"
+    ]
+
+def test_retention_removes_old_segments(tmp_path):
+    store = HistoryStore(str(tmp_path), retention_days=30)
+    today = datetime(2025, 6, 1, 12, 0)
+    store.append({"available": False, "message": "старая"}, today - timedelta(days=40))
+    store.append({"available": False, "message": "свежая"}, today - timedelta(days=5))
+    store.close()
+
+    store.compact(today.date())
+
+    assert [record["message"] for record in store.read()] == ["свежая"]
+
+def test_legacy_history_is_migrated(tmp_path):
+    legacy = tmp_path / 'booking_history.json'
+    legacy.write_text(json.dumps([
+        {"timestamp": "2025-04-27T09:00:00", "available": False, "message": "Нет доступных слотов"}
+    ]))
+    store = HistoryStore(str(tmp_path / 'history'), legacy_file=str(legacy))
+
+    store.append({"available": True, "message": "Доступна запись"}, datetime(2025, 4, 28, 9, 0))
+    store.close()
+
+    assert [record["message"] for record in store.read()] == ["Нет доступных слотов", "Доступна запись"]
+    assert not legacy.exists()
+    with gzip.open(tmp_path / 'history' / 'history-2025-04-27.jsonl.gz', 'rt', encoding='utf-8') as f:
+        assert json.loads(f.readline())["available"] is False
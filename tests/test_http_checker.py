@@ -0,0 +1,163 @@
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+import pytest
+from browser_manager.http_checker import HttpBookingChecker, parse_page
+
+ROOT = Path(__file__).resolve().parent.parent
+AVAILABLE_PAGE = ROOT / 'Standortauswahl und frühestmöglicher T333ermin.html'
+UNAVAILABLE_PAGE = ROOT / 'Standortauswahl und frühestmöglicher Termin.html'
+
+SERVICE_PAGE = """<div id="termin147"><button class="btn LBV-choosebutton"
+ onclick="callURL('hinweise.php');">weiter</button></div>"""
+
+CONSENT_PAGE = """<form action="hinweise.php" method="post">
+<label><input type="checkbox" name="zustimmung" value="1"> Ich stimme zu</label>
+<input type="hidden" name="token" value="abc">
+<button id="weiterbutton" type="submit" name="weiter" value="1">weiter</button></form>"""
+
+CONTACT_PAGE = """<form action="kontaktdaten.php" method="post">
+<input id="vorname" name="vorname"><input id="nachname" name="nachname">
+<input id="email" name="email" type="email">
+<input id="weiterbutton" type="submit" name="weiter" value="weiter"></form>"""
+
+
+class StandInSite(BaseHTTPRequestHandler):
+    """Упрощенная копия цепочки страниц lbv-termine.de."""
+
+    def log_message(self, *args):
+        pass
+
+    def _session(self):
+        cookie = self.headers.get('Cookie') or ''
+        sid = cookie.partition('PHPSESSID=')[2].split(';')[0]
+        return self.server.sessions.setdefault(sid, {}) if sid else None, sid
+
+    def _reply(self, body, sid=None):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if sid:
+            self.send_header('Set-Cookie', f'PHPSESSID={sid}; path=/')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = url.path.rsplit('/', 1)[-1]
+        self.server.requests.append(('GET', page))
+        state, sid = self._session()
+
+        if page == 'index.php':
+            sid = uuid.uuid4().hex
+            self.server.sessions[sid] = {}
+            self._reply('<h1>LBV</h1>', sid)
+        elif state is None:
+            self._redirect('index.php')
+        elif page == 'onlinedienstleistung.php':
+            state['service'] = parse_qs(url.query)['dienstleistungsid'][0]
+            self._reply(SERVICE_PAGE)
+        elif page == 'hinweise.php':
+            self._reply(CONSENT_PAGE)
+        elif page == 'standortauswahl.php':
+            if not state.get('contact'):
+                self._redirect('index.php')
+            else:
+                self._reply(self.server.location_page.read_text(encoding='utf-8'))
+        else:
+            self._reply('<p>ok</p>')
+
+    def do_POST(self):
+        page = urlparse(self.path).path.rsplit('/', 1)[-1]
+        self.server.requests.append(('POST', page))
+        state, _ = self._session()
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+
+        if state is None:
+            self._redirect('index.php')
+        elif page == 'hinweise.php' and form.get('zustimmung') == ['1']:
+            self._reply(CONTACT_PAGE)
+        elif page == 'kontaktdaten.php' and form.get('vorname') == ['Max']:
+            state['contact'] = form
+            self._redirect('standortauswahl.php')
+        else:
+            self._reply(CONSENT_PAGE)
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInSite)
+    server.sessions = {}
+    server.requests = []
+    server.location_page = AVAILABLE_PAGE
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def checker(site):
+    checker = HttpBookingChecker(
+        base_url=f'http://127.0.0.1:{site.server_port}/frontend/',
+        form_values={'vorname': 'Max', 'nachname': 'Mustermann', 'email': 'max@example.com'},
+        timeout=5
+    )
+    yield checker
+    checker.close()
+
+def test_parse_page_skips_disabled_buttons():
+    forms, next_urls = parse_page(UNAVAILABLE_PAGE.read_text(encoding='utf-8'))
+    assert forms == []
+    assert next_urls == []
+
+def test_full_flow_finds_slots(site, checker):
+    available, message = checker.check_booking_availability()
+
+    assert available
+    assert message == "Доступна запись на даты: 28.04.2025, 28.04.2025"
+    assert ('POST', 'kontaktdaten.php') in site.requests
+    contact = next(iter(site.sessions.values()))['contact']
+    assert contact['email'] == ['max@example.com']
+
+def test_parked_session_refreshes_single_page(site, checker):
+    """Пока сессия сайта жива, повторная проверка - один GET страницы выбора локации"""
+    checker.probe()
+    site.requests.clear()
+    site.location_page = UNAVAILABLE_PAGE
+
+    result = checker.probe()
+
+    assert site.requests == [('GET', 'standortauswahl.php')]
+    assert not result.available
+    assert [location.standortid for location in result.locations] == [109, 112]
+    assert result.message == "Нет доступных слотов"
+
+def test_expired_session_replays_flow(site, checker):
+    checker.probe()
+    site.sessions.clear()
+    site.requests.clear()
+
+    result = checker.probe()
+
+    assert result.available
+    assert ('GET', 'index.php') in site.requests
+
+def test_error_resets_session(site, checker):
+    checker.base_url = 'http://127.0.0.1:1/frontend/'
+
+    available, message = checker.check_booking_availability()
+
+    assert not available
+    assert message
+    assert checker.sessions == {}
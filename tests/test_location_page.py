@@ -0,0 +1,66 @@
+from pathlib import Path
+from unittest.mock import Mock
+import pytest
+from utils.location_page import parse_location_page, collect_location_slots, LocationSlot
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_snapshot(name):
+    return (ROOT / name).read_text(encoding='utf-8')
+
+@pytest.fixture
+def available_html():
+    return load_snapshot('Standortauswahl und frühestmöglicher T333ermin.html')
+
+@pytest.fixture
+def unavailable_html():
+    return load_snapshot('Standortauswahl und frühestmöglicher Termin.html')
+
+def test_available_snapshot(available_html):
+    locations = parse_location_page(available_html)
+
+    assert [(l.name, l.standortid) for l in locations] == [
+        ('LBV Mitte Führerschein', 109),
+        ('LBV Nord Führerschein', 112)
+    ]
+    assert all(l.available for l in locations)
+    assert [l.earliest_date for l in locations] == ['28.04.2025', '28.04.2025']
+    assert [l.horizon_days for l in locations] == [56, 56]
+
+def test_unavailable_snapshot(unavailable_html):
+    """Заблокированные кнопки и отсутствие даты при 'Derzeit sind keine freien Termine'"""
+    locations = parse_location_page(unavailable_html)
+
+    assert [l.standortid for l in locations] == [109, 112]
+    assert not any(l.available for l in locations)
+    assert all(l.earliest_date is None for l in locations)
+    assert all(l.horizon_days == 56 for l in locations)
+
+def test_back_button_is_not_a_location():
+    html = """<button class="btn LBV-backbutton" onclick="callURL('kontaktdaten.php');">zurück</button>"""
+    assert parse_location_page(html) == []
+
+def test_collect_uses_single_script():
+    """Состояние локаций приходит одним execute_script, page_source не читается"""
+    driver = Mock()
+    driver.execute_script.return_value = [{
+        'name': 'LBV Mitte Führerschein',
+        'standortid': 109,
+        'disabled': False,
+        'earliest_date': '28.04.2025',
+        'horizon_days': 56
+    }]
+
+    locations = collect_location_slots(driver)
+
+    assert locations == [LocationSlot('LBV Mitte Führerschein', 109, False, '28.04.2025', 56)]
+    driver.execute_script.assert_called_once()
+
+def test_collect_falls_back_to_page_source(unavailable_html):
+    driver = Mock()
+    driver.execute_script.side_effect = Exception("javascript error")
+    driver.page_source = unavailable_html
+
+    locations = collect_location_slots(driver)
+
+    assert [l.standortid for l in locations] == [109, 112]
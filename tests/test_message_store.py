@@ -0,0 +1,57 @@
+import json
+import sqlite3
+import threading
+from utils.message_store import MessageIdStore
+
+def stored_rows(path):
+    with sqlite3.connect(path) as connection:
+        return dict(connection.execute("SELECT chat_id, message_id FROM last_message_ids"))
+
+def test_writes_are_batched_until_flush(tmp_path):
+    path = str(tmp_path / 'ids.db')
+    store = MessageIdStore(path, flush_interval=None)
+
+    store[1] = 10
+    store['2'] = 20
+    store[1] = 11
+    assert stored_rows(path) == {}
+
+    assert store.flush()
+    assert stored_rows(path) == {'1': 11, '2': 20}
+
+    del store[2]
+    store.close()
+    assert stored_rows(path) == {'1': 11}
+    assert 1 in store and '1' in store and store[1] == 11
+
+def test_loads_lazily_and_migrates_legacy_json(tmp_path):
+    legacy = tmp_path / 'last_message_ids.json'
+    legacy.write_text(json.dumps({'42': 7}))
+    path = str(tmp_path / 'ids.db')
+
+    store = MessageIdStore(path, flush_interval=None, legacy_json=str(legacy))
+    assert store[42] == 7
+    store.close()
+
+    reopened = MessageIdStore(path, flush_interval=None)
+    assert dict(reopened) == {'42': 7}
+    reopened.close()
+
+def test_background_flush_with_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'ids.db')
+    store = MessageIdStore(path, flush_interval=0.05)
+
+    def write(offset):
+        for chat_id in range(offset, offset + 500):
+            store[chat_id] = chat_id * 2
+
+    threads = [threading.Thread(target=write, args=(offset,)) for offset in range(0, 2000, 500)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+
+    rows = stored_rows(path)
+    assert len(rows) == 2000
+    assert rows['1999'] == 3998
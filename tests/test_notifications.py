@@ -1,10 +1,20 @@
 import pytest
+import pytest_asyncio
 import asyncio
+from dataclasses import replace
 from core.notifications import NotificationManager
+from config.settings import settings
 
-@pytest.fixture
-def notifier():
-    return NotificationManager()
+@pytest_asyncio.fixture
+async def notifier(bot_api):
+    notifier = NotificationManager(replace(
+        settings.notifications,
+        telegram_token='123:abc',
+        api_url=bot_api.url,
+        retry_delay=0.01
+    ))
+    yield notifier
+    await notifier.close()
 
 @pytest.mark.asyncio
 async def test_send_notification(notifier):
@@ -29,10 +39,58 @@ async def test_update_message(notifier):
 @pytest.mark.asyncio
 async def test_notification_retry(notifier):
     # Simulate failed attempts
-    notifier._send_telegram_message = lambda *args: False
+    async def failing_send(*args, **kwargs):
+        return False
+
+    notifier._send_telegram_message = failing_send
     
     result = await notifier.send_notification(
         123456789,
         "Test retry"
     )
-    assert result is False 
\ No newline at end of file
+    assert result is False
+
+
+@pytest.mark.asyncio
+async def test_status_edits_coalesce(notifier):
+    notifier.config = replace(notifier.config, edit_window=0.2)
+    notifier.last_message_ids[1] = 42
+    edits = []
+
+    async def fake_update(chat_id, message_id, message, image_path=None, photo=None):
+        edits.append(message)
+        return True
+
+    notifier._update_telegram_message = fake_update
+
+    results = await asyncio.gather(*(notifier.update_message(1, f"status {i}") for i in range(5)))
+    assert results == [True] * 5
+    assert edits == ["status 4"]
+
+    # Следующая правка ждет окончания окна
+    started = asyncio.get_running_loop().time()
+    assert await notifier.update_message(1, "status 5")
+    assert asyncio.get_running_loop().time() - started >= 0.15
+    assert edits == ["status 4", "status 5"]
+
+@pytest.mark.asyncio
+async def test_photo_bytes_and_message_ids(notifier, bot_api):
+    assert await notifier.send_notification(7, "🎯 *Найдены доступные слоты!*", photo=b"\xff\xd8\xffjpeg")
+    first_id = notifier.last_message_ids[7]
+
+    assert await notifier.update_message(7, "статус", photo=b"\x89PNGpng")
+    assert await notifier.delete_message(7)
+
+    assert [call[0] for call in bot_api.calls] == ['sendPhoto', 'editMessageMedia', 'deleteMessage']
+    assert b'filename="screenshot.jpg"' in bot_api.calls[0][3]
+    assert b'name="message_id"\r\n\r\n%d\r\n' % first_id in bot_api.calls[1][3]
+    assert 7 not in notifier.last_message_ids
+
+@pytest.mark.asyncio
+async def test_rate_limit_and_not_modified(notifier, bot_api):
+    bot_api.errors['sendMessage'] = [(429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 0.1}})]
+    bot_api.errors['editMessageText'] = [(400, {'ok': False, 'description': 'Bad Request: message is not modified'})]
+
+    assert await notifier.send_notification(8, "alert")
+    assert await notifier.update_message(8, "alert")
+    assert [call[0] for call in bot_api.calls] == ['sendMessage', 'sendMessage', 'editMessageText']
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from core.outbox import Lane, NotificationOutbox, TokenBucket
+from exceptions.custom_exceptions import RateLimitException
+
+def make_send(log, name, result=True):
+    async def send():
+        log.append((name, time.monotonic()))
+        return result
+    return send
+
+def test_token_bucket_delay():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.delay() == 0
+    bucket.consume()
+    assert 0 < bucket.delay() <= 0.1
+    bucket.block(5)
+    assert bucket.delay() > 4
+
+@pytest.mark.asyncio
+async def test_alert_preempts_status():
+    outbox = NotificationOutbox(concurrency=1)
+    log = []
+    futures = [outbox.submit(chat_id, make_send(log, f'status{chat_id}'), Lane.STATUS) for chat_id in range(3)]
+    futures.append(outbox.submit(10, make_send(log, 'alert'), Lane.ALERT))
+
+    assert all(await asyncio.gather(*futures))
+    assert log[0][0] == 'alert'
+    await outbox.close()
+
+@pytest.mark.asyncio
+async def test_per_chat_rate_does_not_block_other_chats():
+    outbox = NotificationOutbox(per_chat_rate=5, per_chat_burst=1)
+    log = []
+    futures = [outbox.submit(1, make_send(log, 'a1'), Lane.STATUS),
+               outbox.submit(1, make_send(log, 'a2'), Lane.STATUS),
+               outbox.submit(2, make_send(log, 'b1'), Lane.STATUS)]
+
+    await asyncio.gather(*futures)
+    times = dict(log)
+    assert [name for name, _ in log] == ['a1', 'b1', 'a2']
+    assert times['a2'] - times['a1'] >= 0.15
+    await outbox.close()
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    outbox = NotificationOutbox(max_attempts=1)
+    calls = []
+
+    async def send():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RateLimitException(0.2)
+        return True
+
+    assert await outbox.submit(1, send, Lane.ALERT) is True
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.2
+    await outbox.close()
+
+@pytest.mark.asyncio
+async def test_failed_send_gives_up_after_max_attempts():
+    outbox = NotificationOutbox(max_attempts=2, retry_delay=0.01)
+    log = []
+
+    assert await outbox.submit(1, make_send(log, 'x', result=False)) is False
+    assert len(log) == 2
+    await outbox.close()
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import Mock
+from browser_manager.browser import BrowserHandler
+from browser_manager.parked import ParkedSession
+from browser_manager.pool import DriverPool
+from config.config import LOCATION_PAGE_URL
+
+PARKED_URL = LOCATION_PAGE_URL
+EXPIRED_URL = "https://lbv-termine.de/frontend/index.php"
+
+@pytest.fixture
+def handler(monkeypatch):
+    handler = BrowserHandler()
+    monkeypatch.setattr(handler, 'check_slots_on_location_page', Mock(return_value=(False, "Нет доступных слотов")))
+    monkeypatch.setattr(handler, 'run_selenium_side_script', Mock(return_value=(False, "Нет доступных слотов")))
+    return handler
+
+def driver_at(url, after_get=None):
+    """Драйвер на странице url; после driver.get оказывается на after_get (по умолчанию - на запрошенной)."""
+    driver = Mock()
+    driver.current_url = url
+
+    def get(requested):
+        driver.current_url = after_get or requested
+
+    driver.get = Mock(side_effect=get)
+    return driver
+
+def test_parked_session_refreshes_location_page(handler):
+    """Припаркованная сессия только перезапрашивает страницу выбора локации"""
+    driver = driver_at(PARKED_URL)
+
+    assert handler.run_parked_check(driver, chat_ids=[1]) == (False, "Нет доступных слотов")
+
+    driver.get.assert_called_once_with(LOCATION_PAGE_URL)
+    handler.check_slots_on_location_page.assert_called_once_with(driver, [1])
+    handler.run_selenium_side_script.assert_not_called()
+
+def test_lost_session_replays_script(handler):
+    """Сайт сбросил сессию (редирект на index.php) - выполняется полный проход"""
+    driver = driver_at(PARKED_URL, after_get=EXPIRED_URL)
+
+    handler.run_parked_check(driver, chat_ids=[1])
+
+    handler.check_slots_on_location_page.assert_not_called()
+    handler.run_selenium_side_script.assert_called_once_with(driver, [1])
+
+def test_fresh_driver_runs_full_flow(handler):
+    """Драйвер еще не на странице выбора локации - сразу полный проход"""
+    driver = driver_at("data:,")
+
+    handler.run_parked_check(driver, chat_ids=[1])
+
+    driver.get.assert_not_called()
+    handler.run_selenium_side_script.assert_called_once_with(driver, [1])
+
+@pytest.fixture
+def pool():
+    def factory():
+        driver = Mock()
+        driver.execute_script = Mock(return_value=0)
+        return driver
+
+    return DriverPool(factory, lambda driver: driver.quit(), min_size=0, max_size=1, max_uses=3)
+
+def test_parked_driver_reused_and_recycled_after_max_uses(pool):
+    """Припаркованный драйвер живет между проверками, но пересоздается после max_uses проверок"""
+    handler = Mock()
+    handler.run_parked_check = Mock(return_value=(False, "Нет доступных слотов"))
+    session = ParkedSession(handler, pool=pool)
+
+    for _ in range(3):
+        session.check([1])
+    drivers = [call.args[0] for call in handler.run_parked_check.call_args_list]
+    assert drivers[0] is drivers[1] is drivers[2]
+    drivers[0].quit.assert_called_once()
+    assert session.driver is None
+
+    session.check([1])
+    assert handler.run_parked_check.call_args.args[0] is not drivers[0]
+    session.close()
+    assert pool.size == 1
+
+def test_parked_driver_discarded_on_error(pool):
+    handler = Mock()
+    handler.run_parked_check = Mock(side_effect=RuntimeError("session deleted"))
+    session = ParkedSession(handler, pool=pool)
+
+    with pytest.raises(RuntimeError):
+        session.check([1])
+
+    handler.run_parked_check.call_args.args[0].quit.assert_called_once()
+    assert session.driver is None
@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+import pytest
+from utils.screenshots import (
+    FrameBuffer, persist_frame, frame_fingerprint, encode_frame, encode_frame_async,
+    image_mime_type, parse_clip, frame_buffer, trace_frames
+)
+
+def test_buffer_keeps_last_frames():
+    buffer = FrameBuffer(size=3)
+    for i in range(5):
+        buffer.append(f"{i}. шаг", b"png%d" % i)
+
+    assert len(buffer) == 3
+    assert [frame.caption for frame in buffer.frames()] == ["2. шаг", "3. шаг", "4. шаг"]
+    assert buffer.last().image == b"png4"
+
+def test_clear():
+    buffer = FrameBuffer(size=3)
+    buffer.append("1. шаг", b"png")
+    buffer.clear()
+
+    assert buffer.frames() == []
+    assert buffer.last() is None
+
+def test_persist_frame_is_content_addressed(tmp_path):
+    first = persist_frame(b"png-bytes", directory=str(tmp_path))
+    second = persist_frame(b"png-bytes", directory=str(tmp_path))
+
+    assert first == second
+    assert os.path.basename(first) == hashlib.sha256(b"png-bytes").hexdigest() + ".png"
+    assert os.listdir(tmp_path) == [os.path.basename(first)]
+
+def test_persist_frame_disabled():
+    assert persist_frame(b"png-bytes", directory='') is None
+
+def test_fingerprint_exact_by_default():
+    assert frame_fingerprint(b"frame", perceptual=False) == frame_fingerprint(b"frame", perceptual=False)
+    assert frame_fingerprint(b"frame", perceptual=False) != frame_fingerprint(b"other", perceptual=False)
+
+def test_perceptual_fingerprint_ignores_noise():
+    Image = pytest.importorskip("PIL.Image")
+
+    def render(noise):
+        image = Image.new('L', (64, 64), 255)
+        for x in range(32):
+            image.putpixel((x, 10), 0)
+        image.putpixel((60, 60), 255 - noise)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    assert render(0) != render(3)
+    assert frame_fingerprint(render(0), perceptual=True) == frame_fingerprint(render(3), perceptual=True)
+
+@pytest.fixture
+def page_png():
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new('RGB', (945, 1028), (255, 255, 255))
+    for x in range(100, 600):
+        for y in range(300, 320):
+            image.putpixel((x, y), (0, 60, 120))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def test_encode_frame_crops_and_compresses(page_png):
+    from PIL import Image
+
+    encoded = encode_frame(page_png, clip=(50, 250, 600, 200), image_format='jpeg', quality=60)
+
+    assert image_mime_type(encoded) == ('jpg', 'image/jpeg')
+    assert len(encoded) < len(page_png)
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (600, 200)
+
+def test_encode_frame_clamps_clip_to_image(page_png):
+    from PIL import Image
+
+    encoded = encode_frame(page_png, clip=(900, 1000, 500, 500), image_format='webp')
+
+    assert image_mime_type(encoded) == ('webp', 'image/webp')
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (45, 28)
+
+def test_buffer_encodes_in_background(page_png):
+    buffer = FrameBuffer(size=2)
+    frame = buffer.append("1. шаг", page_png, encode=True)
+
+    encode_frame_async(b"").exception()  # дождаться очереди рабочего потока
+    assert image_mime_type(frame.image)[0] == 'jpg'
+
+def test_parse_clip():
+    assert parse_clip('0,100,945,600') == (0, 100, 945, 600)
+    assert parse_clip('') is None
+    assert parse_clip('bad') is None
+
+def test_trace_frames_only_for_admin_chats():
+    """Кадры шагов с данными формы получает только чат администратора"""
+    frame_buffer.clear()
+    frame_buffer.append("4. Вводим имя", b"png-with-user-data")
+
+    assert trace_frames(555, allowed_chat_ids=[100]) is None
+    assert trace_frames(555, allowed_chat_ids=[]) is None
+    assert [frame.caption for frame in trace_frames(100, allowed_chat_ids=[100])] == ["4. Вводим имя"]
+    frame_buffer.clear()
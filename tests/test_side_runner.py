@@ -0,0 +1,85 @@
+import json
+import shutil
+import subprocess
+import pytest
+from unittest.mock import Mock
+from selenium.webdriver.common.by import By
+from browser_manager.side_runner import CLICK_SCRIPT, SideScript, parse_locator
+from exceptions.custom_exceptions import ConfigurationException, SideStepException
+
+@pytest.fixture
+def script():
+    return SideScript.load('lbv.side')
+
+@pytest.fixture
+def mock_driver():
+    element = Mock()
+    element.is_displayed = Mock(return_value=True)
+    element.is_enabled = Mock(return_value=True)
+
+    driver = Mock()
+    driver.timeouts.implicit_wait = 30
+    driver.find_element = Mock(return_value=element)
+    driver.execute_script = Mock(return_value=False)
+    return driver
+
+def test_side_file_compiled(script):
+    """Команды lbv.side компилируются в шаги с готовыми локаторами"""
+    assert len(script.steps) == 13
+    assert script.steps[0].command == 'open'
+    assert script.steps[3].locator == (By.CSS_SELECTOR, '.row:nth-child(3) > .col-12:nth-child(3) .btn')
+    assert script.steps[7].locator == (By.ID, 'weiterbutton')
+    assert script.steps[2].optional
+
+def test_unsupported_locator():
+    with pytest.raises(ConfigurationException):
+        parse_locator('link=foo')
+
+def test_unsupported_command(tmp_path):
+    side = tmp_path / 'bad.side'
+    side.write_text(json.dumps({
+        'url': 'https://example.com',
+        'tests': [{'name': 't', 'commands': [{'command': 'pause', 'target': '1000', 'value': ''}]}]
+    }))
+    with pytest.raises(ConfigurationException):
+        SideScript.load(side)
+
+def test_run_uses_value_overrides(script, mock_driver):
+    """Команды type берут значения из настроек, а не из записанного сценария"""
+    captions = []
+    script.run(
+        mock_driver,
+        values={'id=vorname': 'Max'},
+        on_step=lambda step, element: captions.append(step.caption),
+        base_url='https://lbv-termine.de'
+    )
+
+    element = mock_driver.find_element.return_value
+    element.send_keys.assert_any_call('Max')
+    mock_driver.get.assert_called_once_with('https://lbv-termine.de/frontend/index.php')
+    assert len(captions) == 13
+    # Неявное ожидание восстановлено после сценария
+    assert mock_driver.implicitly_wait.call_args_list[-1].args == (30,)
+
+def test_required_step_failure(script, mock_driver):
+    mock_driver.find_element.return_value.is_displayed.return_value = False
+
+    with pytest.raises(SideStepException) as error:
+        script.run(mock_driver, timeout=0.1)
+
+    assert error.value.step.index == 4
+
+def run_click_script(element):
+    """Выполняет CLICK_SCRIPT в node на заглушке элемента, возвращает результат скрипта."""
+    program = (
+        "const e = Object.assign({getAttribute: () => null, closest: () => null, click() {}}, %s);"
+        "process.stdout.write(JSON.stringify(new Function(%s)(e)));"
+    ) % (json.dumps(element), json.dumps(CLICK_SCRIPT))
+    return json.loads(subprocess.run(['node', '-e', program], capture_output=True, text=True, check=True).stdout)
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="Нужен node для выполнения JS")
+def test_click_script_formless_button_does_not_navigate():
+    """<button> без type вне формы не отправляет форму - ждать смены страницы не нужно"""
+    assert run_click_script({'tagName': 'BUTTON', 'type': 'submit', 'form': None}) is False
+    assert run_click_script({'tagName': 'BUTTON', 'type': 'submit', 'form': {}}) is True
+    assert run_click_script({'tagName': 'INPUT', 'type': 'button', 'form': None}) is False
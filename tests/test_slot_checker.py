@@ -0,0 +1,80 @@
+import json
+import pytest
+import pytest_asyncio
+from dataclasses import replace
+from datetime import date
+from urllib.parse import parse_qs
+from core.notifications import NotificationManager
+from core.probe import ProbeResult
+from core.slot_checker import SlotChecker
+from core.subscriptions import SubscriptionRegistry
+from config.settings import settings
+
+@pytest_asyncio.fixture
+async def checker(bot_api):
+    checker = SlotChecker()
+    # Одно соединение - порядок запросов на сервере совпадает с порядком отправки
+    checker.notifier = NotificationManager(replace(
+        settings.notifications,
+        telegram_token='123:abc',
+        api_url=bot_api.url,
+        retry_delay=0.01,
+        pool_size=1
+    ))
+    yield checker
+    await checker.notifier.close()
+
+def sent_messages(bot_api):
+    messages = []
+    for method, _, content_type, body in bot_api.calls:
+        if content_type.startswith('application/json'):
+            payload = json.loads(body)
+        else:
+            payload = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        messages.append((method, int(payload['chat_id']), payload.get('text', '')))
+    return messages
+
+def test_registry_matching_is_per_service():
+    registry = SubscriptionRegistry()
+    today = date(2025, 5, 5)
+    registry.subscribe(1, 'week', service_id=147)
+    registry.subscribe(2, 'any', service_id=147)
+    registry.subscribe(3, 'any', service_id=150)
+
+    assert registry.matching(147, ['07.05.2025'], today) == {1, 2}
+    assert registry.matching(147, ['01.07.2025'], today) == {2}
+    assert registry.matching(150, ['07.05.2025'], today) == {3}
+    assert registry.matching(151, ['07.05.2025'], today) == set()
+
+    registry.subscribe(2, 'any', service_id=150)
+    assert registry.matching(147, ['01.07.2025'], today) == set()
+    assert registry.matching(150, ['01.07.2025'], today) == {2, 3}
+
+@pytest.mark.asyncio
+async def test_one_probe_per_service_is_fanned_out_to_every_subscriber(checker, bot_api):
+    checker.subscriptions.subscribe(1, 'week', service_id=147)
+    checker.subscriptions.subscribe(2, 'any', service_id=147)
+    checker.subscriptions.subscribe(3, 'any', service_id=147)
+    checker.subscriptions.subscribe(4, 'any', service_id=150)
+    probed = []
+
+    async def probe(service_id):
+        probed.append(service_id)
+        if service_id == 150:
+            checker.stop_monitoring()
+        return ProbeResult(service_id=service_id, available=True, dates=['01.01.2099'])
+
+    await checker._monitor_loop(probe)
+
+    assert probed == [147, 150]
+    messages = sent_messages(bot_api)
+    assert [chat_id for _, chat_id, _ in messages] == [2, 3, 1, 4]
+    # Оповещения всем подписчикам уходят раньше тихого обновления статуса
+    assert ['Найдены доступные слоты' in text for _, _, text in messages] == [True, True, False, True]
+
+@pytest.mark.asyncio
+async def test_browser_probe_reports_unsupported_service(checker):
+    result = await checker.probe(driver=None, service_id=checker.config.default_service_id + 1)
+
+    assert result.available is False
+    assert 'не поддерживается' in result.error
@@ -0,0 +1,98 @@
+import time
+from datetime import date, datetime
+from utils.location_page import LocationSlot
+from utils.slot_series import SlotSeries, _bucket_start
+
+def slot(standortid, earliest=None):
+    return LocationSlot(name=f"LBV {standortid}", standortid=standortid, disabled=earliest is None, earliest_date=earliest)
+
+def day_start(days_ago):
+    # Сырые отсчеты хранятся 14 дней, поэтому время берем относительно текущего
+    return _bucket_start(time.time() - days_ago * 86400, 86400)
+
+def test_records_roll_up_by_minute_hour_and_day():
+    series = SlotSeries()
+    start = day_start(3)
+
+    series.record([slot(109, '05.05.2025'), slot(110)], start + 10)
+    series.record([slot(109, '02.05.2025'), slot(110)], start + 40)
+    series.record([slot(109), slot(110, '10.05.2025')], start + 3700)
+
+    assert series.locations() == {109: 'LBV 109', 110: 'LBV 110'}
+    assert series.samples(109) == [
+        (start + 10, 1, date(2025, 5, 5)), (start + 40, 1, date(2025, 5, 2)), (start + 3700, 0, None)
+    ]
+    assert series.samples(109, resolution='minute')[0] == (start, 2, 2, date(2025, 5, 2))
+    assert series.samples(109, resolution='hour') == [(start, 2, 2, date(2025, 5, 2)), (start + 3600, 1, 0, None)]
+    assert series.samples(110, resolution='day') == [(start, 3, 1, date(2025, 5, 10))]
+
+def test_series_survive_restart_without_double_counting(tmp_path):
+    directory = str(tmp_path / 'timeseries')
+    start = day_start(2)
+    series = SlotSeries(directory)
+    series.record([slot(109, '05.05.2025')], start + 10)
+    series.flush()
+    series.record([slot(109)], start + 20)
+    series.flush()
+
+    restored = SlotSeries(directory)
+    restored.record([slot(109, '01.05.2025')], start + 30)
+    # Следующий день закрывает интервал: на диск дописывается только новая часть
+    restored.record([slot(109)], start + 86400)
+
+    again = SlotSeries(directory)
+    assert again.locations() == {109: 'LBV 109'}
+    assert again.samples(109, resolution='day')[0] == (start, 3, 2, date(2025, 5, 1))
+    assert [row[0] for row in again.samples(109)] == [start + 10, start + 20, start + 30, start + 86400]
+
+def test_availability_by_hour_of_week_and_earliest_trend():
+    series = SlotSeries()
+    start = day_start(7)
+    for minute in range(4):
+        series.record([slot(109, '20.05.2025' if minute < 3 else None)], start + 9 * 3600 + minute * 60)
+    series.record([slot(109, '15.05.2025')], start + 86400 + 9 * 3600)
+
+    moment = datetime.fromtimestamp(start + 9 * 3600)
+    ratios = series.availability_by_hour_of_week(109)
+    assert ratios[(moment.weekday(), moment.hour)] == 0.75
+    assert series.availability_by_hour_of_week(since=start + 86400) == {((moment.weekday() + 1) % 7, moment.hour): 1.0}
+
+    trend = series.earliest_date_trend(109)
+    assert [earliest for _, earliest in trend] == [date(2025, 5, 20), date(2025, 5, 15)]
+    assert trend[0][0] == datetime.fromtimestamp(start)
+
+def test_minute_rollups_have_their_own_retention(tmp_path):
+    directory = str(tmp_path / 'timeseries')
+    old, recent = day_start(10), day_start(1)
+    series = SlotSeries(directory, raw_retention_days=2, minute_retention_days=5)
+    series.record([slot(109, '05.05.2025')], old + 10)
+    series.record([slot(109, '05.05.2025')], recent + 10)
+    series.flush()
+
+    assert [row[0] for row in series.samples(109, resolution='minute')] == [recent]
+
+    restored = SlotSeries(directory, raw_retention_days=2, minute_retention_days=5)
+    assert [row[0] for row in restored.samples(109, resolution='minute')] == [recent]
+    # Часовые и дневные свертки хранятся бессрочно
+    assert [row[0] for row in restored.samples(109, resolution='day')] == [old, recent]
+    assert (tmp_path / 'timeseries' / '109.minute.bin').stat().st_size == 4 * 8
+
+def test_files_are_compacted_daily_without_reload(tmp_path):
+    directory = tmp_path / 'timeseries'
+    series = SlotSeries(str(directory), raw_retention_days=2, minute_retention_days=2)
+    for days_ago in range(10, 0, -1):
+        for sample in range(5):
+            series.record([slot(109, '05.05.2025')], day_start(days_ago) + sample * 600)
+
+    # Файлы переписаны с первой проверкой последнего дня: в них не больше трех дней отсчетов
+    raw_rows = (directory / '109.raw.bin').stat().st_size // (3 * 8)
+    minute_rows = (directory / '109.minute.bin').stat().st_size // (4 * 8)
+    assert len(series.samples(109)) <= raw_rows <= 15
+    assert minute_rows <= 15
+
+    series.flush()
+    restored = SlotSeries(str(directory), raw_retention_days=2, minute_retention_days=2)
+    # Без двойного счета: после загрузки минуты те же, что в памяти (в пределах срока от текущего времени)
+    cutoff = time.time() - 2 * 86400
+    assert restored.samples(109, resolution='minute') == series.samples(109, since=cutoff, resolution='minute')
+    assert sum(row[1] for row in restored.samples(109, resolution='day')) == 50
@@ -0,0 +1,194 @@
+import json
+import threading
+from config.config import add_chat_id
+from utils.notification import load_chat_ids
+from utils.subscribers import SubscriberRegistry
+
+def test_subscribers_persist_with_attributes(tmp_path):
+    db_path = str(tmp_path / 'bot.db')
+    registry = SubscriberRegistry(db_path)
+    registry.subscribe(1)
+    registry.subscribe(2, preferred_range='week', locations=[109, 110])
+    registry.subscribe(2, service_id=150)
+    registry.close()
+
+    restored = SubscriberRegistry(db_path)
+    assert restored.chat_ids() == [1, 2]
+    subscription = restored.get(2)
+    assert (subscription.preferred_range, subscription.service_id, subscription.locations) == ('week', 150, (109, 110))
+    assert restored.get(1).preferred_range == 'any'
+    assert restored.unsubscribe(1) and not restored.unsubscribe(1)
+    assert SubscriberRegistry(db_path).chat_ids() == [2]
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / 'telegram_users.json'
+    legacy.write_text(json.dumps({"chat_ids": [10, 20]}))
+    db_path = str(tmp_path / 'bot.db')
+
+    assert SubscriberRegistry(db_path, legacy_json=str(legacy)).chat_ids() == [10, 20]
+    legacy.write_text(json.dumps({"chat_ids": [30]}))
+    assert SubscriberRegistry(db_path, legacy_json=str(legacy)).chat_ids() == [10, 20]
+
+def test_concurrent_writers_keep_every_subscriber(tmp_path):
+    """Два реестра на одном файле (как два процесса бота) не затирают записи друг друга."""
+    db_path = str(tmp_path / 'bot.db')
+    registries = [SubscriberRegistry(db_path), SubscriberRegistry(db_path)]
+
+    def add(registry, first):
+        for chat_id in range(first, first + 50):
+            registry.subscribe(chat_id)
+
+    threads = [threading.Thread(target=add, args=(registry, index * 1000)) for index, registry in enumerate(registries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(SubscriberRegistry(db_path)) == 100
+
+def test_add_chat_id_uses_shared_registry(subscribers):
+    assert add_chat_id(42) and add_chat_id(42)
+    assert load_chat_ids() == [42]
+    assert subscribers.get(42).preferred_range == 'any'
+
+def test_range_index_matches_by_earliest_date():
+    from datetime import date
+    from core.subscriptions import RangeIndex
+    index = RangeIndex()
+    for chat_id, preferred_range in [(1, 'week'), (2, 'two_weeks'), (3, 'month'), (4, 'any'), (5, 'days:10'), (6, 'week')]:
+        index.add(chat_id, preferred_range)
+    today = date(2025, 5, 1)
+
+    assert index.match(['05.05.2025', '20.05.2025'], today) == {1, 2, 3, 4, 5, 6}
+    assert index.match(['10.05.2025'], today) == {2, 3, 4, 5}
+    assert index.match(['13.05.2025'], today) == {2, 3, 4}
+    assert index.match(['30.06.2025'], today) == {4}
+    assert index.match(['20.04.2025'], today) == {4}
+    # Слот открыт, но дата не определена - подходит всем
+    assert index.match([], today) == {1, 2, 3, 4, 5, 6}
+
+    index.add(1, 'month')
+    index.discard(6)
+    assert index.match(['05.05.2025'], today) == {1, 2, 3, 4, 5}
+    assert index.match(['25.05.2025'], today) == {1, 3, 4}
+
+def test_registry_matching_follows_range_changes(subscribers):
+    from datetime import date, timedelta
+    soon = (date.today() + timedelta(days=3)).strftime('%d.%m.%Y')
+    subscribers.subscribe(1, preferred_range='week')
+    subscribers.subscribe(2, preferred_range='month')
+    later = (date.today() + timedelta(days=20)).strftime('%d.%m.%Y')
+
+    assert subscribers.matching(None, [soon]) == {1, 2}
+    assert subscribers.matching(None, [later]) == {2}
+    subscribers.subscribe(1, preferred_range='any')
+    subscribers.unsubscribe(2)
+    assert subscribers.matching(None, [later]) == {1}
+
+def test_date_window_parsing_and_round_trip():
+    from datetime import date
+    from core.subscriptions import DateWindow, describe_range
+    window = DateWindow.parse_text("01.05.2025-31.05.2025 пн-пт кроме 09.05.2025, 12.05.2025")
+
+    assert (window.start, window.end) == (date(2025, 5, 1), date(2025, 5, 31))
+    assert window.weekdays == frozenset(range(5))
+    assert window.excluded == {date(2025, 5, 9), date(2025, 5, 12)}
+    assert DateWindow.from_range(window.to_range()) == window
+    assert describe_range(window.to_range()) == "01.05.2025–31.05.2025, пн, вт, ср, чт, пт, кроме 09.05, 12.05"
+
+    assert window.contains(date(2025, 5, 8)) and not window.contains(date(2025, 5, 9))
+    assert not window.contains(date(2025, 5, 10))  # суббота
+    assert DateWindow.parse_text("до 20.05.2025 сб, вс").end == date(2025, 5, 20)
+    assert DateWindow.parse_text("с 01.06.2025").start == date(2025, 6, 1)
+    assert DateWindow.parse_text("пт-пн").weekdays == {4, 5, 6, 0}
+    assert DateWindow.parse_text("20.05.2025-01.05.2025") is None
+    assert DateWindow.parse_text("когда-нибудь") is None
+
+def test_interval_index_matches_brute_force():
+    import random
+    from datetime import date, timedelta
+    from core.subscriptions import DateWindow, IntervalIndex
+    rng = random.Random(7)
+    first = date(2025, 5, 1)
+    index, windows = IntervalIndex(), {}
+    for chat_id in range(2000):
+        start = first + timedelta(days=rng.randrange(90))
+        end = start + timedelta(days=rng.randrange(30))
+        window = DateWindow(
+            start=start if rng.random() > 0.1 else None,
+            end=end if rng.random() > 0.1 else None,
+            weekdays=frozenset(rng.sample(range(7), rng.randint(1, 7))),
+            excluded=frozenset({start + timedelta(days=1)})
+        )
+        windows[chat_id] = window
+        index.add(chat_id, window)
+    for chat_id in range(0, 2000, 3):
+        index.discard(chat_id)
+        del windows[chat_id]
+
+    for offset in range(0, 130, 4):
+        day = first + timedelta(days=offset)
+        assert sorted(index.stab(day)) == sorted(chat_id for chat_id, window in windows.items() if window.contains(day))
+
+def test_range_index_combines_horizons_and_windows():
+    from datetime import date
+    from core.subscriptions import DateWindow, RangeIndex
+    index = RangeIndex()
+    today = date(2025, 5, 1)
+    index.add(1, 'week')
+    index.add(2, DateWindow(start=date(2025, 5, 20), end=date(2025, 5, 25)).to_range())
+    index.add(3, DateWindow(weekdays=frozenset({5, 6})).to_range())
+
+    assert index.match(['05.05.2025'], today) == {1}
+    assert index.match(['05.05.2025', '24.05.2025'], today) == {1, 2, 3}
+    assert index.match(['22.05.2025'], today) == {2}
+    index.add(2, 'any')
+    assert index.match(['10.05.2025'], today) == {2, 3}
+    assert len(index) == 3
+
+def test_fallback_matcher_agrees_with_index():
+    """check_if_dates_in_range (чаты вне реестра) и RangeIndex дают один результат"""
+    from datetime import date, timedelta
+    from core.subscriptions import DateWindow, RangeIndex
+    from utils.date_utils import check_if_dates_in_range
+    today = date.today()
+    in_days = lambda days: (today + timedelta(days=days)).strftime('%d.%m.%Y')
+    ranges = ['week', 'two_weeks', 'month', 'any', 'days:10', 'unknown',
+              DateWindow(start=today + timedelta(days=20), end=today + timedelta(days=25)).to_range()]
+    index = RangeIndex()
+    for chat_id, preferred_range in enumerate(ranges):
+        index.add(chat_id, preferred_range)
+
+    cases = {
+        'today': [in_days(0)],
+        'days:N horizon': [in_days(10)],
+        'beyond horizon': [in_days(11)],
+        'window': [in_days(22)],
+        'past only': [in_days(-3)],
+        'unparsable': ['скоро'],
+        'empty': [],
+    }
+    for name, dates in cases.items():
+        matched = index.match(dates)
+        assert {chat_id for chat_id, preferred_range in enumerate(ranges)
+                if check_if_dates_in_range(dates, preferred_range)} == matched, name
+
+    # Выбранные граничные случаи
+    assert index.match([in_days(11)]) == {1, 2, 3, 5}
+    assert index.match([in_days(-3)]) == {3, 5}
+    assert index.match(['скоро']) == set(range(len(ranges)))
+
+def test_slot_checker_and_broadcast_share_one_registry(subscribers):
+    """Подписка из цикла SlotChecker попадает в рассылку и в базу, отписка - убирает отовсюду"""
+    from core.slot_checker import SlotChecker
+    checker = SlotChecker(subscriptions=subscribers)
+    assert checker.subscriptions is subscribers
+
+    checker.subscriptions.subscribe(7, 'week', service_id=150)
+    assert load_chat_ids() == [7]
+    assert subscribers.services() == {150}
+    assert SubscriberRegistry(subscribers.db_path).get(7).service_id == 150
+
+    checker.subscriptions.unsubscribe(7)
+    assert load_chat_ids() == []
+    assert SubscriberRegistry(subscribers.db_path).chat_ids() == []
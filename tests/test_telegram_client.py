@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+import pytest
+import utils.notification as notification
+from utils.message_store import MessageIdStore
+from utils.telegram_client import TelegramClient, AsyncTelegramClient
+
+def test_sync_client_reuses_connection(bot_api):
+    client = TelegramClient('123:abc', api_url=bot_api.url)
+
+    first = client.call('sendMessage', {'chat_id': 1, 'text': 'a', 'disable_notification': False})
+    second = client.call('sendMessage', {'chat_id': 1, 'text': 'b'})
+    client.close()
+
+    assert first['message_id'] == 1 and second['message_id'] == 2
+    # Оба запроса прошли по одному TCP-соединению
+    assert bot_api.calls[0][1] == bot_api.calls[1][1]
+    assert parse_qs(bot_api.calls[0][3].decode())['disable_notification'] == ['false']
+
+@pytest.mark.asyncio
+async def test_async_client_reuses_connection(bot_api):
+    client = AsyncTelegramClient('123:abc', api_url=bot_api.url)
+
+    await client.call('sendMessage', {'chat_id': 1, 'text': 'a'})
+    result = await client.call('editMessageText', {'chat_id': 1, 'message_id': 1, 'text': 'b'})
+    await client.close()
+
+    assert result == {'message_id': 2}
+    assert [call[0] for call in bot_api.calls] == ['sendMessage', 'editMessageText']
+    assert bot_api.calls[0][1] == bot_api.calls[1][1]
+
+def test_notification_paths_use_shared_client(bot_api, monkeypatch, tmp_path):
+    client = TelegramClient('123:abc', api_url=bot_api.url)
+    monkeypatch.setattr(notification, 'get_telegram_client', lambda token=None: client)
+    monkeypatch.setattr(notification, 'last_message_ids', MessageIdStore(str(tmp_path / 'ids.db'), flush_interval=None))
+
+    notification.send_telegram_notification(42, "🚨 *СРОЧНО! НАЙДЕНЫ СЛОТЫ!*", b"\x89PNG", "123:abc")
+    notification.send_text_message(42, "статус", "123:abc")
+    notification.update_message_text(42, 1, "новый статус", "123:abc")
+    client.close()
+
+    assert [call[0] for call in bot_api.calls] == ['sendPhoto', 'sendMessage', 'editMessageText']
+    assert bot_api.calls[0][2].startswith('multipart/form-data')
+    assert len({call[1] for call in bot_api.calls}) == 1
+    assert notification.last_message_ids['42'] == 1
+
+def test_broadcast_runs_in_priority_order_with_cap():
+    started, running, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def send(chat_id):
+        with lock:
+            started.append(chat_id)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if chat_id == 3:
+            raise RuntimeError("network")
+        return chat_id
+
+    deliveries = [(chat_id, 'alert' if chat_id < 3 else 'status', lambda chat_id=chat_id: send(chat_id))
+                  for chat_id in range(6)]
+    results = notification.broadcast(deliveries, max_workers=2)
+
+    assert started[:2] == [0, 1]
+    assert peak[0] == 2
+    assert results == {0: 0, 1: 1, 2: 2, 3: None, 4: 4, 5: 5}
+
+def test_broadcast_uploads_photo_once(bot_api, monkeypatch, tmp_path):
+    client = TelegramClient('123:abc', api_url=bot_api.url)
+    monkeypatch.setattr(notification, 'get_telegram_client', lambda token=None: client)
+    monkeypatch.setattr(notification, 'last_message_ids', MessageIdStore(str(tmp_path / 'ids.db'), flush_interval=None))
+    monkeypatch.setattr(notification, '_file_ids', OrderedDict())
+    photo = b"\xff\xd8\xff" + b"slots" * 100
+
+    notification.broadcast([
+        (chat_id, 'alert', lambda chat_id=chat_id: notification.send_telegram_notification(chat_id, "🚨", photo, "123:abc"))
+        for chat_id in range(5)
+    ], max_workers=5)
+    notification.update_message_with_photo(99, 1, "статус", photo, "123:abc")
+    client.close()
+
+    uploads = [call for call in bot_api.calls if call[2].startswith('multipart/form-data')]
+    assert len(uploads) == 1
+    file_id = 'file1'
+    assert all(f'photo={file_id}'.encode() in call[3] for call in bot_api.calls[1:5])
+    assert bot_api.calls[5][0] == 'editMessageMedia'
+    assert file_id.encode() in bot_api.calls[5][3]
+
+def test_cached_file_id_is_kept_on_rate_limit(bot_api, monkeypatch):
+    client = TelegramClient('123:abc', api_url=bot_api.url)
+    monkeypatch.setattr(notification, '_file_ids', OrderedDict())
+    photo = b"\xff\xd8\xff" + b"frame" * 100
+    key = notification.photo_key(photo)
+    notification.post_photo(client, 'sendPhoto', {'chat_id': 1}, photo)
+
+    bot_api.errors['sendPhoto'] = [(429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 3'})]
+    response = notification.post_photo(client, 'sendPhoto', {'chat_id': 2}, photo)
+    assert response.status_code == 429
+    assert notification.get_file_id(key) == 'file1'
+
+    bot_api.errors['sendPhoto'] = [(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: wrong file identifier/HTTP URL specified'})]
+    assert notification.post_photo(client, 'sendPhoto', {'chat_id': 3}, photo).status_code == 200
+    client.close()
+
+    uploads = [call for call in bot_api.calls if call[2].startswith('multipart/form-data')]
+    assert len(uploads) == 2  # первая загрузка и повторная после отказа в file_id
+    assert notification.get_file_id(key) == 'file4'
+
+def test_unchanged_frame_is_not_sent_again(bot_api, monkeypatch):
+    client = TelegramClient('123:abc', api_url=bot_api.url)
+    monkeypatch.setattr(notification, 'get_telegram_client', lambda token=None: client)
+    monkeypatch.setattr(notification, 'last_frames', {})
+    monkeypatch.setattr(notification, '_file_ids', OrderedDict())
+    photo = b"\xff\xd8\xff" + b"status" * 100
+
+    assert notification.update_message_with_photo(7, 1, "Нет слотов", photo, "123:abc")
+    # Тот же кадр и та же подпись - запросов нет
+    assert notification.update_message_with_photo(7, 1, "Нет слотов", photo, "123:abc")
+    assert [call[0] for call in bot_api.calls] == ['editMessageMedia']
+
+    # Тот же кадр, новая подпись - только editMessageCaption
+    assert notification.update_message_with_photo(7, 1, "Нет слотов (12:05)", photo, "123:abc")
+    client.close()
+
+    assert [call[0] for call in bot_api.calls] == ['editMessageMedia', 'editMessageCaption']
+    assert parse_qs(bot_api.calls[1][3].decode())['caption'] == ['Нет слотов (12:05)']
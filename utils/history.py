@@ -0,0 +1,175 @@
+"""
+Журнал результатов проверок: дневные сегменты JSONL только на дозапись.
+
+Каждая запись - одна строка JSON в файле history-ГГГГ-ММ-ДД.jsonl текущего
+дня, поэтому сохранение проверки стоит одну дозапись, а не перезапись всей
+истории. При смене дня фоновый поток сжимает закрытые сегменты в .jsonl.gz
+и удаляет сегменты старше retention_days.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+
+from loguru import logger
+
+SEGMENT_RE = re.compile(r'^history-(\d{4}-\d{2}-\d{2})\.jsonl(\.gz)?$')
+
+
+class HistoryStore:
+    """Журнал проверок в каталоге directory."""
+
+    def __init__(self, directory, retention_days=180, legacy_file=None):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.legacy_file = legacy_file
+        self._lock = threading.Lock()
+        self._file = None
+        self._day = None
+        self._compactor = None
+        self._compact_day = None
+
+    def _segment_path(self, day, compressed=False):
+        name = f"history-{day.isoformat()}.jsonl"
+        return os.path.join(self.directory, name + ('.gz' if compressed else ''))
+
+    def segments(self):
+        """Сегменты журнала [(день, путь)] по возрастанию дня."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = {}
+        for name in os.listdir(self.directory):
+            match = SEGMENT_RE.match(name)
+            if match:
+                day = date.fromisoformat(match.group(1))
+                # Если остались обе версии сегмента (сжатие прервано), читаем несжатую
+                if day not in found or not match.group(2):
+                    found[day] = os.path.join(self.directory, name)
+        return sorted(found.items())
+
+    def append(self, entry, timestamp=None):
+        """Дописывает запись; timestamp (datetime) по умолчанию - текущее время."""
+        timestamp = timestamp or datetime.now()
+        record = {"timestamp": timestamp.isoformat(), **entry}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                if self._day != timestamp.date() or self._file is None:
+                    self._open_segment(timestamp.date())
+                self._file.write(line)
+                self._file.flush()
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении истории: {e}")
+            return False
+
+    def _open_segment(self, day):
+        first_open = self._day is None
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        if first_open:
+            self._import_legacy()
+        self._file = open(self._segment_path(day), "a", encoding="utf-8")
+        self._day = day
+        # Открыт новый сегмент - закрытые можно сжать и почистить
+        self._start_compaction()
+
+    def _import_legacy(self):
+        """Переносит старый booking_history.json в сегменты (один раз)."""
+        if not self.legacy_file or not os.path.exists(self.legacy_file) or self.segments():
+            return
+        with open(self.legacy_file, "r") as f:
+            legacy = json.load(f)
+        by_day = {}
+        for record in legacy:
+            day = datetime.fromisoformat(record["timestamp"]).date()
+            by_day.setdefault(day, []).append(record)
+        for day, records in by_day.items():
+            with open(self._segment_path(day), "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        logger.info(f"Перенесено {len(legacy)} записей истории из {self.legacy_file}")
+
+    def _start_compaction(self):
+        # Вызывается под self._lock; если сжатие уже идет, оно повторится для нового дня
+        self._compact_day = self._day
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compaction_loop, name="history-compactor", daemon=True)
+            self._compactor.start()
+
+    def _compaction_loop(self):
+        while True:
+            with self._lock:
+                day, self._compact_day = self._compact_day, None
+                if day is None:
+                    self._compactor = None
+                    return
+            self.compact(day)
+
+    def compact(self, today=None):
+        """Сжимает закрытые сегменты и удаляет сегменты старше retention_days."""
+        today = today or date.today()
+        cutoff = today - timedelta(days=self.retention_days)
+        for day, path in self.segments():
+            try:
+                if day < cutoff:
+                    os.remove(path)
+                    logger.info(f"Удален сегмент истории {path}")
+                elif day < today and not path.endswith(".gz"):
+                    compressed = self._segment_path(day, compressed=True)
+                    with open(path, "rb") as source, gzip.open(compressed + ".tmp", "wb") as target:
+                        target.write(source.read())
+                    os.replace(compressed + ".tmp", compressed)
+                    os.remove(path)
+            except Exception as e:
+                logger.error(f"Ошибка при сжатии сегмента истории {path}: {e}")
+
+    def read(self, since=None, until=None):
+        """Записи за период [since, until] (datetime), от старых к новым."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        for day, path in self.segments():
+            if (since and day < since.date()) or (until and day > until.date()):
+                continue
+            try:
+                records = self._read_segment(path)
+            except FileNotFoundError:
+                # Сегмент только что сжат - читаем сжатую копию
+                records = self._read_segment(self._segment_path(day, compressed=True))
+            for record in records:
+                timestamp = datetime.fromisoformat(record["timestamp"])
+                if (since and timestamp < since) or (until and timestamp > until):
+                    continue
+                yield record
+
+    @staticmethod
+    def _read_segment(path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def last(self, count=100):
+        """Последние count записей (читаются только последние сегменты)."""
+        result = []
+        for day, path in reversed(self.segments()):
+            records = list(self.read(since=datetime.combine(day, datetime.min.time()),
+                                     until=datetime.combine(day, datetime.max.time())))
+            result[:0] = records
+            if len(result) >= count:
+                break
+        return result[-count:]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._day = None
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
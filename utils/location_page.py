@@ -0,0 +1,141 @@
+"""
+Разбор страницы выбора локации (standortauswahl.php) за один проход по HTML.
+"""
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional
+import re
+
+STANDORT_RE = re.compile(r'standortid=(\d+)')
+EARLIEST_DATE_RE = re.compile(r'Termine verfügbar ab\s*(\d{2}\.\d{2}\.\d{4})')
+HORIZON_RE = re.compile(r'bis zu\s*(\d+)\s*Tage')
+
+
+@dataclass
+class LocationSlot:
+    """Состояние одной локации на странице выбора."""
+    name: str
+    standortid: Optional[int]
+    disabled: bool
+    earliest_date: Optional[str] = None
+    horizon_days: Optional[int] = None  # "Sie können Termine bis zu N Tage im Voraus buchen"
+
+    @property
+    def available(self) -> bool:
+        return not self.disabled
+
+
+class _LocationPageParser(HTMLParser):
+    """
+    Последовательно собирает данные локации (название, дату) и закрывает
+    запись на кнопке 'auswählen' с callURL('terminauswahl.php?standortid=...').
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.locations: List[LocationSlot] = []
+        self._reset_record()
+        self._name_depth = 0
+        self._div_depth = 0
+
+    def _reset_record(self):
+        self._name = []
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'div':
+            self._div_depth += 1
+            classes = (dict(attrs).get('class') or '').split()
+            if 'float-left' in classes and not self._name_depth:
+                self._name = []
+                self._name_depth = self._div_depth
+        elif tag == 'button':
+            attrs = dict(attrs)
+            if 'LBV-choosebutton' not in (attrs.get('class') or ''):
+                return
+            match = STANDORT_RE.search(attrs.get('onclick') or '')
+            if not match:
+                return
+            text = ' '.join(self._text)
+            date_match = EARLIEST_DATE_RE.search(text)
+            horizon_match = HORIZON_RE.search(text)
+            self.locations.append(LocationSlot(
+                name=' '.join(''.join(self._name).split()),
+                standortid=int(match.group(1)),
+                disabled='disabled' in attrs,
+                earliest_date=date_match.group(1) if date_match else None,
+                horizon_days=int(horizon_match.group(1)) if horizon_match else None
+            ))
+            self._reset_record()
+
+    def handle_endtag(self, tag):
+        if tag == 'div':
+            if self._name_depth == self._div_depth:
+                self._name_depth = 0
+            self._div_depth -= 1
+
+    def handle_data(self, data):
+        if self._name_depth:
+            self._name.append(data)
+        self._text.append(data)
+
+
+def parse_location_page(html):
+    """Возвращает список LocationSlot для HTML страницы выбора локации."""
+    parser = _LocationPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.locations
+
+
+# Собирает состояние всех локаций за один вызов execute_script.
+# Каждая локация - отдельная карточка .card с названием, текстом и кнопкой выбора.
+COLLECT_SLOTS_SCRIPT = r"""
+var result = [];
+document.querySelectorAll('button.LBV-choosebutton').forEach(function (button) {
+    var match = /standortid=(\d+)/.exec(button.getAttribute('onclick') || '');
+    if (!match) {
+        return;
+    }
+    var card = button.closest('.card') || button.parentElement;
+    var nameElement = card.querySelector('.float-left');
+    var text = card.textContent || '';
+    var date = /Termine verfügbar ab\s*(\d{2}\.\d{2}\.\d{4})/.exec(text);
+    var horizon = /bis zu\s*(\d+)\s*Tage/.exec(text);
+    result.push({
+        name: nameElement ? nameElement.textContent.replace(/\s+/g, ' ').trim() : '',
+        standortid: parseInt(match[1], 10),
+        disabled: button.disabled,
+        earliest_date: date ? date[1] : null,
+        horizon_days: horizon ? parseInt(horizon[1], 10) : null
+    });
+});
+return result;
+"""
+
+# Выделяет карточки локаций одним скриптом (отладочный режим)
+HIGHLIGHT_SLOTS_SCRIPT = r"""
+var ids = arguments[0], color = arguments[1];
+document.querySelectorAll('button.LBV-choosebutton').forEach(function (button) {
+    var match = /standortid=(\d+)/.exec(button.getAttribute('onclick') || '');
+    if (match && ids.indexOf(parseInt(match[1], 10)) !== -1) {
+        (button.closest('.card') || button).style.border = '4px solid ' + color;
+    }
+});
+"""
+
+
+def collect_location_slots(driver):
+    """
+    Возвращает список LocationSlot открытой в драйвере страницы.
+
+    Основной путь - один execute_script; если скрипт вернул не список
+    (страница еще не готова, драйвер без JS), разбираем page_source.
+    """
+    try:
+        records = driver.execute_script(COLLECT_SLOTS_SCRIPT)
+    except Exception:
+        records = None
+    if isinstance(records, list):
+        return [LocationSlot(**record) for record in records]
+    return parse_location_page(driver.page_source)
@@ -0,0 +1,190 @@
+"""
+Хранилище ID последних сообщений по чатам.
+
+Раньше после каждой отправки весь словарь last_message_ids переписывался в
+last_message_ids.json. Теперь словарь живет в памяти под блокировкой, а
+изменения сбрасываются в SQLite (WAL) пачками: фоновым потоком раз в
+flush_interval секунд и при остановке. Запись одного сообщения стоит O(1),
+сколько бы чатов ни было.
+
+Данные загружаются при первом обращении; если таблица пуста, а рядом лежит
+старый last_message_ids.json, его содержимое переносится в базу.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS last_message_ids (
+    chat_id TEXT PRIMARY KEY,
+    message_id INTEGER NOT NULL
+)
+"""
+
+
+class MessageIdStore(MutableMapping):
+    """
+    Потокобезопасный словарь chat_id -> message_id с отложенной записью.
+
+    Ключи приводятся к строке, поэтому chat_id можно передавать и числом,
+    и строкой (как в старом JSON).
+    """
+
+    def __init__(self, db_path, flush_interval=5.0, legacy_json=None):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.legacy_json = legacy_json
+        self._ids = {}
+        self._dirty = set()
+        self._deleted = set()
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._connection = None
+        self._loaded = False
+        self._flusher = None
+        self._stop = threading.Event()
+
+    # Словарь
+
+    def __getitem__(self, chat_id):
+        self._ensure_loaded()
+        with self._lock:
+            return self._ids[str(chat_id)]
+
+    def __setitem__(self, chat_id, message_id):
+        self._ensure_loaded()
+        key = str(chat_id)
+        with self._lock:
+            self._ids[key] = int(message_id)
+            self._dirty.add(key)
+            self._deleted.discard(key)
+        self._ensure_flusher()
+
+    def __delitem__(self, chat_id):
+        self._ensure_loaded()
+        key = str(chat_id)
+        with self._lock:
+            del self._ids[key]
+            self._dirty.discard(key)
+            self._deleted.add(key)
+        self._ensure_flusher()
+
+    def __contains__(self, chat_id):
+        self._ensure_loaded()
+        with self._lock:
+            return str(chat_id) in self._ids
+
+    def __iter__(self):
+        self._ensure_loaded()
+        with self._lock:
+            return iter(list(self._ids))
+
+    def __len__(self):
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._ids)
+
+    # Хранение
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        """Загружает ID из базы (и из старого JSON, если база пуста)."""
+        with self._lock:
+            if self._loaded:
+                return True
+            try:
+                with self._db_lock:
+                    rows = self._connect().execute("SELECT chat_id, message_id FROM last_message_ids").fetchall()
+                self._ids.update((chat_id, message_id) for chat_id, message_id in rows if chat_id not in self._ids)
+                if not rows:
+                    self._import_legacy_json()
+                return True
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке ID сообщений: {e}")
+                return False
+            finally:
+                # Даже при ошибке базы словарь работает в памяти
+                self._loaded = True
+
+    def _import_legacy_json(self):
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        with open(self.legacy_json, "r") as f:
+            legacy = json.load(f)
+        for chat_id, message_id in legacy.items():
+            self._ids.setdefault(str(chat_id), int(message_id))
+            self._dirty.add(str(chat_id))
+        logger.info(f"Перенесено {len(legacy)} ID сообщений из {self.legacy_json}")
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            if not self._dirty and not self._deleted:
+                return True
+            upserts = [(key, self._ids[key]) for key in self._dirty]
+            deletes = [(key,) for key in self._deleted]
+            self._dirty.clear()
+            self._deleted.clear()
+        try:
+            with self._db_lock:
+                connection = self._connect()
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO last_message_ids (chat_id, message_id) VALUES (?, ?) "
+                        "ON CONFLICT(chat_id) DO UPDATE SET message_id = excluded.message_id",
+                        upserts
+                    )
+                    connection.executemany("DELETE FROM last_message_ids WHERE chat_id = ?", deletes)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении ID сообщений: {e}")
+            # Изменения не потеряны: попробуем при следующем сбросе
+            with self._lock:
+                for key, _ in upserts:
+                    if key in self._ids:
+                        self._dirty.add(key)
+                self._deleted.update(key for key, in deletes if key not in self._ids)
+            return False
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or self.flush_interval is None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="message-id-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Останавливает фоновый сброс, записывает остаток и закрывает базу."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(self.flush_interval)
+        self.flush()
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        self._flusher = None
+        self._stop.clear()
@@ -1,60 +1,196 @@
 """
 Модуль для отправки уведомлений пользователям
 """
-import json
+import hashlib
 import os
-import requests
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
-from config.config import TELEGRAM_TOKEN
-from telegram import Bot, ParseMode
-import asyncio
+from config.config import TELEGRAM_TOKEN, BROADCAST_WORKERS, MESSAGE_STORE_PATH, MESSAGE_STORE_FLUSH_INTERVAL
+from metrics.prometheus import SCREENSHOT_UPDATES, BROADCAST_LATENCY, PHOTO_UPLOADS
+from utils.screenshots import frame_fingerprint, photo_upload
+from utils.message_store import MessageIdStore
+from utils.telegram_client import get_telegram_client
 
-# Словарь для хранения ID последних сообщений для каждого чата
-last_message_ids = {}
+# ID последних сообщений по чатам: в памяти, на диск - пачками в фоне
+last_message_ids = MessageIdStore(
+    MESSAGE_STORE_PATH,
+    flush_interval=MESSAGE_STORE_FLUSH_INTERVAL,
+    legacy_json="last_message_ids.json"
+)
 
-def send_telegram_notification(chat_id, message, screenshot_path=None, token=None, disable_notification=False):
+# Последний отправленный кадр по чатам: {chat_id: (message_id, отпечаток, подпись)}
+last_frames = {}
+_last_frames_lock = threading.Lock()
+
+def remember_frame(chat_id, message_id, fingerprint, caption):
+    """Запоминает кадр, который сейчас показан в сообщении чата."""
+    with _last_frames_lock:
+        last_frames[str(chat_id)] = (message_id, fingerprint, caption)
+
+def get_last_frame(chat_id):
+    with _last_frames_lock:
+        return last_frames.get(str(chat_id))
+
+def load_photo(photo):
+    """
+    Возвращает содержимое фото в байтах.
+    
+    Принимает байты скриншота (get_screenshot_as_png) или путь к файлу;
+    для несуществующего файла возвращает None.
+    """
+    if not photo:
+        return None
+    if isinstance(photo, (bytes, bytearray)):
+        return bytes(photo)
+    if not os.path.exists(photo):
+        return None
+    with open(photo, 'rb') as f:
+        return f.read()
+
+# file_id загруженных картинок по хэшу содержимого: одна загрузка на всю рассылку
+FILE_ID_CACHE_SIZE = 256
+_file_ids = OrderedDict()
+_upload_locks = {}
+_file_ids_lock = threading.Lock()
+
+def photo_key(photo):
+    """Ключ кэша file_id - хэш содержимого картинки."""
+    return hashlib.sha256(photo).hexdigest()
+
+def get_file_id(key):
+    with _file_ids_lock:
+        file_id = _file_ids.get(key)
+        if file_id is not None:
+            _file_ids.move_to_end(key)
+        return file_id
+
+def remember_file_id(key, result):
+    """Запоминает file_id из ответа sendPhoto/editMessageMedia (самый крупный размер)."""
+    sizes = result.get('photo') if isinstance(result, dict) else None
+    if not sizes:
+        return None
+    file_id = sizes[-1]['file_id']
+    with _file_ids_lock:
+        _file_ids[key] = file_id
+        _file_ids.move_to_end(key)
+        while len(_file_ids) > FILE_ID_CACHE_SIZE:
+            _file_ids.popitem(last=False)
+    return file_id
+
+def forget_file_id(key):
+    with _file_ids_lock:
+        _file_ids.pop(key, None)
+
+def _photo_request(data, media, file_id):
+    """Поля запроса с фото: поле photo или InputMediaPhoto для editMessageMedia."""
+    if media is None:
+        return {**data, 'photo': file_id} if file_id else data
+    return {**data, 'media': {**media, 'media': file_id or 'attach://photo'}}
+
+def _sent_result(response):
+    """Поле result ответа sendPhoto или None при ошибке (как TelegramClient.call)."""
+    if response.status_code != 200:
+        logger.error(f"Ошибка Telegram API sendPhoto: {response.text}")
+        return None
+    return response.json().get('result')
+
+def _file_id_rejected(response):
+    """True, если Telegram отверг именно file_id (а не запрос по другой причине)."""
+    if response.status_code != 400:
+        return False
+    text = response.text.lower()
+    return 'file identifier' in text or 'file reference' in text
+
+def post_photo(client, method, data, photo, media=None):
+    """
+    Вызывает метод Bot API с картинкой, загружая ее не больше одного раза.
+    
+    Если картинка с таким же содержимым уже загружалась, вместо файла
+    передается ее file_id. Пока одна рассылка загружает картинку, остальные
+    потоки ждут ее file_id, а не загружают ту же картинку параллельно.
+    
+    Args:
+        client: TelegramClient
+        method: 'sendPhoto' или 'editMessageMedia'
+        data: остальные поля запроса
+        photo: картинка в байтах
+        media: InputMediaPhoto без поля media (для editMessageMedia)
+    
+    Returns:
+        requests.Response
+    """
+    key = photo_key(photo)
+    file_id = get_file_id(key)
+    if file_id:
+        response = client.post(method, _photo_request(data, media, file_id))
+        if not _file_id_rejected(response):
+            # Успех или ошибка, не связанная с картинкой (429, длинная подпись...) - повторная загрузка не поможет
+            if response.status_code == 200:
+                PHOTO_UPLOADS.labels(source='file_id').inc()
+            return response
+        # file_id устарел - загружаем картинку заново
+        logger.warning(f"file_id не принят ({response.text}), загружаем картинку заново")
+        forget_file_id(key)
+    
+    with _file_ids_lock:
+        lock = _upload_locks.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            file_id = get_file_id(key)
+            if file_id:
+                PHOTO_UPLOADS.labels(source='file_id').inc()
+                return client.post(method, _photo_request(data, media, file_id))
+            response = client.post(method, _photo_request(data, media, None), files={'photo': photo_upload(photo)})
+            if response.status_code == 200:
+                PHOTO_UPLOADS.labels(source='upload').inc()
+                remember_file_id(key, response.json().get('result'))
+            return response
+    finally:
+        with _file_ids_lock:
+            if _upload_locks.get(key) is lock and not lock.locked():
+                del _upload_locks[key]
+
+def send_telegram_notification(chat_id, message, screenshot=None, token=None, disable_notification=False):
     """
     Отправляет уведомление пользователю.
     
     Args:
         chat_id: ID чата
         message: текст сообщения
-        screenshot_path: путь к скриншоту
+        screenshot: скриншот в байтах или путь к файлу
         token: токен бота
         disable_notification: True для отправки уведомления без звука
     """
-    if not token:
-        from config.config import TELEGRAM_TOKEN
-        token = TELEGRAM_TOKEN
-    
-    bot = Bot(token=token)
+    # Общий клиент с открытыми соединениями: срочное уведомление не ждет TCP/TLS-рукопожатия
+    client = get_telegram_client(token)
     
     try:
-        if screenshot_path and os.path.exists(screenshot_path):
-            # Отправляем фото с подписью
-            with open(screenshot_path, 'rb') as photo:
-                # Не использовать await с синхронными методами
-                sent_message = bot.send_photo(
-                    chat_id=chat_id,
-                    photo=photo,
-                    caption=message,
-                    parse_mode=ParseMode.MARKDOWN,
-                    disable_notification=disable_notification
-                )
-                
-                # Сохраняем ID сообщения
-                if sent_message:
-                    last_message_ids[str(chat_id)] = sent_message.message_id
-                    save_last_message_ids()
-                return sent_message
+        photo = load_photo(screenshot)
+        if photo:
+            # Отправляем фото с подписью прямо из памяти
+            response = post_photo(client, 'sendPhoto', {
+                'chat_id': chat_id,
+                'caption': message,
+                'parse_mode': 'Markdown',
+                'disable_notification': disable_notification
+            }, photo)
+            sent_message = _sent_result(response)
+            
+            # Сохраняем ID сообщения
+            if sent_message:
+                last_message_ids[str(chat_id)] = sent_message['message_id']
+            return sent_message
         else:
             # Отправляем только текст
-            sent_message = bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode=ParseMode.MARKDOWN,
-                disable_notification=disable_notification
-            )
+            sent_message = client.call('sendMessage', {
+                'chat_id': chat_id,
+                'text': message,
+                'parse_mode': 'Markdown',
+                'disable_notification': disable_notification
+            })
             return sent_message
     except Exception as e:
         logger.error(f"Ошибка при отправке уведомления: {e}")
@@ -62,13 +198,12 @@ def send_telegram_notification(chat_id, message, screenshot_path=None, token=Non
 
 def send_text_message(chat_id, text, token):
     """Отправляет текстовое сообщение"""
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
     data = {
         "chat_id": chat_id,
         "text": text,
         "parse_mode": "Markdown"
     }
-    response = requests.post(url, data=data, timeout=10)
+    response = get_telegram_client(token).post('sendMessage', data)
     if response.status_code != 200:
         logger.error(f"Ошибка отправки текста: {response.text}")
         return None
@@ -82,19 +217,18 @@ def truncate_message(message, max_length=1000):
     # Обрезаем сообщение и добавляем метку
     return message[:max_length-20] + "... [обрезано]"
 
-def send_photo_with_caption(chat_id, caption, photo_path, token):
-    """Отправляет фото с подписью в Telegram."""
+def send_photo_with_caption(chat_id, caption, photo, token):
+    """Отправляет фото (байты или путь к файлу) с подписью в Telegram."""
     try:
         # Обрезаем слишком длинные подписи
         caption = truncate_message(caption, max_length=1024)  # Telegram ограничивает подписи до 1024 символов
         
-        url = f"https://api.telegram.org/bot{token}/sendPhoto"
+        client = get_telegram_client(token)
         
-        with open(photo_path, 'rb') as photo:
-            files = {'photo': photo}
-            data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'Markdown'}
-            
-            response = requests.post(url, files=files, data=data)
+        photo = load_photo(photo)
+        data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'Markdown'}
+        
+        response = post_photo(client, 'sendPhoto', data, photo)
             
         if response.status_code == 200:
             result = response.json()
@@ -102,7 +236,7 @@ def send_photo_with_caption(chat_id, caption, photo_path, token):
             if result.get('ok'):
                 message_id = result['result']['message_id']
                 last_message_ids[chat_id] = message_id
-                save_last_message_ids()
+                remember_frame(chat_id, message_id, frame_fingerprint(photo), caption)
             return True
         else:
             logger.error(f"Ошибка отправки фото: {response.text}")
@@ -110,18 +244,15 @@ def send_photo_with_caption(chat_id, caption, photo_path, token):
             # Если проблема в длине сообщения, отправляем отдельно
             if "caption is too long" in response.text:
                 # Отправляем фото без подписи
-                with open(photo_path, 'rb') as photo:
-                    files = {'photo': photo}
-                    data = {'chat_id': chat_id}
-                    response = requests.post(url, files=files, data=data)
+                data = {'chat_id': chat_id}
+                response = post_photo(client, 'sendPhoto', data, photo)
                 
                 # Отправляем текст отдельным сообщением
-                text_url = f"https://api.telegram.org/bot{token}/sendMessage"
                 # Разбиваем сообщение на части по 4000 символов
                 for i in range(0, len(caption), 4000):
                     part = caption[i:i+4000]
                     data = {'chat_id': chat_id, 'text': part, 'parse_mode': 'Markdown'}
-                    requests.post(text_url, data=data)
+                    client.post('sendMessage', data)
                 
                 return True
             
@@ -132,52 +263,80 @@ def send_photo_with_caption(chat_id, caption, photo_path, token):
 
 def update_message_text(chat_id, message_id, text, token):
     """Обновляет текст существующего сообщения"""
-    url = f"https://api.telegram.org/bot{token}/editMessageText"
     data = {
         "chat_id": chat_id,
         "message_id": message_id,
         "text": text,
         "parse_mode": "Markdown"
     }
-    response = requests.post(url, data=data, timeout=10)
+    response = get_telegram_client(token).post('editMessageText', data)
     if response.status_code != 200:
         logger.error(f"Ошибка обновления текста: {response.text}")
         return None
     return response.json().get('result')
 
-def update_message_with_photo(chat_id, message_id, caption, photo_path, token):
-    """Обновляет сообщение с фото."""
+def update_message_caption(chat_id, message_id, caption, token):
+    """Обновляет только подпись сообщения с фото, без повторной загрузки картинки."""
+    data = {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "caption": caption,
+        "parse_mode": "Markdown"
+    }
+    response = get_telegram_client(token).post('editMessageCaption', data)
+    if response.status_code == 200 or "message is not modified" in response.text:
+        return True
+    logger.error(f"Ошибка обновления подписи: {response.text}")
+    return False
+
+def update_message_with_photo(chat_id, message_id, caption, photo, token):
+    """
+    Обновляет сообщение с фото (байты или путь к файлу).
+    
+    Если кадр не изменился с последней отправки в этот чат, картинка не
+    загружается повторно: обновляется только подпись, а при той же подписи
+    запрос не отправляется вовсе.
+    """
     try:
         # Обрезаем слишком длинные подписи
         caption = truncate_message(caption, max_length=1024)
         
-        url = f"https://api.telegram.org/bot{token}/editMessageMedia"
+        photo = load_photo(photo)
+        fingerprint = frame_fingerprint(photo)
+        last_frame = get_last_frame(chat_id)
         
-        with open(photo_path, 'rb') as photo:
-            media = {
-                'type': 'photo',
-                'media': f'attach://photo',
-                'caption': caption,
-                'parse_mode': 'Markdown'
-            }
-            
-            files = {'photo': photo}
-            data = {
-                'chat_id': chat_id,
-                'message_id': message_id,
-                'media': json.dumps(media)
-            }
-            
-            response = requests.post(url, files=files, data=data)
+        if last_frame and last_frame[0] == message_id and last_frame[1] == fingerprint:
+            if last_frame[2] == caption:
+                logger.debug(f"Кадр и подпись для {chat_id} не изменились, обновление пропущено")
+                SCREENSHOT_UPDATES.labels(result='skipped').inc()
+                return True
+            if update_message_caption(chat_id, message_id, caption, token):
+                remember_frame(chat_id, message_id, fingerprint, caption)
+                SCREENSHOT_UPDATES.labels(result='caption').inc()
+                return True
+        
+        media = {
+            'type': 'photo',
+            'caption': caption,
+            'parse_mode': 'Markdown'
+        }
+        data = {
+            'chat_id': chat_id,
+            'message_id': message_id
+        }
+        
+        response = post_photo(get_telegram_client(token), 'editMessageMedia', data, photo, media)
             
         if response.status_code == 200:
+            remember_frame(chat_id, message_id, fingerprint, caption)
+            SCREENSHOT_UPDATES.labels(result='uploaded').inc()
             return True
         else:
             logger.error(f"Ошибка обновления сообщения с фото: {response.text}")
             
             # Если проблема в длине сообщения, отправляем новое
             if "caption is too long" in response.text:
-                return send_photo_with_caption(chat_id, caption, photo_path, token)
+                return send_photo_with_caption(chat_id, caption, photo, token)
                 
             return False
     except Exception as e:
@@ -185,105 +344,110 @@ def update_message_with_photo(chat_id, message_id, caption, photo_path, token):
         return False
 
 def load_chat_ids():
-    """Загружает ID чатов из файла"""
+    """Возвращает ID чатов подписчиков (из памяти реестра)"""
+    from utils.subscribers import get_subscribers
     try:
-        if os.path.exists("telegram_users.json"):
-            with open("telegram_users.json", "r") as f:
-                data = json.load(f)
-                return data.get("chat_ids", [])
-        return []
+        return get_subscribers().chat_ids()
     except Exception as e:
         logger.error(f"Ошибка при загрузке ID чатов: {e}")
         return []
 
 def save_last_message_ids():
-    """Сохраняет ID последних сообщений в файл"""
-    try:
-        with open("last_message_ids.json", "w") as f:
-            json.dump(last_message_ids, f)
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении ID сообщений: {e}")
-        return False
+    """Сбрасывает накопленные ID последних сообщений в базу"""
+    return last_message_ids.flush()
 
 def load_last_message_ids():
-    """Загружает ID последних сообщений из файла"""
-    global last_message_ids
-    try:
-        if os.path.exists("last_message_ids.json"):
-            with open("last_message_ids.json", "r") as f:
-                last_message_ids = json.load(f)
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"Ошибка при загрузке ID сообщений: {e}")
-        return False
+    """Загружает ID последних сообщений (один раз, при первом обращении)"""
+    return last_message_ids.load()
 
-def update_last_message(chat_id, text, screenshot_path=None, token=None):
+def update_last_message(chat_id, text, screenshot=None, token=None):
     """
     Обновляет последнее отправленное сообщение вместо отправки нового.
     
     Args:
         chat_id: ID чата
         text: новый текст сообщения
-        screenshot_path: путь к новому скриншоту
+        screenshot: новый скриншот в байтах или путь к файлу
         token: токен бота
     
     Returns:
         True в случае успеха, False иначе
     """
-    global last_message_ids
-    
-    if not token:
-        from config.config import TELEGRAM_TOKEN
-        token = TELEGRAM_TOKEN
-    
     # Получаем ID последнего сообщения для этого чата
     chat_id_str = str(chat_id)
     if chat_id_str not in last_message_ids:
         # Если нет сохраненного ID, отправляем новое сообщение
         logger.warning(f"Нет сохраненного ID сообщения для чата {chat_id}, отправляем новое")
-        return send_telegram_notification(chat_id, text, screenshot_path, token)
+        return send_telegram_notification(chat_id, text, screenshot, token)
     
     message_id = last_message_ids[chat_id_str]
     
     try:
-        bot = Bot(token=token)
+        client = get_telegram_client(token)
         
-        if screenshot_path and os.path.exists(screenshot_path):
-            # Обновляем сообщение с фото
-            with open(screenshot_path, 'rb') as photo:
-                # Сначала удаляем старое сообщение
-                try:
-                    bot.delete_message(chat_id=chat_id, message_id=message_id)
-                except Exception as e:
-                    logger.warning(f"Не удалось удалить старое сообщение: {e}")
-                
-                # Отправляем новое сообщение
-                sent_message = bot.send_photo(
-                    chat_id=chat_id,
-                    photo=photo,
-                    caption=text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-                # Сохраняем новый ID сообщения
-                if sent_message:
-                    last_message_ids[str(chat_id)] = sent_message.message_id
-                    save_last_message_ids()
-                
-                return sent_message
+        photo = load_photo(screenshot)
+        if photo:
+            # Сначала удаляем старое сообщение
+            if not client.call('deleteMessage', {'chat_id': chat_id, 'message_id': message_id}):
+                logger.warning(f"Не удалось удалить старое сообщение {message_id}")
+            
+            # Отправляем новое сообщение
+            response = post_photo(client, 'sendPhoto', {'chat_id': chat_id, 'caption': text, 'parse_mode': 'Markdown'}, photo)
+            sent_message = _sent_result(response)
+            
+            # Сохраняем новый ID сообщения
+            if sent_message:
+                last_message_ids[str(chat_id)] = sent_message['message_id']
+            
+            return sent_message
         else:
             # Обновляем текстовое сообщение
-            edited_message = bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=text,
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return edited_message
+            edited_message = client.call('editMessageText', {
+                'chat_id': chat_id,
+                'message_id': message_id,
+                'text': text,
+                'parse_mode': 'Markdown'
+            })
+            if edited_message:
+                return edited_message
+            # Если не удалось обновить, отправляем новое
+            return send_telegram_notification(chat_id, text, screenshot, token)
     
     except Exception as e:
         logger.error(f"Ошибка при обновлении сообщения: {e}")
         # Если не удалось обновить, пробуем отправить новое
-        return send_telegram_notification(chat_id, text, screenshot_path, token) 
\ No newline at end of file
+        return send_telegram_notification(chat_id, text, screenshot, token) 
+
+def broadcast(deliveries, max_workers=BROADCAST_WORKERS):
+    """
+    Рассылает сообщения нескольким получателям параллельно.
+    
+    Args:
+        deliveries: список (chat_id, kind, send) в порядке приоритета, где
+            send - функция без аргументов, отправляющая сообщение одному чату,
+            kind - метка для метрики задержки ('alert' или 'status')
+        max_workers: сколько получателей обслуживается одновременно
+    
+    Returns:
+        Словарь {chat_id: результат send} (None при ошибке)
+    
+    Пул берет задания в порядке списка, поэтому первые получатели не ждут
+    последних, а одновременных запросов не больше max_workers.
+    """
+    if not deliveries:
+        return {}
+    started = time.perf_counter()
+    
+    def deliver(chat_id, kind, send):
+        try:
+            return send()
+        except Exception as e:
+            logger.error(f"Ошибка рассылки для {chat_id}: {e}")
+            return None
+        finally:
+            BROADCAST_LATENCY.labels(kind=kind).observe(time.perf_counter() - started)
+    
+    workers = max(1, min(max_workers, len(deliveries)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='broadcast') as pool:
+        futures = [(chat_id, pool.submit(deliver, chat_id, kind, send)) for chat_id, kind, send in deliveries]
+    return {chat_id: future.result() for chat_id, future in futures}
@@ -0,0 +1,231 @@
+"""
+Кольцевой буфер скриншотов шагов проверки.
+
+В рабочем режиме (SCREENSHOT_MODE=production) промежуточные шаги сценария не
+отправляются в Telegram: кадры хранятся в памяти в ограниченном буфере и
+выдаются по команде /trace. В Telegram уходит только итоговый кадр или кадр
+ошибки. В режиме trace каждый шаг отправляется сразу, как раньше.
+
+Скриншоты передаются в Telegram байтами, без временных файлов. Если задан
+SCREENSHOT_DIR, итоговые кадры сохраняются туда под именем хэша содержимого.
+
+Отпечаток кадра (frame_fingerprint) позволяет не отправлять повторно
+картинку, которая не изменилась с прошлого раза.
+
+Перед отправкой кадр обрезается до списка локаций (или SCREENSHOT_CLIP) и
+сжимается в JPEG/WebP. Кодирование выполняется в отдельном рабочем потоке,
+чтобы не задерживать шаги браузера.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from loguru import logger
+
+from config.config import (
+    SCREENSHOT_MODE, SCREENSHOT_BUFFER_SIZE, SCREENSHOT_DIR, SCREENSHOT_PERCEPTUAL_HASH,
+    SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, TRACE_CHAT_IDS
+)
+
+try:
+    from PIL import Image
+except ImportError:  # без Pillow кадры отправляются PNG как есть и сравниваются по точному хэшу
+    Image = None
+
+# Форматы сжатия кадров: формат Pillow и MIME-тип
+IMAGE_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png')
+}
+
+# Границы элемента в пикселях скриншота с учетом devicePixelRatio
+ELEMENT_CLIP_SCRIPT = """
+var e = document.querySelector(arguments[0]);
+if (!e) { return null; }
+var r = e.getBoundingClientRect(), k = window.devicePixelRatio || 1;
+return [Math.round(r.left * k), Math.round(r.top * k), Math.round(r.width * k), Math.round(r.height * k)];
+"""
+
+# Один поток: кодирование не конкурирует с браузером за ядра
+_encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot-encoder')
+
+
+@dataclass
+class Frame:
+    """Скриншот одного шага (PNG или уже сжатый кадр)."""
+    caption: str
+    image: bytes
+    captured_at: datetime = field(default_factory=datetime.now)
+
+
+class FrameBuffer:
+    """Потокобезопасный буфер последних кадров."""
+
+    def __init__(self, size=SCREENSHOT_BUFFER_SIZE):
+        self._frames = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, caption, image, encode=False):
+        """
+        Добавляет кадр. С encode=True исходный PNG сжимается в фоне
+        и подменяется в кадре, когда кодирование закончится.
+        """
+        frame = Frame(caption, image)
+        with self._lock:
+            self._frames.append(frame)
+        if encode:
+            future = encode_frame_async(image)
+            future.add_done_callback(lambda done: _replace_image(frame, done))
+        return frame
+
+    def frames(self):
+        """Копия буфера от старых кадров к новым."""
+        with self._lock:
+            return list(self._frames)
+
+    def last(self):
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+
+def is_trace_mode():
+    """True, если каждый шаг нужно сразу отправлять в Telegram."""
+    return SCREENSHOT_MODE == 'trace'
+
+
+def _replace_image(frame, future):
+    if not future.exception():
+        frame.image = future.result()
+
+
+def parse_clip(value):
+    """Разбирает область 'x,y,ширина,высота' в кортеж или возвращает None."""
+    if not value:
+        return None
+    try:
+        x, y, width, height = (int(part) for part in value.split(','))
+    except ValueError:
+        logger.warning(f"Некорректная область скриншота: {value}")
+        return None
+    return x, y, width, height
+
+
+def encode_frame(png, clip=None, image_format=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY):
+    """
+    Обрезает PNG до области clip (x, y, ширина, высота) и сжимает его.
+    
+    Без Pillow возвращает исходный PNG.
+    """
+    if Image is None:
+        return png
+    pil_format, _ = IMAGE_FORMATS.get(image_format, IMAGE_FORMATS['jpeg'])
+    with Image.open(io.BytesIO(png)) as image:
+        if clip:
+            x, y, width, height = clip
+            box = (max(x, 0), max(y, 0), min(x + width, image.width), min(y + height, image.height))
+            if box[0] < box[2] and box[1] < box[3]:
+                image = image.crop(box)
+        if pil_format == 'JPEG':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format=pil_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def encode_frame_async(png, clip=None):
+    """Ставит кодирование кадра в рабочий поток, возвращает Future с байтами."""
+    return _encoder.submit(encode_frame, png, clip)
+
+
+def image_mime_type(data):
+    """Определяет формат кадра по сигнатуре: (расширение, MIME-тип)."""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpg', 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp', 'image/webp'
+    return 'png', 'image/png'
+
+
+def photo_upload(data):
+    """Кортеж файла для multipart-загрузки в Telegram."""
+    extension, mime_type = image_mime_type(data)
+    return f"screenshot.{extension}", data, mime_type
+
+
+def persist_frame(image, directory=SCREENSHOT_DIR):
+    """
+    Сохраняет кадр в каталог с адресацией по содержимому.
+    
+    Одинаковые кадры пишутся один раз. Возвращает путь к файлу или None,
+    если сохранение отключено или не удалось.
+    """
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        extension, _ = image_mime_type(image)
+        path = os.path.join(directory, f"{hashlib.sha256(image).hexdigest()}.{extension}")
+        if not os.path.exists(path):
+            # Запись через временный файл: параллельные мониторы не увидят недописанный кадр
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+        return path
+    except OSError as e:
+        logger.error(f"Не удалось сохранить скриншот: {e}")
+        return None
+
+
+def dhash(png, size=16):
+    """Разностный перцептивный хэш: устойчив к шуму сглаживания и сжатия."""
+    with Image.open(io.BytesIO(png)) as image:
+        pixels = image.convert('L').resize((size + 1, size)).tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{size * size // 4}x}"
+
+
+def frame_fingerprint(png, perceptual=SCREENSHOT_PERCEPTUAL_HASH):
+    """Отпечаток кадра для сравнения с последним отправленным."""
+    if perceptual and Image is not None:
+        try:
+            return f"dhash:{dhash(png)}"
+        except Exception as e:
+            logger.warning(f"Не удалось вычислить перцептивный хэш: {e}")
+    return hashlib.sha256(png).hexdigest()
+
+
+# Общий буфер процесса: в него пишут проверки, читает команда /trace
+frame_buffer = FrameBuffer()
+
+
+def trace_frames(chat_id, allowed_chat_ids=None):
+    """
+    Кадры буфера для команды /trace.
+
+    Кадры шагов содержат заполненную форму с данными оператора (USER_DATA),
+    поэтому выдаются только чатам из TRACE_CHAT_IDS; остальным - None.
+    """
+    allowed = TRACE_CHAT_IDS if allowed_chat_ids is None else allowed_chat_ids
+    if int(chat_id) not in allowed:
+        logger.warning(f"Запрос /trace из чата {chat_id} без доступа")
+        return None
+    return frame_buffer.frames()
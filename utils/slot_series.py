@@ -0,0 +1,385 @@
+"""
+Временные ряды состояния локаций.
+
+Каждая проверка записывает для каждой локации (standortid) два значения:
+доступна ли запись и самую раннюю дату. Данные хранятся колонками в
+array('q') - по 8 байт на значение, без JSON:
+
+- сырые отсчеты (время, доступность, ранняя дата) за последние
+  raw_retention_days дней;
+- свертки по минутам, часам и дням (начало интервала, число отсчетов,
+  число отсчетов с доступной записью, минимальная ранняя дата). Минутные
+  свертки по объему близки к сырым отсчетам, поэтому хранятся
+  minute_retention_days дней; часовые и дневные - бессрочно, день
+  занимает 32 байта на локацию.
+
+На диске у каждой локации и разрешения свой файл с записями фиксированной
+длины: отсчет дописывается в конец, завершенная свертка - тоже, а чтение
+файла за несколько месяцев - один frombytes. Файлы сырых отсчетов и
+минутных сверток раз в сутки (с первой проверкой нового дня) и при
+загрузке переписываются из памяти, поэтому на диске они не растут дольше
+срока хранения. Ранняя дата хранится как порядковый номер дня
+(date.toordinal), 0 - даты нет.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import date, datetime
+
+from loguru import logger
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+RAW_WIDTH = 3     # время, доступность, ранняя дата
+ROLLUP_WIDTH = 4  # начало интервала, отсчетов, доступных, минимальная ранняя дата
+
+NO_DATE = 0
+
+
+def date_ordinal(value):
+    """'28.04.2025' -> порядковый номер дня; NO_DATE, если даты нет."""
+    if not value:
+        return NO_DATE
+    try:
+        return datetime.strptime(value, '%d.%m.%Y').date().toordinal()
+    except ValueError:
+        return NO_DATE
+
+
+def _bucket_start(timestamp, seconds):
+    # Интервалы считаются в местном времени, чтобы "час недели" совпадал с часами на сайте
+    local = int(timestamp) + _utc_offset(timestamp)
+    return int(timestamp) - local % seconds
+
+
+def _utc_offset(timestamp):
+    return int(datetime.fromtimestamp(timestamp).astimezone().utcoffset().total_seconds())
+
+
+class _Columns:
+    """Набор колонок одинаковой длины в array('q')."""
+
+    def __init__(self, width):
+        self.columns = [array('q') for _ in range(width)]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def append(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    def row(self, index):
+        return tuple(column[index] for column in self.columns)
+
+    def set_row(self, index, row):
+        for column, value in zip(self.columns, row):
+            column[index] = value
+
+    def drop_before(self, count):
+        for column in self.columns:
+            del column[:count]
+
+    def to_bytes(self, start=0):
+        rows = array('q')
+        for index in range(start, len(self)):
+            rows.extend(self.row(index))
+        return rows.tobytes()
+
+    @classmethod
+    def from_bytes(cls, width, data):
+        columns = cls(width)
+        rows = array('q')
+        rows.frombytes(data[:len(data) - len(data) % (8 * width)])
+        for index, column in enumerate(columns.columns):
+            column.extend(rows[index::width])
+        return columns
+
+
+class SlotSeries:
+    """
+    Хранилище временных рядов по локациям.
+
+    directory=None - только в памяти (для тестов и разовых расчетов).
+    """
+
+    def __init__(self, directory=None, raw_retention_days=14, minute_retention_days=30):
+        self.directory = directory
+        self.raw_retention = raw_retention_days * 86400
+        self.minute_retention = minute_retention_days * 86400
+        self.names = {}
+        self._raw = defaultdict(lambda: _Columns(RAW_WIDTH))
+        self._rollups = {resolution: defaultdict(lambda: _Columns(ROLLUP_WIDTH)) for resolution in RESOLUTIONS}
+        # Уже записанная на диск часть незавершенных интервалов {(разрешение, standortid): строка}
+        self._flushed = {}
+        # Файлы пишутся под той же блокировкой: перезапись не должна разойтись с дописыванием
+        self._lock = threading.RLock()
+        self._compacted_day = None  # начало дня последней перезаписи файлов
+        if directory:
+            self.load()
+
+    # Запись
+
+    def record(self, locations, timestamp=None):
+        """Записывает состояние всех локаций одной проверки."""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        pending = []
+        with self._lock:
+            for location in locations:
+                if location.standortid is None:
+                    continue
+                standortid = location.standortid
+                if location.name and self.names.get(standortid) != location.name:
+                    self.names[standortid] = location.name
+                    pending.append(('names', None, None))
+                raw_row = (timestamp, int(location.available), date_ordinal(location.earliest_date))
+                self._raw[standortid].append(raw_row)
+                pending.append(('raw', standortid, raw_row))
+                for resolution in RESOLUTIONS:
+                    closed = self._roll_up(resolution, standortid, raw_row)
+                    if closed:
+                        pending.append((resolution, standortid, closed))
+            self._trim(timestamp)
+            if self.directory and pending:
+                self._persist(pending)
+            day = _bucket_start(timestamp, RESOLUTIONS['day'])
+            if self.directory and day != self._compacted_day:
+                self._compact(day)
+
+    def _roll_up(self, resolution, standortid, raw_row):
+        """Добавляет отсчет в свертку; возвращает завершенный интервал, если он закрылся."""
+        timestamp, enabled, earliest = raw_row
+        columns = self._rollups[resolution][standortid]
+        start = _bucket_start(timestamp, RESOLUTIONS[resolution])
+        if len(columns) and columns.columns[0][-1] == start:
+            _, samples, enabled_count, earliest_min = columns.row(-1)
+            columns.set_row(-1, (start, samples + 1, enabled_count + enabled, _min_date(earliest_min, earliest)))
+            return None
+        closed = self._unflushed_part(resolution, standortid, columns.row(-1)) if len(columns) else None
+        columns.append((start, 1, enabled, earliest))
+        return closed
+
+    def _unflushed_part(self, resolution, standortid, row):
+        """Часть интервала, еще не записанная на диск (после flush или загрузки)."""
+        flushed = self._flushed.pop((resolution, standortid), None)
+        if not flushed or flushed[0] != row[0]:
+            return row
+        start, samples, enabled, earliest = row
+        if samples == flushed[1]:
+            return None
+        return (start, samples - flushed[1], enabled - flushed[2], earliest)
+
+    def _trim(self, now):
+        """Отбрасывает сырые отсчеты и минутные свертки старше своего срока хранения."""
+        _drop_older(self._raw, now - self.raw_retention)
+        _drop_older(self._rollups['minute'], now - self.minute_retention)
+
+    # Хранение
+
+    def _compact(self, day):
+        """Переписывает файлы сырых отсчетов и минутных сверток по обрезанным рядам в памяти."""
+        self._compacted_day = day
+        try:
+            self._rewrite('raw', self._raw)
+            self._rewrite('minute', self._rollups['minute'])
+        except Exception as e:
+            logger.error(f"Ошибка при сжатии временных рядов: {e}")
+            return
+        # Незавершенная минута теперь в файле целиком - дальше дописывается только прирост
+        for standortid, columns in self._rollups['minute'].items():
+            if len(columns):
+                self._flushed[('minute', standortid)] = columns.row(-1)
+
+    def _path(self, kind, standortid):
+        return os.path.join(self.directory, f"{standortid}.{kind}.bin")
+
+    def _persist(self, pending):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            by_file = defaultdict(lambda: array('q'))
+            for kind, standortid, row in pending:
+                if kind == 'names':
+                    continue
+                by_file[self._path(kind, standortid)].extend(array('q', row))
+            for path, rows in by_file.items():
+                with open(path, 'ab') as f:
+                    f.write(rows.tobytes())
+            if any(kind == 'names' for kind, _, _ in pending):
+                with self._lock:
+                    names = {str(key): value for key, value in self.names.items()}
+                with open(os.path.join(self.directory, 'locations.json'), 'w', encoding='utf-8') as f:
+                    json.dump(names, f, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении временных рядов: {e}")
+
+    def load(self):
+        """Загружает ряды из каталога; сырые отсчеты и минутные свертки старше срока хранения отбрасываются."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        names_path = os.path.join(self.directory, 'locations.json')
+        if os.path.exists(names_path):
+            with open(names_path, encoding='utf-8') as f:
+                self.names = {int(key): value for key, value in json.load(f).items()}
+        for name in os.listdir(self.directory):
+            parts = name.split('.')
+            if len(parts) != 3 or parts[2] != 'bin' or not parts[0].isdigit():
+                continue
+            standortid, kind = int(parts[0]), parts[1]
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                data = f.read()
+            if kind == 'raw':
+                self._raw[standortid] = _Columns.from_bytes(RAW_WIDTH, data)
+            elif kind in RESOLUTIONS:
+                columns = _merge_buckets(_Columns.from_bytes(ROLLUP_WIDTH, data))
+                self._rollups[kind][standortid] = columns
+                if len(columns):
+                    self._flushed[(kind, standortid)] = columns.row(-1)
+        now = time.time()
+        self._trim(now)
+        self._rewrite('raw', self._raw)
+        self._rewrite('minute', self._rollups['minute'])
+        self._compacted_day = _bucket_start(now, RESOLUTIONS['day'])
+
+    def _rewrite(self, kind, series):
+        """Переписывает файлы ряда после обрезки по сроку хранения."""
+        for standortid, columns in series.items():
+            path = self._path(kind, standortid)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(columns.to_bytes())
+            os.replace(path + '.tmp', path)
+
+    def flush(self):
+        """Дописывает незавершенные интервалы сверток (при остановке)."""
+        if not self.directory:
+            return
+        pending = []
+        with self._lock:
+            for resolution, series in self._rollups.items():
+                for standortid, columns in series.items():
+                    if not len(columns):
+                        continue
+                    row = columns.row(-1)
+                    part = self._unflushed_part(resolution, standortid, row)
+                    self._flushed[(resolution, standortid)] = row
+                    if part:
+                        pending.append((resolution, standortid, part))
+            # При следующей загрузке одинаковые интервалы будут слиты
+            self._persist(pending)
+
+    # Запросы
+
+    def locations(self):
+        """{standortid: название} всех локаций, по которым есть данные."""
+        with self._lock:
+            ids = set(self._raw) | set(self._rollups['day'])
+            return {standortid: self.names.get(standortid, '') for standortid in sorted(ids)}
+
+    def samples(self, standortid, since=None, until=None, resolution='raw'):
+        """
+        Ряд одной локации за период (unix-время).
+
+        raw: [(время, доступна, ранняя дата)], иначе
+        [(начало интервала, отсчетов, доступных, минимальная ранняя дата)];
+        даты - datetime.date или None.
+        """
+        with self._lock:
+            series = self._raw if resolution == 'raw' else self._rollups[resolution]
+            if standortid not in series:
+                return []
+            columns = series[standortid]
+            rows = [columns.row(index) for index in range(len(columns))
+                    if (since is None or columns.columns[0][index] >= since)
+                    and (until is None or columns.columns[0][index] <= until)]
+        return [row[:-1] + (_to_date(row[-1]),) for row in rows]
+
+    def availability_by_hour_of_week(self, standortid=None, since=None):
+        """
+        Доля проверок с доступной записью по часам недели.
+
+        Возвращает {(день недели 0-6, час 0-23): доля}; standortid=None - по всем локациям.
+        """
+        totals = defaultdict(lambda: [0, 0])
+        with self._lock:
+            series = self._rollups['hour']
+            ids = [standortid] if standortid is not None else list(series)
+            for location_id in ids:
+                if location_id not in series:
+                    continue
+                starts, samples, enabled = series[location_id].columns[:3]
+                for index in range(len(starts)):
+                    if since is not None and starts[index] < since:
+                        continue
+                    moment = datetime.fromtimestamp(starts[index])
+                    bucket = totals[(moment.weekday(), moment.hour)]
+                    bucket[0] += enabled[index]
+                    bucket[1] += samples[index]
+        return {key: enabled / samples for key, (enabled, samples) in sorted(totals.items()) if samples}
+
+    def earliest_date_trend(self, standortid, resolution='day', since=None):
+        """[(начало интервала datetime, самая ранняя дата)] - только интервалы, где дата была."""
+        return [(datetime.fromtimestamp(start), earliest)
+                for start, _, _, earliest in self.samples(standortid, since=since, resolution=resolution)
+                if earliest]
+
+
+def _drop_older(series, cutoff):
+    """Удаляет из начала рядов строки со временем раньше cutoff (время - первая колонка)."""
+    for columns in series.values():
+        timestamps = columns.columns[0]
+        if timestamps and timestamps[0] < cutoff:
+            count = 0
+            while count < len(timestamps) and timestamps[count] < cutoff:
+                count += 1
+            columns.drop_before(count)
+
+
+def _min_date(current, new):
+    if current == NO_DATE:
+        return new
+    if new == NO_DATE:
+        return current
+    return min(current, new)
+
+
+def _to_date(ordinal):
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def _merge_buckets(columns):
+    """Сливает записи одного интервала (незавершенный интервал, сохраненный при остановке)."""
+    merged = _Columns(ROLLUP_WIDTH)
+    for index in range(len(columns)):
+        start, samples, enabled, earliest = columns.row(index)
+        if len(merged) and merged.columns[0][-1] == start:
+            _, merged_samples, merged_enabled, merged_earliest = merged.row(-1)
+            merged.set_row(-1, (start, merged_samples + samples, merged_enabled + enabled,
+                                _min_date(merged_earliest, earliest)))
+        else:
+            merged.append((start, samples, enabled, earliest))
+    return merged
+
+
+_series = None
+_series_lock = threading.Lock()
+
+
+def get_slot_series():
+    """Общее хранилище рядов процесса (каталог из config.config, импорт по требованию)."""
+    global _series
+    with _series_lock:
+        if _series is None:
+            from config.config import SLOT_SERIES_DIR, SLOT_SERIES_RAW_DAYS, SLOT_SERIES_MINUTE_DAYS
+            _series = SlotSeries(SLOT_SERIES_DIR or None, raw_retention_days=SLOT_SERIES_RAW_DAYS,
+                                 minute_retention_days=SLOT_SERIES_MINUTE_DAYS)
+        return _series
+
+
+def record_probe(locations, timestamp=None):
+    """Записывает результат проверки; ошибки записи не мешают проверке."""
+    try:
+        get_slot_series().record(locations, timestamp)
+    except Exception as e:
+        logger.error(f"Ошибка записи временного ряда: {e}")
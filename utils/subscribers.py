@@ -0,0 +1,212 @@
+"""
+Реестр подписчиков уведомлений.
+
+Раньше список chat_id жил в telegram_users.json: add_chat_id читал файл,
+искал chat_id перебором списка и переписывал файл целиком, а
+load_chat_ids перечитывал его на каждой проверке. Два процесса бота,
+добавлявшие пользователей одновременно, затирали записи друг друга.
+
+Теперь подписчики хранятся в памяти (core.subscriptions.SubscriptionRegistry,
+его же использует цикл SlotChecker) и в таблице SQLite (WAL). Каждое
+изменение - одно выражение INSERT ... ON CONFLICT для одной строки, без
+чтения и перезаписи всего списка, поэтому параллельные писатели не теряют
+чужие записи. Рассылка читает только память.
+
+Кроме chat_id хранятся атрибуты подписки: диапазон дат, услуга и список
+локаций. При первом открытии пустой таблицы в нее переносится старый
+telegram_users.json.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+from config.settings import settings
+from core.subscriptions import Subscription, SubscriptionRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    chat_id INTEGER PRIMARY KEY,
+    preferred_range TEXT NOT NULL DEFAULT 'any',
+    service_id INTEGER,
+    locations TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+SQL_UPSERT = """
+INSERT INTO subscribers (chat_id, preferred_range, service_id, locations, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(chat_id) DO UPDATE SET
+    preferred_range = excluded.preferred_range,
+    service_id = excluded.service_id,
+    locations = excluded.locations,
+    updated_at = excluded.updated_at
+"""
+
+# Значение по умолчанию для атрибутов subscribe(): "оставить как есть"
+_KEEP = object()
+
+
+class SubscriberRegistry(SubscriptionRegistry):
+    """
+    Реестр подписок core.subscriptions с записью каждого изменения в базу.
+
+    Память и индексы диапазонов - те же, что у SubscriptionRegistry, поэтому
+    цикл SlotChecker и рассылка браузерной проверки видят одних и тех же
+    подписчиков. Порядок chat_ids() - порядок подписки, как в старом JSON.
+    """
+
+    def __init__(self, db_path, legacy_json=None, timeout=5.0):
+        super().__init__()
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self.timeout = timeout
+        self._connection = None
+        self.load()
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def load(self):
+        """Загружает подписчиков из базы (повторный вызов перечитывает изменения других процессов)."""
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT chat_id, preferred_range, service_id, locations FROM subscribers ORDER BY rowid"
+                ).fetchall()
+                super().clear()
+                for chat_id, preferred_range, service_id, locations in rows:
+                    super().subscribe(chat_id, preferred_range, service_id,
+                                      json.loads(locations) if locations else None)
+                if not rows:
+                    self._import_legacy_json()
+                return True
+            except Exception as e:
+                # Без базы реестр работает только в памяти
+                logger.error(f"Ошибка при загрузке подписчиков: {e}")
+                return False
+
+    def _import_legacy_json(self):
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        with open(self.legacy_json, "r") as f:
+            chat_ids = json.load(f).get("chat_ids", [])
+        for chat_id in chat_ids:
+            self._save(Subscription(chat_id=int(chat_id), service_id=settings.slot_checker.default_service_id))
+        logger.info(f"Перенесено {len(chat_ids)} подписчиков из {self.legacy_json}")
+
+    def _save(self, subscription):
+        """Записывает одного подписчика в базу и в память (под self._lock)."""
+        locations = json.dumps(list(subscription.locations)) if subscription.locations is not None else None
+        connection = self._connect()
+        with connection:
+            connection.execute(SQL_UPSERT, (subscription.chat_id, subscription.preferred_range,
+                                            subscription.service_id, locations, time.time()))
+        self._index(subscription)
+        return subscription
+
+    def subscribe(self, chat_id, preferred_range=_KEEP, service_id=_KEEP, locations=_KEEP):
+        """
+        Добавляет подписчика или меняет переданные атрибуты подписки.
+
+        Непереданные атрибуты сохраняют текущее значение (у нового
+        подписчика - любые даты, услуга по умолчанию, все локации).
+        Возвращает Subscription или None при ошибке базы.
+        """
+        chat_id = int(chat_id)
+        with self._lock:
+            current = self._subscriptions.get(chat_id)
+            subscription = Subscription(
+                chat_id=chat_id,
+                preferred_range=preferred_range if preferred_range is not _KEEP
+                else (current.preferred_range if current else 'any'),
+                service_id=(service_id or settings.slot_checker.default_service_id) if service_id is not _KEEP
+                else (current.service_id if current else settings.slot_checker.default_service_id),
+                locations=(tuple(locations) if locations is not None else None) if locations is not _KEEP
+                else (current.locations if current else None),
+            )
+            if subscription == current:
+                return current
+            try:
+                return self._save(subscription)
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка при сохранении подписчика {chat_id}: {e}")
+                return None
+
+    def unsubscribe(self, chat_id):
+        """Удаляет подписчика; False, если его не было."""
+        chat_id = int(chat_id)
+        with self._lock:
+            if chat_id not in self._subscriptions:
+                return False
+            try:
+                connection = self._connect()
+                with connection:
+                    connection.execute("DELETE FROM subscribers WHERE chat_id = ?", (chat_id,))
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка при удалении подписчика {chat_id}: {e}")
+                return False
+            return self._unindex(chat_id) is not None
+
+    def clear(self):
+        """Удаляет всех подписчиков из памяти и из базы."""
+        with self._lock:
+            try:
+                connection = self._connect()
+                with connection:
+                    connection.execute("DELETE FROM subscribers")
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка при удалении подписчиков: {e}")
+                return
+            super().clear()
+
+    def get(self, chat_id):
+        """Subscription подписчика или None."""
+        return super().get(int(chat_id))
+
+    def chat_ids(self):
+        """Список chat_id всех подписчиков."""
+        with self._lock:
+            return list(self._subscriptions)
+
+    def subscriptions(self):
+        """Снимок подписок всех подписчиков."""
+        with self._lock:
+            return list(self._subscriptions.values())
+
+    def __contains__(self, chat_id):
+        return super().__contains__(int(chat_id))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_subscribers(db_path=None):
+    """Общий реестр подписчиков для файла базы (по умолчанию SUBSCRIBERS_DB_PATH из config.config)."""
+    if db_path is None:
+        from config.config import SUBSCRIBERS_DB_PATH
+        db_path = SUBSCRIBERS_DB_PATH
+    with _registries_lock:
+        registry = _registries.get(db_path)
+        if registry is None:
+            registry = _registries[db_path] = SubscriberRegistry(db_path, legacy_json="telegram_users.json")
+        return registry
@@ -0,0 +1,178 @@
+"""
+Общий клиент Telegram Bot API с пулом соединений и keep-alive.
+
+Вместо нового Bot(token) или голого requests.post на каждое сообщение
+процесс держит по одному клиенту на токен: синхронный на requests.Session
+и асинхронный на httpx.AsyncClient. Повторные запросы идут по уже открытым
+TCP/TLS-соединениям.
+"""
+import asyncio
+import json
+import threading
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+from exceptions.custom_exceptions import RateLimitException
+
+DEFAULT_API_URL = 'https://api.telegram.org'
+DEFAULT_POOL_SIZE = 8
+
+# Таймауты: загрузка фото дольше обычного запроса
+DEFAULT_TIMEOUT = 10
+UPLOAD_TIMEOUT = 30
+
+NOT_MODIFIED = 'message is not modified'
+
+
+def _method_url(api_url, token, method):
+    return f"{api_url.rstrip('/')}/bot{token}/{method}"
+
+
+def _retry_after(payload):
+    """Пауза из ответа 429: parameters.retry_after (секунды)."""
+    return float((payload.get('parameters') or {}).get('retry_after', 1))
+
+
+def _encode_field(value):
+    # Вложенные поля (media, reply_markup) Bot API принимает как JSON-строки
+    if isinstance(value, (dict, list, bool)):
+        return json.dumps(value)
+    return value
+
+
+def _encode_fields(data):
+    """Готовит поля запроса к отправке формой."""
+    return {key: _encode_field(value) for key, value in (data or {}).items() if value is not None}
+
+
+class TelegramClient:
+    """Синхронный клиент: одна requests.Session на процесс и токен."""
+
+    def __init__(self, token, api_url=DEFAULT_API_URL, pool_size=DEFAULT_POOL_SIZE):
+        self.token = token
+        self.api_url = api_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, method, data=None, files=None, timeout=None):
+        """Вызывает метод Bot API и возвращает requests.Response."""
+        return self.session.post(
+            _method_url(self.api_url, self.token, method),
+            data=_encode_fields(data),
+            files=files,
+            timeout=timeout or (UPLOAD_TIMEOUT if files else DEFAULT_TIMEOUT)
+        )
+
+    def call(self, method, data=None, files=None):
+        """Вызывает метод Bot API и возвращает поле result или None при ошибке."""
+        response = self.post(method, data, files)
+        if response.status_code != 200:
+            logger.error(f"Ошибка Telegram API {method}: {response.text}")
+            return None
+        return response.json().get('result')
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTelegramClient:
+    """Асинхронный клиент на httpx.AsyncClient с тем же интерфейсом."""
+
+    def __init__(self, token, api_url=DEFAULT_API_URL, pool_size=DEFAULT_POOL_SIZE):
+        self.token = token
+        self.api_url = api_url
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=DEFAULT_TIMEOUT
+        )
+
+    async def post(self, method, data=None, files=None, timeout=None):
+        """Вызывает метод Bot API и возвращает httpx.Response."""
+        return await self.client.post(
+            _method_url(self.api_url, self.token, method),
+            data=_encode_fields(data),
+            files=files,
+            timeout=timeout or (UPLOAD_TIMEOUT if files else DEFAULT_TIMEOUT)
+        )
+
+    async def call(self, method, data=None, files=None):
+        """
+        Вызывает метод Bot API и возвращает поле result или None при ошибке.
+        
+        Повторная правка с тем же содержимым ("message is not modified")
+        считается успешной и возвращает True.
+
+        Raises:
+            RateLimitException: Telegram ответил 429, в исключении - retry_after
+        """
+        response = await self.post(method, data, files)
+        if response.status_code == 429:
+            raise RateLimitException(_retry_after(response.json()))
+        if response.status_code == 400 and NOT_MODIFIED in response.text:
+            # Правка совпала с текущим содержимым - сообщение уже в нужном виде
+            return True
+        if response.status_code != 200:
+            logger.error(f"Ошибка Telegram API {method}: {response.text}")
+            return None
+        return response.json().get('result')
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Асинхронные соединения привязаны к циклу событий, поэтому клиенты хранятся по циклам
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_options(token, api_url, pool_size):
+    """Недостающие параметры берутся из config.config (импорт по требованию)."""
+    if not token or not api_url or not pool_size:
+        from config.config import TELEGRAM_TOKEN, TELEGRAM_API_URL, TELEGRAM_POOL_SIZE
+        token = token or TELEGRAM_TOKEN
+        api_url = api_url or TELEGRAM_API_URL
+        pool_size = pool_size or TELEGRAM_POOL_SIZE
+    return token, api_url, pool_size
+
+
+def get_telegram_client(token=None, api_url=None, pool_size=None):
+    """Возвращает общий синхронный клиент для токена."""
+    token, api_url, pool_size = _client_options(token, api_url, pool_size)
+    with _clients_lock:
+        client = _clients.get((token, api_url))
+        if client is None:
+            client = _clients[(token, api_url)] = TelegramClient(token, api_url, pool_size)
+        return client
+
+
+def get_async_telegram_client(token=None, api_url=None, pool_size=None):
+    """Возвращает общий асинхронный клиент для токена в текущем цикле событий."""
+    token, api_url, pool_size = _client_options(token, api_url, pool_size)
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((token, api_url))
+    if client is None:
+        client = clients[(token, api_url)] = AsyncTelegramClient(token, api_url, pool_size)
+    return client
+
+
+def close_telegram_clients():
+    """Закрывает синхронные клиенты (при остановке процесса)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def close_async_telegram_clients():
+    """Закрывает асинхронные клиенты текущего цикла событий."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()